@@ -11,6 +11,8 @@ from routes.social_routes import social_bp
 from routes.messages_routes import messages_bp
 from routes.gamification_routes import gamification_bp   
 from routes.ingredient_prices_routes import ingredient_prices_bp
+from services.price_catalog import price_catalog
+from services.recipe_costs import recipe_costs
 
 # Configure ProxyFix for Nginx (only in production)
 if os.getenv('FLASK_ENV') == 'production':
@@ -36,6 +38,18 @@ app.register_blueprint(messages_bp, url_prefix='/api')
 app.register_blueprint(gamification_bp, url_prefix='/api')
 app.register_blueprint(ingredient_prices_bp, url_prefix='/api')  # Ingredient prices routes
 
+def start_background_services():
+    """
+    Load the ingredient price catalog in the background so the first estimate doesn't wait for it,
+    and keep recipe cost estimates in step with it. Started by the server entrypoint below;
+    other servers (e.g. gunicorn) opt in with PRICE_CATALOG_PRELOAD=true.
+    """
+    price_catalog.warm()
+    recipe_costs.start()
+
+if os.getenv('PRICE_CATALOG_PRELOAD', 'false').lower() == 'true':
+    start_background_services()
+
 @app.route('/health')
 def health():
     return jsonify({"status": "ok", "message": "Server is running"}), 200
@@ -62,4 +76,7 @@ if __name__ == '__main__':
         database_url = os.getenv('DATABASE_URL', '')
         if not database_url.startswith('postgresql'):
             db.create_all()
+    # On by default here; PRICE_CATALOG_PRELOAD=true already started them at import, false turns them off
+    if os.getenv('PRICE_CATALOG_PRELOAD') is None:
+        start_background_services()
     app.run(debug=True, host='0.0.0.0')
@@ -0,0 +1,7 @@
+# backend/backfill_badges.py
+# One-off: rebuild badge counters for every existing user and award the
+# badges they have already earned. Safe to re-run.
+from services.badges import badge_engine
+
+awarded = badge_engine.backfill()
+print(f"Backfill completed: {awarded} badges awarded")
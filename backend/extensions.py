@@ -29,6 +29,12 @@ if not app.config['SECRET_KEY']:
 # Set JWT_SECRET (can be the same as SECRET_KEY or different)
 app.config['JWT_SECRET'] = os.getenv('SECRET_KEY')  # Using same key for simplicity
 
+# Mint tokens that carry the user's id so routes can skip the email -> id lookup
+app.config['JWT_INCLUDE_USER_ID'] = os.getenv('JWT_INCLUDE_USER_ID', 'true').lower() == 'true'
+
+# Shared secret for internal callers (jobs, admin tools) of service-only endpoints; unset disables them
+app.config['SERVICE_TOKEN'] = os.getenv('SERVICE_TOKEN')
+
 google_client_id = os.getenv('CLIENT_ID')
 google_client_secret = os.getenv('CLIENT_SECRET')
 if not google_client_id or not google_client_secret:
@@ -1,11 +1,81 @@
 # backend/routes/engagement_routes.py
 from flask import Blueprint, request, jsonify, g
 from supabase_client import supabase
-from routes.user_routes import jwt_required, get_user_id_from_jwt
+from routes.user_routes import jwt_required, get_user_id_from_jwt, service_token_required
+from services.feed_hydration import FeedHydrator, StageTimings
+from services.feed_cache import FeedCache
+from services.pagination import paginate, split_page, InvalidCursor
+from services.engagement_buffer import engagement_buffer, LIKE, SAVE, TABLES
+from services.view_tracker import view_tracker
+from services.trending import trending, COMMENT, VIEW
+from services.gamification_events import gamification_events, LIKE_RECEIVED, COMMENT_MADE
+from services.known_posts import known_posts
 import uuid
 
+MAX_VIEW_BATCH = 100
+
 engagement_bp = Blueprint("engagement", __name__)
 
+def _post_exists(post_id) -> bool:
+    if known_posts.get(post_id) or FeedCache.has_card(post_id):
+        return True
+    post_check = supabase.table("posts").select("id").eq("id", post_id).execute()
+    if not post_check.data:
+        return False
+    known_posts.set(post_id, True)
+    return True
+
+def _existing_posts(post_ids: list) -> list:
+    """The ids in post_ids that belong to existing posts, in order; one query for all unknown ids"""
+    existing = {pid for pid in set(post_ids) if known_posts.get(pid) or FeedCache.has_card(pid)}
+    unknown = set(post_ids) - existing
+    if unknown:
+        found = supabase.table("posts").select("id").in_("id", list(unknown)).execute()
+        for row in found.data or []:
+            known_posts.set(str(row["id"]), True)
+            existing.add(str(row["id"]))
+    return [pid for pid in post_ids if pid in existing]
+
+def _toggle(kind: str, user_id, post_id, active: bool):
+    """
+    Buffer a like/save toggle and patch the feed cache.
+
+    Returns:
+        The state before this toggle (True/False). Only an unlike/unsave can
+        return None (not known without a database read).
+    """
+    previous = engagement_buffer.pending_state(kind, user_id, post_id)
+    if previous is None:
+        cached = FeedCache.cached_viewer_flags(user_id, post_id)
+        if cached is not None:
+            previous = cached[0] if kind == LIKE else cached[1]
+    if previous is None and active:
+        # Read the stored row so a repeated like is reported (and counted) as a no-op
+        stored = supabase.table(TABLES[kind])\
+            .select("post_id")\
+            .eq("post_id", post_id)\
+            .eq("user_id", user_id)\
+            .limit(1)\
+            .execute()
+        previous = bool(stored.data)
+
+    engagement_buffer.record(kind, user_id, post_id, active)
+
+    # An unlike/unsave with an unknown previous state is not counted
+    if previous != active and (active or previous is not None):
+        trending.record(post_id, kind, 1 if active else -1)
+    if kind == LIKE and active and previous is not True:
+        # The author is rewarded once per (post, liker), however often it is toggled
+        gamification_events.emit(LIKE_RECEIVED, f"like:{post_id}:{user_id}", actor_id=user_id, post_id=post_id)
+
+    if kind == LIKE:
+        if previous is not None and previous != active:
+            FeedCache.adjust_counts(post_id, likes=1 if active else -1)
+        FeedCache.set_viewer_flags(user_id, post_id, liked=active)
+    else:
+        FeedCache.set_viewer_flags(user_id, post_id, saved=active)
+    return previous
+
 @engagement_bp.route("/posts/like", methods=["POST"])
 @jwt_required
 def like_post():
@@ -21,23 +91,14 @@ def like_post():
         return error
 
     try:
-        # Check if post exists
-        post_check = supabase.table("posts").select("id").eq("id", post_id).execute()
-        if not post_check.data:
+        if not _post_exists(post_id):
             return jsonify({"error": "Post not found"}), 404
 
-        # Insert like (UNIQUE constraint prevents duplicates)
-        supabase.table("likes").insert({
-            "post_id": post_id,
-            "user_id": user_id
-        }).execute()
-
-        return jsonify({"liked": True, "message": "Post liked"}), 201
+        if _toggle(LIKE, user_id, post_id, True) is False:
+            return jsonify({"liked": True, "message": "Post liked"}), 201
+        return jsonify({"liked": True, "message": "Already liked"}), 200
 
     except Exception as e:
-        # If duplicate, it's already liked
-        if "duplicate" in str(e).lower() or "unique" in str(e).lower():
-            return jsonify({"liked": True, "message": "Already liked"}), 200
         return jsonify({"error": str(e)}), 500
 
 @engagement_bp.route("/posts/like", methods=["DELETE"])
@@ -55,12 +116,7 @@ def unlike_post():
         return error
 
     try:
-        result = supabase.table("likes")\
-            .delete()\
-            .eq("post_id", post_id)\
-            .eq("user_id", user_id)\
-            .execute()
-
+        _toggle(LIKE, user_id, post_id, False)
         return jsonify({"liked": False, "message": "Post unliked"}), 200
 
     except Exception as e:
@@ -70,12 +126,14 @@ def unlike_post():
 def get_post_likes_count(post_id):
     """Get total likes for a post"""
     try:
-        result = supabase.table("likes")\
-            .select("id", count="exact")\
-            .eq("post_id", post_id)\
+        # posts.likes_count is maintained by a trigger on `likes`
+        result = supabase.table("posts")\
+            .select("likes_count")\
+            .eq("id", post_id)\
             .execute()
 
-        return jsonify({"count": result.count or 0}), 200
+        count = result.data[0].get("likes_count") if result.data else 0
+        return jsonify({"count": count or 0}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -89,6 +147,10 @@ def check_user_liked_post(post_id):
         return error
 
     try:
+        pending = engagement_buffer.pending_state(LIKE, user_id, post_id)
+        if pending is not None:
+            return jsonify({"liked": pending}), 200
+
         result = supabase.table("likes")\
             .select("id")\
             .eq("post_id", post_id)\
@@ -100,6 +162,47 @@ def check_user_liked_post(post_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@engagement_bp.route("/posts/views", methods=["POST"])
+@jwt_required
+def record_post_views():
+    """
+    Record a batch of post impressions.
+    Body: {"post_ids": [...]} - posts the client showed since its last report
+    """
+    data = request.get_json() or {}
+    post_ids = data.get('post_ids')
+
+    if not isinstance(post_ids, list) or not post_ids:
+        return jsonify({"error": "post_ids required"}), 400
+    if len(post_ids) > MAX_VIEW_BATCH:
+        return jsonify({"error": f"At most {MAX_VIEW_BATCH} post_ids per request"}), 400
+
+    try:
+        post_ids = [str(uuid.UUID(str(pid))) for pid in post_ids]
+    except ValueError:
+        return jsonify({"error": "post_ids must be UUIDs"}), 400
+
+    user_id, error = get_user_id_from_jwt()
+    if error:
+        return error
+
+    try:
+        post_ids = _existing_posts(post_ids)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    # Counted in memory and written in aggregated batches by the view tracker;
+    # trending only counts a viewer's first impression of a post per bucket
+    for post_id in view_tracker.record(user_id, post_ids):
+        trending.record(post_id, VIEW)
+    return jsonify({"accepted": len(post_ids)}), 202
+
+@engagement_bp.route("/posts/views/stats", methods=["GET"])
+@service_token_required
+def get_view_tracker_stats():
+    """View ingestion metrics: buffered views and flush results"""
+    return jsonify(view_tracker.stats()), 200
+
 @engagement_bp.route("/posts/comments", methods=["POST"])
 @jwt_required
 def create_comment():
@@ -123,8 +226,13 @@ def create_comment():
             "text": content  # DB uses 'text' column
         }).execute()
 
-        # Return with 'content' key for API consistency
+        FeedCache.adjust_counts(post_id, comments=1)
+        trending.record(post_id, COMMENT)
+
         comment_data = result.data[0]
+        gamification_events.emit(COMMENT_MADE, f"comment:{comment_data['id']}", user_id=user_id, post_id=post_id)
+
+        # Return with 'content' key for API consistency
         comment_data['content'] = comment_data.get('text', '')
 
         return jsonify(comment_data), 201
@@ -189,6 +297,7 @@ def delete_comment(comment_id):
 
         if not result.data:
             return jsonify({"error": "Comment not found or unauthorized"}), 404
+        FeedCache.adjust_counts(result.data[0].get('post_id'), comments=-1)
 
         return jsonify({"message": "Comment deleted"}), 200
 
@@ -210,16 +319,14 @@ def save_post():
         return error
 
     try:
-        supabase.table("saved_posts").insert({
-            "post_id": post_id,
-            "user_id": user_id
-        }).execute()
+        if not _post_exists(post_id):
+            return jsonify({"error": "Post not found"}), 404
 
-        return jsonify({"saved": True, "message": "Post saved"}), 201
+        if _toggle(SAVE, user_id, post_id, True) is False:
+            return jsonify({"saved": True, "message": "Post saved"}), 201
+        return jsonify({"saved": True, "message": "Already saved"}), 200
 
     except Exception as e:
-        if "duplicate" in str(e).lower() or "unique" in str(e).lower():
-            return jsonify({"saved": True, "message": "Already saved"}), 200
         return jsonify({"error": str(e)}), 500
 
 @engagement_bp.route("/posts/save", methods=["DELETE"])
@@ -237,55 +344,79 @@ def unsave_post():
         return error
 
     try:
-        supabase.table("saved_posts")\
-            .delete()\
-            .eq("post_id", post_id)\
-            .eq("user_id", user_id)\
-            .execute()
-
+        _toggle(SAVE, user_id, post_id, False)
         return jsonify({"saved": False, "message": "Post unsaved"}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@engagement_bp.route("/engagement/buffer-stats", methods=["GET"])
+@service_token_required
+def get_engagement_buffer_stats():
+    """Write-behind buffer metrics: buffered ops and flush latency"""
+    return jsonify(engagement_buffer.stats()), 200
+
+SAVED_SORT = ("saved_at", "id")
+
 @engagement_bp.route("/posts/saved", methods=["GET"])
 @jwt_required
 def get_saved_posts():
-    """Get all saved posts for current user"""
-    user_id, error = get_user_id_from_jwt()
+    """
+    Get all saved posts for current user, most recently saved first.
+    Query params: cursor (preferred) or page, and per_page (default 20)
+    """
+    timings = StageTimings()
+    with timings.stage("auth"):
+        user_id, error = get_user_id_from_jwt()
     if error:
         return error
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
-
-    start = (page - 1) * per_page
-    end = start + per_page - 1
 
     try:
+        # Saves still in the write-behind buffer are written first so the list includes them
+        if engagement_buffer.has_pending(SAVE, user_id):
+            with timings.stage("flush"):
+                engagement_buffer.flush()
+
         # Get saved post IDs
-        saved_result = supabase.table("saved_posts")\
-            .select("post_id, saved_at")\
-            .eq("user_id", user_id)\
-            .order("saved_at", desc=True)\
-            .range(start, end)\
-            .execute()
+        with timings.stage("saved"):
+            query, page, per_page = paginate(
+                supabase.table("saved_posts").select("id, post_id, saved_at").eq("user_id", user_id),
+                request.args,
+                columns=SAVED_SORT,
+            )
+            saved_rows, next_cursor = split_page(query.execute().data, per_page, SAVED_SORT)
 
-        if not saved_result.data:
-            return jsonify({"posts": [], "page": page, "per_page": per_page}), 200
+        if not saved_rows:
+            return jsonify({"posts": [], "page": page, "per_page": per_page, "next_cursor": None}), 200
 
-        post_ids = [s['post_id'] for s in saved_result.data]
+        post_ids = [s['post_id'] for s in saved_rows]
 
         # Get full post data
-        posts_result = supabase.table("posts")\
-            .select("*")\
-            .in_("id", post_ids)\
-            .execute()
+        with timings.stage("posts"):
+            posts_result = supabase.table("posts")\
+                .select(FeedHydrator.POST_COLUMNS)\
+                .in_("id", post_ids)\
+                .execute()
 
-        return jsonify({
-            "posts": posts_result.data or [],
-            "page": page,
-            "per_page": per_page
-        }), 200
+        # Keep the saved_at ordering; in_() returns rows in arbitrary order
+        posts_by_id = {p['id']: p for p in (posts_result.data or [])}
+        posts = [posts_by_id[pid] for pid in post_ids if pid in posts_by_id]
+
+        cards = FeedHydrator.hydrate(posts, user_id, timings)
+        saved_at = {s['post_id']: s['saved_at'] for s in saved_rows}
+        for card in cards:
+            card['saved_at'] = saved_at.get(card['id'])
 
+        response = jsonify({
+            "posts": cards,
+            "page": page,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+        })
+        response.headers["Server-Timing"] = timings.to_header()
+        return response, 200
+
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
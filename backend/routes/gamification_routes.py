@@ -1,6 +1,13 @@
 # backend/routes/gamification_routes.py
 from flask import Blueprint, request, jsonify
 from supabase_client import supabase
+from services.rewards import RewardService, XP_PER_LEVEL
+from services.catalog import Catalog
+from services.gamification_events import gamification_events
+from services.badges import badge_engine  # registers badge evaluation on the event pipeline
+from services.leaderboard import leaderboard
+from services.follow_graph import follow_graph
+from routes.user_routes import service_token_required
 from datetime import datetime, date
 import uuid
 
@@ -39,51 +46,17 @@ def add_xp(user_id):
     data = request.get_json() or {}
     xp_amount = data.get('amount', 0)
 
-    if xp_amount <= 0:
+    if isinstance(xp_amount, bool) or not isinstance(xp_amount, int) or xp_amount <= 0:
         return jsonify({"error": "amount must be positive"}), 400
 
     try:
-        # Get current stats
-        current = supabase.table("user_gamification")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .execute()
-
-        if not current.data:
-            # Initialize
-            current_xp = 0
-            current_level = 1
-        else:
-            current_xp = current.data[0]['xp']
-            current_level = current.data[0]['level']
-
-        # Add XP
-        new_xp = current_xp + xp_amount
-
-        # Calculate new level (simple: every 100 XP = 1 level)
-        new_level = (new_xp // 100) + 1
-
-        # Update (NOTE: user_gamification table doesn't have updated_at column)
-        update_data = {
-            "xp": new_xp,
-            "level": new_level
-        }
-
-        if current.data:
-            supabase.table("user_gamification")\
-                .update(update_data)\
-                .eq("user_id", user_id)\
-                .execute()
-        else:
-            update_data["user_id"] = user_id
-            supabase.table("user_gamification").insert(update_data).execute()
-
-        level_up = new_level > current_level
+        # Atomic increment; level is recomputed from the new total in the same statement
+        result = RewardService.award(user_id, xp=xp_amount)
 
         return jsonify({
-            "xp": new_xp,
-            "level": new_level,
-            "level_up": level_up,
+            "xp": result["xp"],
+            "level": result["level"],
+            "level_up": result["level_up"],
             "xp_gained": xp_amount
         }), 200
 
@@ -96,29 +69,114 @@ def add_coins(user_id):
     data = request.get_json() or {}
     coin_amount = data.get('amount', 0)
 
-    if coin_amount <= 0:
+    if isinstance(coin_amount, bool) or not isinstance(coin_amount, int) or coin_amount <= 0:
         return jsonify({"error": "amount must be positive"}), 400
 
     try:
-        current = supabase.table("user_gamification")\
-            .select("coins")\
-            .eq("user_id", user_id)\
-            .execute()
+        result = RewardService.award(user_id, coins=coin_amount)
 
-        current_coins = current.data[0]['coins'] if current.data else 0
-        new_coins = current_coins + coin_amount
+        return jsonify({"coins": result["coins"], "coins_gained": coin_amount}), 200
 
-        # NOTE: user_gamification table doesn't have updated_at column
-        supabase.table("user_gamification")\
-            .update({"coins": new_coins})\
-            .eq("user_id", user_id)\
-            .execute()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@gamification_bp.route("/gamification/awards", methods=["POST"])
+@service_token_required
+def award_batch():
+    """
+    Award XP and/or coins to many users in one call (e.g. challenge payouts).
+    Internal callers only (X-Service-Token).
+    Body: {"awards": [{"user_id": "...", "xp": 50, "coins": 10}, ...]}
+    """
+    data = request.get_json() or {}
+    awards = data.get('awards')
 
-        return jsonify({"coins": new_coins, "coins_gained": coin_amount}), 200
+    if not isinstance(awards, list) or not awards:
+        return jsonify({"error": "awards required"}), 400
+
+    for award in awards:
+        if not isinstance(award, dict) or not award.get('user_id'):
+            return jsonify({"error": "each award needs a user_id"}), 400
+        amounts = [award.get('xp', 0), award.get('coins', 0)]
+        if any(isinstance(n, bool) or not isinstance(n, int) or n < 0 for n in amounts) or not any(amounts):
+            return jsonify({"error": "xp and coins must be non-negative and not both zero"}), 400
+
+    try:
+        results = RewardService.award_many(awards)
+        return jsonify({"results": results}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@gamification_bp.route("/gamification/events/stats", methods=["GET"])
+@service_token_required
+def get_event_pipeline_stats():
+    """Event pipeline metrics: queued, applied and duplicate events"""
+    return jsonify(gamification_events.stats()), 200
+
+def _with_profiles(entries: list) -> list:
+    """Attach username / profile_pic to leaderboard entries with one lookup"""
+    if not entries:
+        return entries
+    users_res = supabase.table("user")\
+        .select("id, username, profile_pic")\
+        .in_("id", [e["user_id"] for e in entries])\
+        .execute()
+    users_by_id = {u['id']: u for u in (users_res.data or [])}
+    for entry in entries:
+        user = users_by_id.get(entry["user_id"]) or {}
+        entry["username"] = user.get("username")
+        entry["profile_pic"] = user.get("profile_pic")
+    return entries
+
+@gamification_bp.route("/leaderboard", methods=["GET"])
+def get_leaderboard():
+    """
+    Top of the XP leaderboard.
+    Query params: limit (default 10, max 100), offset (default 0)
+    """
+    try:
+        limit = min(int(request.args.get("limit", 10)), 100)
+        offset = max(int(request.args.get("offset", 0)), 0)
+        entries = leaderboard.top(limit, offset)
+        return jsonify({"entries": _with_profiles(entries)}), 200
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@gamification_bp.route("/leaderboard/<user_id>", methods=["GET"])
+def get_leaderboard_rank(user_id):
+    """
+    A user's rank with the users just above and below them.
+    Query params: radius (default 2, max 25)
+    """
+    try:
+        radius = min(int(request.args.get("radius", 2)), 25)
+        result = leaderboard.rank(user_id)
+        result["around"] = _with_profiles(leaderboard.around(user_id, radius))
+        return jsonify(result), 200
+    except ValueError:
+        return jsonify({"error": "radius must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@gamification_bp.route("/leaderboard/<user_id>/friends", methods=["GET"])
+def get_friends_leaderboard(user_id):
+    """
+    Leaderboard of the user and the people they follow.
+    Query params: limit (default 50, max 200)
+    """
+    try:
+        limit = min(int(request.args.get("limit", 50)), 200)
+        entries = leaderboard.friends(user_id, follow_graph.following_set(user_id), limit)
+        rank = next((e["rank"] for e in entries if e["user_id"] == str(user_id)), None)
+        return jsonify({"rank": rank, "entries": _with_profiles(entries)}), 200
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @gamification_bp.route("/gamification/<user_id>/streak", methods=["POST"])
 def update_streak(user_id):
     """Update user's activity streak"""
@@ -185,8 +243,7 @@ def update_streak(user_id):
 def get_all_badges():
     """Get all available badges"""
     try:
-        result = supabase.table("badges").select("*").execute()
-        return jsonify({"badges": result.data or []}), 200
+        return jsonify({"badges": Catalog.badges()}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -199,17 +256,11 @@ def get_user_badges(user_id):
             .eq("user_id", user_id)\
             .execute()
 
-        badge_ids = [b['badge_id'] for b in (result.data or [])]
+        # Badge details come from the cached catalog
+        catalog = Catalog.badges_by_id()
+        badges = [catalog[b['badge_id']] for b in (result.data or []) if b['badge_id'] in catalog]
 
-        if not badge_ids:
-            return jsonify({"badges": []}), 200
-
-        badges_res = supabase.table("badges")\
-            .select("*")\
-            .in_("id", badge_ids)\
-            .execute()
-
-        return jsonify({"badges": badges_res.data or []}), 200
+        return jsonify({"badges": badges}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -218,16 +269,17 @@ def get_user_badges(user_id):
 def get_challenges():
     """Get active challenges"""
     try:
-        result = supabase.table("challenges")\
-            .select("*")\
-            .eq("is_active", True)\
-            .order("created_at", desc=True)\
-            .execute()
-
-        return jsonify({"challenges": result.data or []}), 200
+        return jsonify({"challenges": Catalog.active_challenges()}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@gamification_bp.route("/gamification/catalog/invalidate", methods=["POST"])
+@service_token_required
+def invalidate_catalog():
+    """Drop the cached badge and challenge catalogs after editing either table"""
+    Catalog.invalidate()
+    return jsonify({"message": "Catalog cache cleared"}), 200
+
 
 @gamification_bp.route("/rewards/summary", methods=["GET"])
 def get_rewards_summary():
@@ -257,38 +309,22 @@ def get_rewards_summary():
         if not user_id:
             # Return default data if no user specified
             return jsonify(default_summary), 200
-            
-        # Get user gamification stats
-        gamification_res = supabase.table("user_gamification")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .execute()
-        
-        if not gamification_res.data:
+
+        # Stats and earned badge ids in one round trip; badge details from the cached catalog
+        result = supabase.rpc("get_rewards_summary", {"p_user_id": user_id}).execute()
+        data = result.data or {}
+        stats = data.get("stats")
+
+        if not stats:
             return jsonify(default_summary), 200
-            
-        stats = gamification_res.data[0]
-        
-        # Get user badges
-        badges_res = supabase.table("user_badges")\
-            .select("badge_id, earned_at")\
-            .eq("user_id", user_id)\
-            .execute()
-        
-        badge_ids = [b['badge_id'] for b in (badges_res.data or [])]
-        badges = []
-        
-        if badge_ids:
-            badges_details = supabase.table("badges")\
-                .select("*")\
-                .in_("id", badge_ids)\
-                .execute()
-            badges = badges_details.data or []
-        
+
+        catalog = Catalog.badges_by_id()
+        badges = [catalog[b['badge_id']] for b in (data.get("badges") or []) if b['badge_id'] in catalog]
+
         # Calculate next level XP (simple: 100 XP per level)
         current_level = stats.get('level', 1)
-        next_level_xp = current_level * 100
-        
+        next_level_xp = current_level * XP_PER_LEVEL
+
         summary = {
             "xp": stats.get('xp', 0),
             "level": current_level,
@@ -301,7 +337,7 @@ def get_rewards_summary():
             },
             "badges": badges
         }
-        
+
         return jsonify(summary), 200
         
     except Exception as e:
@@ -1,10 +1,32 @@
 # backend/routes/ingredient_prices_routes.py
 
+import math
 from flask import Blueprint, request, jsonify
 from supabase_client import supabase
+from services.cost_engine import CostEngine
+from services.geo import parse_location
+from services.ingredient_prices import IngredientPriceLookup
+from services.price_catalog import price_catalog
+from services.units import parse_amount
 
 ingredient_prices_bp = Blueprint("ingredient_prices", __name__)
 
+MAX_RECIPES = 200
+MAX_RADIUS_KM = 200.0
+
+
+def _resolve_prices(names: list, near=None, **kwargs) -> list:
+    """
+    Price row (or None) per name from the in-memory catalog, the cheapest
+    nearby offer when `near` is given; only if the catalog can't be loaded
+    fall back to one database round trip for the whole list
+    """
+    try:
+        return price_catalog.match_many(names, near, **kwargs)
+    except Exception:
+        return IngredientPriceLookup.match(names)
+
+
 @ingredient_prices_bp.route("/ingredient-prices/estimate", methods=["POST"])
 def estimate_ingredient_prices():
     """
@@ -15,28 +37,52 @@ def estimate_ingredient_prices():
         { "name": "broccoli", "quantity": 1, "unit": "head" }
       ],
       "max_budget": 25.0,         # optional
-      "location": "Anaheim, CA"   # optional (not used yet, but future-friendly)
+      "location": { "lat": 33.83, "lng": -117.91 },  # optional, or "33.83,-117.91"
+      "radius_km": 25             # optional, with location
     }
+
+    With a location, each ingredient is priced at the cheapest of the
+    nearest stores that stock it (see PriceCatalog) and items carry
+    distance_km. A location that isn't coordinates (e.g. "Anaheim, CA")
+    is ignored.
     """
     data = request.get_json() or {}
 
     ingredients = data.get("ingredients")
     max_budget = data.get("max_budget")
-    location = data.get("location")  # you can use this later to filter by region
+    near = parse_location(data.get("location"))
+    radius_km = data.get("radius_km")
 
     # Basic validation
     if not isinstance(ingredients, list) or len(ingredients) == 0:
         return jsonify({"error": "ingredients must be a non-empty list"}), 400
+    if radius_km is not None and (isinstance(radius_km, bool) or not isinstance(radius_km, (int, float))
+                                  or not 0 < radius_km <= MAX_RADIUS_KM):
+        return jsonify({"error": f"radius_km must be between 0 and {MAX_RADIUS_KM:g}"}), 400
 
     items = []
     total_cost = 0.0
     currency = "USD"
 
+    parsed = []
+    priced = []  # (response item, cost line) for items with a usable price
     for raw in ingredients:
         name = (raw.get("name") or "").strip()
-        quantity = float(raw.get("quantity") or 1.0)
+        quantity = parse_amount(raw.get("quantity")) or 1.0  # accepts "1/2", "1 1/2", "2-3"
         unit = raw.get("unit")
-
+        parsed.append((name, quantity, unit))
+
+    # Resolve every named ingredient at once
+    named = [name for name, _, _ in parsed if name]
+    lookup_error = None
+    try:
+        options = {"radius_km": float(radius_km)} if radius_km is not None else {}
+        matches = iter(_resolve_prices(named, near, **options))
+    except Exception as e:
+        # If Supabase is unhappy, return partial info but don’t crash
+        lookup_error = e
+
+    for name, quantity, unit in parsed:
         if not name:
             items.append({
                 "ingredient_name": name,
@@ -47,35 +93,18 @@ def estimate_ingredient_prices():
             })
             continue
 
-        # Query Supabase table `ingredient_prices`
-        # Adjust table/column names here if your schema is slightly different
-        try:
-            query = (
-                supabase
-                .table("ingredient_prices")
-                .select("*")
-                .ilike("ingredient_name", f"%{name}%")
-                .limit(1)
-            )
-
-            # If later you add a region column, you can narrow by location here
-            # if location:
-            #     query = query.eq("region", location_region)
-
-            result = query.execute()
-            rows = result.data or []
-        except Exception as e:
-            # If Supabase is unhappy, return partial info but don’t crash
+        if lookup_error is not None:
             items.append({
                 "ingredient_name": name,
                 "quantity": quantity,
                 "unit": unit,
                 "found": False,
-                "message": f"Error querying prices: {str(e)}"
+                "message": f"Error querying prices: {str(lookup_error)}"
             })
             continue
 
-        if not rows:
+        row = next(matches)
+        if row is None:
             # No price data found
             items.append({
                 "ingredient_name": name,
@@ -86,14 +115,8 @@ def estimate_ingredient_prices():
             })
             continue
 
-        row = rows[0]
         price_per_unit = float(row.get("price_per_unit") or 0.0)
         row_unit = row.get("unit")
-        store_name = row.get("store_name")
-        store_location = row.get("store_location")
-        row_currency = row.get("currency") or "USD"
-        last_updated = row.get("last_updated")
-        source_url = row.get("source_url")
 
         if price_per_unit <= 0:
             items.append({
@@ -105,23 +128,41 @@ def estimate_ingredient_prices():
             })
             continue
 
-        estimated_cost = price_per_unit * quantity
-        total_cost += estimated_cost
-        currency = row_currency  # if mixed currencies, you could handle that later
-
-        items.append({
+        item = {
             "ingredient_name": name,
             "quantity": quantity,
             "unit": unit or row_unit,
             "found": True,
-            "store_name": store_name,
-            "store_location": store_location,
+            "store_name": row.get("store_name"),
+            "store_location": row.get("store_location"),
             "price_per_unit": price_per_unit,
-            "currency": row_currency,
-            "estimated_cost": estimated_cost,
-            "source_url": source_url,
-            "last_updated": last_updated,
-        })
+            "price_unit": row_unit,
+            "currency": row.get("currency") or "USD",
+            "source_url": row.get("source_url"),
+            "last_updated": row.get("last_updated"),
+        }
+        if near is not None:
+            item["distance_km"] = row.get("distance_km")  # None: no stocking store within the radius
+        items.append(item)
+        priced.append((item, {"name": name, "amount": quantity, "unit": unit, "price": row}))
+
+    # Convert units and price every found item in one vectorized pass
+    costs = CostEngine.line_costs([line for _, line in priced])
+    for (item, line), cost in zip(priced, costs):
+        if math.isnan(cost):
+            # The recipe unit can't be converted to the price's unit for this ingredient
+            item.clear()
+            item.update({
+                "ingredient_name": line["name"],
+                "quantity": line["amount"],
+                "unit": line["unit"],
+                "found": False,
+                "message": f"Cannot convert {line['unit']} to {line['price'].get('unit')} for this ingredient"
+            })
+            continue
+        item["estimated_cost"] = float(cost)
+        total_cost += float(cost)
+        currency = item["currency"]  # if mixed currencies, you could handle that later
 
     response = {
         "items": items,
@@ -146,3 +187,48 @@ def estimate_ingredient_prices():
         }
 
     return jsonify(response), 200
+
+
+@ingredient_prices_bp.route("/ingredient-prices/recipes/estimate", methods=["POST"])
+def estimate_recipe_costs():
+    """
+    Price many recipes in one call (a feed page, a meal plan).
+
+    Request body (either or both):
+    {
+      "post_ids": ["<recipe post uuid>", ...],
+      "recipes": [{ "id": "plan-day-1", "ingredients": [{ "item": "flour", "amount": "1 1/2", "unit": "cups" }] }]
+    }
+
+    Returns {"recipes": [{"id", "total_cost", "priced", "unpriced", "currency"}, ...]}
+    with post_ids first, in request order.
+    """
+    data = request.get_json() or {}
+    post_ids = data.get("post_ids") or []
+    recipes = data.get("recipes") or []
+
+    if not isinstance(post_ids, list) or not isinstance(recipes, list):
+        return jsonify({"error": "post_ids and recipes must be lists"}), 400
+    if not post_ids and not recipes:
+        return jsonify({"error": "post_ids or recipes is required"}), 400
+    if len(post_ids) + len(recipes) > MAX_RECIPES:
+        return jsonify({"error": f"At most {MAX_RECIPES} recipes per request"}), 400
+    if not all(isinstance(r, dict) for r in recipes):
+        return jsonify({"error": "each recipe must be an object"}), 400
+
+    try:
+        batch = []
+        if post_ids:
+            res = supabase.table("posts")\
+                .select("id, recipe_data")\
+                .in_("id", post_ids)\
+                .execute()
+            found = {p["id"]: p.get("recipe_data") or {} for p in (res.data or [])}
+            batch.extend(
+                {"id": pid, "ingredients": found[pid].get("ingredients")} for pid in post_ids if pid in found
+            )
+        batch.extend({"id": r.get("id"), "ingredients": r.get("ingredients")} for r in recipes)
+
+        return jsonify({"recipes": CostEngine.recipe_costs(batch, _resolve_prices)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,8 +1,10 @@
 # backend/routes/messages_routes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from supabase_client import supabase
 from datetime import datetime
 import uuid
+from services.pagination import paginate, split_page, InvalidCursor
+from services.message_broker import get_broker, conversation_channel, format_sse
 
 messages_bp = Blueprint("messages", __name__)
 
@@ -15,41 +17,19 @@ def create_conversation():
 
     if not user_id or not other_user_id:
         return jsonify({"error": "user_id and other_user_id required"}), 400
+    if str(user_id).lower() == str(other_user_id).lower():
+        return jsonify({"error": "Cannot start a conversation with yourself"}), 400
 
     try:
-        # Check if conversation already exists between these users
-        # Get all conversations for user_id
-        user_convos = supabase.table("conversation_participants")\
-            .select("conversation_id")\
-            .eq("user_id", user_id)\
-            .execute()
-
-        convo_ids = [c['conversation_id'] for c in (user_convos.data or [])]
-
-        if convo_ids:
-            # Check if other_user is in any of these conversations
-            other_user_convos = supabase.table("conversation_participants")\
-                .select("conversation_id")\
-                .eq("user_id", other_user_id)\
-                .in_("conversation_id", convo_ids)\
-                .execute()
-
-            if other_user_convos.data:
-                # Conversation exists
-                existing_convo_id = other_user_convos.data[0]['conversation_id']
-                return jsonify({"conversation_id": existing_convo_id, "created": False}), 200
-
-        # Create new conversation
-        convo_res = supabase.table("conversations").insert({}).execute()
-        convo_id = convo_res.data[0]['id']
-
-        # Add both users as participants
-        supabase.table("conversation_participants").insert([
-            {"conversation_id": convo_id, "user_id": user_id},
-            {"conversation_id": convo_id, "user_id": other_user_id}
-        ]).execute()
+        # Atomic get-or-create keyed on the ordered user pair (conversations.dm_key)
+        result = supabase.rpc("get_or_create_dm", {
+            "p_user_id": user_id,
+            "p_other_user_id": other_user_id
+        }).execute()
 
-        return jsonify({"conversation_id": convo_id, "created": True}), 201
+        convo = result.data[0]
+        status = 201 if convo['created'] else 200
+        return jsonify({"conversation_id": convo['conversation_id'], "created": convo['created']}), status
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -88,20 +68,25 @@ def send_message(conversation_id):
             .eq("id", conversation_id)\
             .execute()
 
-        return jsonify(message_res.data[0]), 201
+        message = message_res.data[0]
+        get_broker().publish(conversation_channel(conversation_id), {
+            "type": "message",
+            "id": message.get('id'),
+            "data": message
+        })
+
+        return jsonify(message), 201
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @messages_bp.route("/conversations/<conversation_id>/messages", methods=["GET"])
 def get_messages(conversation_id):
-    """Get all messages in a conversation"""
+    """
+    Get all messages in a conversation, oldest first.
+    Query params: cursor (preferred) or page, and per_page (default 50)
+    """
     user_id = request.args.get('user_id')  # TODO: Get from JWT
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 50))
-
-    start = (page - 1) * per_page
-    end = start + per_page - 1
 
     try:
         # Verify user is participant
@@ -116,98 +101,48 @@ def get_messages(conversation_id):
                 return jsonify({"error": "Unauthorized"}), 403
 
         # Get messages
-        messages_res = supabase.table("messages")\
-            .select("*")\
-            .eq("conversation_id", conversation_id)\
-            .order("created_at", desc=False)\
-            .range(start, end)\
-            .execute()
+        query, page, per_page = paginate(
+            supabase.table("messages").select("*").eq("conversation_id", conversation_id),
+            request.args,
+            desc=False,
+            default_per_page=50,
+        )
+        messages, next_cursor = split_page(query.execute().data, per_page)
 
         return jsonify({
-            "messages": messages_res.data or [],
+            "messages": messages,
             "page": page,
-            "per_page": per_page
+            "per_page": per_page,
+            "next_cursor": next_cursor
         }), 200
 
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @messages_bp.route("/conversations", methods=["GET"])
 def get_user_conversations():
-    """Get all conversations for current user"""
+    """
+    Get all conversations for current user, most recently active first.
+    The whole inbox (participants, last message and unread count for every
+    conversation) comes back from the get_user_inbox RPC in one round trip.
+    """
     user_id = request.args.get('user_id')  # TODO: Get from JWT
 
     if not user_id:
         return jsonify({"error": "user_id required"}), 400
 
     try:
-        # Get conversation IDs for user
-        participant_res = supabase.table("conversation_participants")\
-            .select("conversation_id")\
-            .eq("user_id", user_id)\
-            .execute()
-
-        convo_ids = [p['conversation_id'] for p in (participant_res.data or [])]
-
-        if not convo_ids:
-            return jsonify({"conversations": []}), 200
-
-        # Get conversation details
-        convos_res = supabase.table("conversations")\
-            .select("*")\
-            .in_("id", convo_ids)\
-            .order("updated_at", desc=True)\
-            .execute()
-
-        conversations = []
-        for convo in (convos_res.data or []):
-            convo_id = convo['id']
-
-            # Get other participants
-            participants_res = supabase.table("conversation_participants")\
-                .select("user_id")\
-                .eq("conversation_id", convo_id)\
-                .neq("user_id", user_id)\
-                .execute()
-
-            other_user_ids = [p['user_id'] for p in (participants_res.data or [])]
-
-            # Get last message
-            last_msg_res = supabase.table("messages")\
-                .select("*")\
-                .eq("conversation_id", convo_id)\
-                .order("created_at", desc=True)\
-                .limit(1)\
-                .execute()
-
-            last_message = last_msg_res.data[0] if last_msg_res.data else None
+        inbox_res = supabase.rpc("get_user_inbox", {"p_user_id": user_id}).execute()
 
-            # Get unread count
-            last_read_res = supabase.table("conversation_participants")\
-                .select("last_read_at")\
-                .eq("conversation_id", convo_id)\
-                .eq("user_id", user_id)\
-                .execute()
-
-            last_read_at = last_read_res.data[0]['last_read_at'] if last_read_res.data else None
-
-            unread_count = 0
-            if last_read_at and last_message:
-                unread_res = supabase.table("messages")\
-                    .select("id", count="exact")\
-                    .eq("conversation_id", convo_id)\
-                    .neq("sender_id", user_id)\
-                    .gt("created_at", last_read_at)\
-                    .execute()
-                unread_count = unread_res.count or 0
-
-            conversations.append({
-                "id": convo_id,
-                "other_user_ids": other_user_ids,
-                "last_message": last_message,
-                "unread_count": unread_count,
-                "updated_at": convo['updated_at']
-            })
+        conversations = [{
+            "id": row['id'],
+            "other_user_ids": row.get('other_user_ids') or [],
+            "last_message": row.get('last_message'),
+            "unread_count": row.get('unread_count') or 0,
+            "updated_at": row['updated_at']
+        } for row in (inbox_res.data or [])]
 
         return jsonify({"conversations": conversations}), 200
 
@@ -224,13 +159,68 @@ def mark_conversation_read(conversation_id):
         return jsonify({"error": "user_id required"}), 400
 
     try:
+        last_read_at = datetime.utcnow().isoformat()
         supabase.table("conversation_participants")\
-            .update({"last_read_at": datetime.utcnow().isoformat()})\
+            .update({"last_read_at": last_read_at, "unread_count": 0})\
             .eq("conversation_id", conversation_id)\
             .eq("user_id", user_id)\
             .execute()
 
+        # Read receipt for the other participants' open streams
+        get_broker().publish(conversation_channel(conversation_id), {
+            "type": "read",
+            "data": {"user_id": user_id, "last_read_at": last_read_at}
+        })
+
         return jsonify({"message": "Marked as read"}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+STREAM_HEARTBEAT_SECONDS = 15
+
+@messages_bp.route("/conversations/<conversation_id>/stream", methods=["GET"])
+def stream_conversation(conversation_id):
+    """
+    Server-Sent Events stream of new messages and read receipts.
+    Emits `message` events (the inserted message row) and `read` events
+    ({user_id, last_read_at}); a comment line is sent every
+    STREAM_HEARTBEAT_SECONDS to keep proxies from closing the connection.
+    """
+    user_id = request.args.get('user_id')  # TODO: Get from JWT
+
+    if not user_id:
+        return jsonify({"error": "user_id required"}), 400
+
+    try:
+        participant_check = supabase.table("conversation_participants")\
+            .select("user_id")\
+            .eq("conversation_id", conversation_id)\
+            .eq("user_id", user_id)\
+            .execute()
+
+        if not participant_check.data:
+            return jsonify({"error": "Unauthorized"}), 403
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    subscription = get_broker().subscribe(conversation_channel(conversation_id))
+
+    def events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                event = subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            subscription.close()
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -2,7 +2,16 @@
 from flask import Blueprint, request, jsonify, g
 from supabase_client import supabase
 from services.storage_service import StorageService
+from services.feed_hydration import FeedHydrator, StageTimings
+from services.pagination import paginate, split_page, encode_cursor, decode_cursor, InvalidCursor
+from services.home_timeline import HomeTimeline
+from services.feed_cache import FeedCache
+from services.trending import trending
+from services.gamification_events import gamification_events, POST_CREATED, RECIPE_POSTED
+from services.recipe_costs import recipe_costs
 from routes.user_routes import jwt_required, get_user_id_from_jwt
+from services.known_posts import known_posts
+import logging
 import uuid
 
 posts_bp = Blueprint("posts", __name__)
@@ -49,122 +58,97 @@ def list_posts():
     except Exception as e:
         return jsonify({"Error": str(e)}), 500
 
+def _fetch_posts_in_order(post_ids: list) -> list:
+    """Feed columns for post_ids, in the order given"""
+    if not post_ids:
+        return []
+    res = supabase.table("posts")\
+        .select(FeedHydrator.POST_COLUMNS)\
+        .in_("id", post_ids)\
+        .execute()
+    posts_by_id = {p['id']: p for p in (res.data or [])}
+    return [posts_by_id[pid] for pid in post_ids if pid in posts_by_id]
+
 @posts_bp.route("/feed", methods=["GET"])
 @jwt_required
 def get_feed():
+    """
+    Feed, newest first (or by trending score).
+    Query params:
+      - mode: "global" (default), "following" (posts from followed users, cursor only)
+        or "trending" (time-decayed engagement ranking; its cursor is a rank offset)
+      - cursor: opaque next_cursor from a previous response (preferred)
+      - page: page number when no cursor is given (default 1)
+      - per_page: results per page (default 10)
+    """
     try:
-        page = int(request.args.get("page", 1))
-        per_page = int(request.args.get("per_page", 10))
+        timings = StageTimings()
 
         # Get user_id from JWT token
-        user_id, error = get_user_id_from_jwt()
+        with timings.stage("auth"):
+            user_id, error = get_user_id_from_jwt()
         if error:
             return error
 
-        start = (page - 1) * per_page
-        end = start + per_page - 1
+        page = int(request.args.get("page", 1))
+        per_page = int(request.args.get("per_page", 10))
+        cursor = request.args.get("cursor")
 
         # Get posts
-        posts_res = (
-            supabase.table("posts")
-            .select("id, user_id, image_url, created_at, caption, post_type, recipe_data")
-            .order("created_at", desc=True)
-            .range(start, end)
-            .execute()
-        )
-
-        posts = posts_res.data or []
-
-        if not posts:
-            return jsonify({
-                "page": page,
-                "per_page": per_page,
-                "feed": []
-            }), 200
-
-        post_ids = [p['id'] for p in posts]
-        user_ids = list({p.get("user_id") for p in posts if p.get("user_id")})
-
-        # Get user info
-        users_res = (
-            supabase.table("user")
-            .select("id, username, profile_pic")
-            .in_("id", user_ids)
-            .execute()
-        )
-        users_by_id = {u["id"]: u for u in (users_res.data or [])}
-
-        # Get engagement counts - aggregate by post_id
-        likes_res = supabase.table("likes")\
-            .select("post_id")\
-            .in_("post_id", post_ids)\
-            .execute()
-
-        likes_count = {}
-        for like in (likes_res.data or []):
-            post_id = like['post_id']
-            likes_count[post_id] = likes_count.get(post_id, 0) + 1
-
-        comments_res = supabase.table("comments")\
-            .select("post_id")\
-            .in_("post_id", post_ids)\
-            .execute()
-
-        comments_count = {}
-        for comment in (comments_res.data or []):
-            post_id = comment['post_id']
-            comments_count[post_id] = comments_count.get(post_id, 0) + 1
-
-        # Get user-specific engagement status
-        user_likes = {}
-        user_saves = {}
-        if user_id:
-            user_likes_res = supabase.table("likes")\
-                .select("post_id")\
-                .eq("user_id", user_id)\
-                .in_("post_id", post_ids)\
-                .execute()
-            user_likes = {like['post_id']: True for like in (user_likes_res.data or [])}
-
-            user_saves_res = supabase.table("saved_posts")\
-                .select("post_id")\
-                .eq("user_id", user_id)\
-                .in_("post_id", post_ids)\
-                .execute()
-            user_saves = {save['post_id']: True for save in (user_saves_res.data or [])}
-
-        # Build feed response
-        feed = []
-        for post in posts:
-            user = users_by_id.get(post["user_id"])
-
-            feed_item = {
-                "id": post["id"],
-                "image_url": post["image_url"],
-                "caption": post["caption"],
-                "post_type": post.get("post_type", "simple"),
-                "recipe_data": post.get("recipe_data"),
-                "created_at": post["created_at"],
-                "user": {
-                    "id": post["user_id"],
-                    "username": user["username"] if user else "Unknown",
-                    "profile_pic": user.get("profile_pic") if user else None,
-                },
-                "engagement": {
-                    "likes_count": likes_count.get(post["id"], 0),
-                    "comments_count": comments_count.get(post["id"], 0),
-                    "is_liked": user_likes.get(post["id"], False),
-                    "is_saved": user_saves.get(post["id"], False)
-                }
-            }
-            feed.append(feed_item)
-
-        return jsonify({
+        mode = request.args.get("mode")
+        if mode == "trending":
+            # Ranked in memory from engagement events; the ranking moves, so it pages by offset
+            if cursor:
+                offset = decode_cursor(cursor, ("offset",))[0]
+                if not offset.isdigit():
+                    raise InvalidCursor("Invalid cursor")
+                offset = int(offset)
+            else:
+                offset = (max(page, 1) - 1) * per_page
+            with timings.stage("trending"):
+                post_ids = trending.top(offset, per_page + 1)
+            next_cursor = None
+            if len(post_ids) > per_page:
+                post_ids = post_ids[:per_page]
+                next_cursor = encode_cursor({"offset": str(offset + per_page)}, ("offset",))
+            with timings.stage("posts"):
+                posts = _fetch_posts_in_order(post_ids)
+            cards = FeedCache.shared_cards(posts, timings)
+        elif mode == "following":
+            after = decode_cursor(cursor, ("created_at", "id")) if cursor else None
+
+            with timings.stage("timeline"):
+                entries, next_cursor = HomeTimeline.read(user_id, after, per_page)
+            with timings.stage("posts"):
+                posts = _fetch_posts_in_order([e["id"] for e in entries])
+            cards = FeedCache.shared_cards(posts, timings)
+        else:
+            def load_page():
+                with timings.stage("posts"):
+                    query, _, _ = paginate(
+                        supabase.table("posts").select(FeedHydrator.POST_COLUMNS),
+                        request.args,
+                        default_per_page=10,
+                    )
+                    return split_page(query.execute().data, per_page)
+
+            # The global page is the same for everyone; only the overlay below is per viewer
+            cards, next_cursor = FeedCache.page(("global", cursor or page, per_page), load_page, timings)
+
+        feed = FeedCache.personalize(cards, user_id, timings)
+
+        response = jsonify({
             "page": page,
             "per_page": per_page,
             "feed": feed,
-        }), 200
-
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor,
+        })
+        response.headers["Server-Timing"] = timings.to_header()
+        return response, 200
+
+    except InvalidCursor as e:
+        return jsonify({"Error": str(e)}), 400
     except Exception as e:
         return jsonify({"Error": str(e)}), 500
 
@@ -215,6 +199,11 @@ def delete_post(post_id):
         if not res.data:
             return jsonify({"Error": "Post not found"}), 404
 
+        FeedCache.invalidate_post(post_id)
+        known_posts.invalidate(post_id)
+        trending.remove(post_id)
+        recipe_costs.forget(post_id)
+
         return jsonify({"Message": "Delete post successfully."}), 200
 
     except Exception as e:
@@ -293,10 +282,25 @@ def create_post_with_data():
 
         if recipe_data:
             post_data["recipe_data"] = recipe_data
+            try:
+                # Price it now if the catalog is loaded, so feeds read the cost with the post
+                post_data.update(recipe_costs.price_fields(recipe_data))
+            except Exception as e:
+                logging.error(f"Pricing recipe failed, will retry in the background: {e}")
 
         response = supabase.table("posts").insert(post_data).execute()
+        post = response.data[0]
+        if post_type == 'recipe':
+            recipe_costs.track(post)
+
+        # Push into followers' home timelines without holding up the response
+        HomeTimeline.publish(post)
+        FeedCache.invalidate_pages()
+        gamification_events.emit(POST_CREATED, f"post:{post['id']}", user_id=post["user_id"], post_id=post["id"])
+        if post_type == 'recipe':
+            gamification_events.emit(RECIPE_POSTED, f"recipe:{post['id']}", user_id=post["user_id"], post_id=post["id"])
 
-        return jsonify(response.data[0]), 201
+        return jsonify(post), 201
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -331,180 +335,66 @@ def upload_post_image():
         return jsonify({"error": "Upload failed"}), 500
 
 
+def _like_pattern(q: str) -> str:
+    """Substring ILIKE pattern for q, with LIKE wildcards in q matched literally"""
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
 @posts_bp.route("/posts/search", methods=["GET"])
 @jwt_required
 def search_posts():
     """
     Search posts by keyword.
     Searches through caption and recipe_data (title, ingredients, tags, cuisine).
+    Matching runs in Postgres against posts.search_text, a generated column
+    with a trigram GIN index, so only the requested page leaves the database.
     Query params:
       - q: search query (required)
-      - page: page number (default 1)
+      - cursor: opaque next_cursor from a previous response (preferred)
+      - page: page number when no cursor is given (default 1)
       - per_page: results per page (default 20)
     """
     query = request.args.get("q", "").strip().lower()
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 20))
 
     if not query:
         return jsonify({"error": "Search query 'q' is required"}), 400
 
+    timings = StageTimings()
+
     # Get user_id from JWT token for engagement status
-    user_id, error = get_user_id_from_jwt()
+    with timings.stage("auth"):
+        user_id, error = get_user_id_from_jwt()
     if error:
         return error
 
     try:
-        # Fetch all posts
-        posts_res = (
-            supabase.table("posts")
-            .select("id, user_id, image_url, created_at, caption, post_type, recipe_data")
-            .order("created_at", desc=True)
-            .execute()
-        )
-
-        all_posts = posts_res.data or []
-
-        # Filter posts by search query
-        def matches_query(post, q):
-            # Search in caption
-            caption = (post.get("caption") or "").lower()
-            if q in caption:
-                return True
-
-            # Search in recipe_data if it exists
-            recipe_data = post.get("recipe_data")
-            if recipe_data:
-                # Search in title
-                title = (recipe_data.get("title") or "").lower()
-                if q in title:
-                    return True
-
-                # Search in cuisine
-                cuisine = (recipe_data.get("cuisine") or "").lower()
-                if q in cuisine:
-                    return True
-
-                # Search in ingredients
-                ingredients = recipe_data.get("ingredients") or []
-                for ing in ingredients:
-                    if isinstance(ing, dict):
-                        item = (ing.get("item") or "").lower()
-                        if q in item:
-                            return True
-                    elif isinstance(ing, str):
-                        if q in ing.lower():
-                            return True
-
-                # Search in tags
-                tags = recipe_data.get("tags") or []
-                for tag in tags:
-                    if isinstance(tag, str) and q in tag.lower():
-                        return True
-
-            return False
-
-        filtered_posts = [p for p in all_posts if matches_query(p, query)]
-
-        # Paginate results
-        total_count = len(filtered_posts)
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_posts = filtered_posts[start:end]
-
-        if not paginated_posts:
-            return jsonify({
-                "page": page,
-                "per_page": per_page,
-                "total": total_count,
-                "has_more": False,
-                "results": []
-            }), 200
-
-        # Get user info for the filtered posts
-        post_ids = [p['id'] for p in paginated_posts]
-        user_ids = list({p.get("user_id") for p in paginated_posts if p.get("user_id")})
-
-        users_res = (
-            supabase.table("user")
-            .select("id, username, profile_pic")
-            .in_("id", user_ids)
-            .execute()
-        )
-        users_by_id = {u["id"]: u for u in (users_res.data or [])}
-
-        # Get engagement counts
-        likes_res = supabase.table("likes")\
-            .select("post_id")\
-            .in_("post_id", post_ids)\
-            .execute()
-
-        likes_count = {}
-        for like in (likes_res.data or []):
-            post_id = like['post_id']
-            likes_count[post_id] = likes_count.get(post_id, 0) + 1
+        with timings.stage("posts"):
+            posts_query, page, per_page = paginate(
+                supabase.table("posts")
+                .select(FeedHydrator.POST_COLUMNS, count="exact")
+                .ilike("search_text", _like_pattern(query)),
+                request.args,
+            )
+            posts_res = posts_query.execute()
+            paginated_posts, next_cursor = split_page(posts_res.data, per_page)
 
-        comments_res = supabase.table("comments")\
-            .select("post_id")\
-            .in_("post_id", post_ids)\
-            .execute()
+        total_count = posts_res.count or 0
 
-        comments_count = {}
-        for comment in (comments_res.data or []):
-            post_id = comment['post_id']
-            comments_count[post_id] = comments_count.get(post_id, 0) + 1
-
-        # Get user-specific engagement status
-        user_likes = {}
-        user_saves = {}
-        if user_id:
-            user_likes_res = supabase.table("likes")\
-                .select("post_id")\
-                .eq("user_id", user_id)\
-                .in_("post_id", post_ids)\
-                .execute()
-            user_likes = {like['post_id']: True for like in (user_likes_res.data or [])}
-
-            user_saves_res = supabase.table("saved_posts")\
-                .select("post_id")\
-                .eq("user_id", user_id)\
-                .in_("post_id", post_ids)\
-                .execute()
-            user_saves = {save['post_id']: True for save in (user_saves_res.data or [])}
-
-        # Build response
-        results = []
-        for post in paginated_posts:
-            user = users_by_id.get(post["user_id"])
-
-            result_item = {
-                "id": post["id"],
-                "image_url": post["image_url"],
-                "caption": post["caption"],
-                "post_type": post.get("post_type", "simple"),
-                "recipe_data": post.get("recipe_data"),
-                "created_at": post["created_at"],
-                "user": {
-                    "id": post["user_id"],
-                    "username": user["username"] if user else "Unknown",
-                    "profile_pic": user.get("profile_pic") if user else None,
-                },
-                "engagement": {
-                    "likes_count": likes_count.get(post["id"], 0),
-                    "comments_count": comments_count.get(post["id"], 0),
-                    "is_liked": user_likes.get(post["id"], False),
-                    "is_saved": user_saves.get(post["id"], False)
-                }
-            }
-            results.append(result_item)
+        results = FeedHydrator.hydrate(paginated_posts, user_id, timings)
 
-        return jsonify({
+        response = jsonify({
             "page": page,
             "per_page": per_page,
             "total": total_count,
-            "has_more": end < total_count,
+            "has_more": next_cursor is not None,
+            "next_cursor": next_cursor,
             "results": results
-        }), 200
+        })
+        response.headers["Server-Timing"] = timings.to_header()
+        return response, 200
 
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -2,6 +2,10 @@
 from flask import Blueprint, request, jsonify
 from supabase_client import supabase
 import uuid
+from services.follow_graph import follow_graph
+from services.home_timeline import HomeTimeline
+from services.gamification_events import gamification_events, FOLLOW_GAINED, FOLLOW_MADE
+from routes.user_routes import service_token_required
 
 social_bp = Blueprint("social", __name__)
 
@@ -28,6 +32,10 @@ def follow_user(user_id):
             "follower_id": follower_id,
             "following_id": user_id  # Actual DB column name
         }).execute()
+        follow_graph.add_edge(follower_id, user_id)
+        HomeTimeline.backfill(follower_id, user_id)
+        gamification_events.emit(FOLLOW_GAINED, f"follow:{follower_id}:{user_id}", user_id=user_id, actor_id=follower_id)
+        gamification_events.emit(FOLLOW_MADE, f"follows:{follower_id}:{user_id}", user_id=follower_id)
 
         return jsonify({"following": True, "message": "User followed"}), 201
 
@@ -51,36 +59,39 @@ def unfollow_user(user_id):
             .eq("follower_id", follower_id)\
             .eq("following_id", user_id)\
             .execute()
+        follow_graph.remove_edge(follower_id, user_id)
 
         return jsonify({"following": False, "message": "User unfollowed"}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _user_summaries(user_ids: list) -> list:
+    """Profile rows for user_ids, in the same order"""
+    if not user_ids:
+        return []
+    users_res = supabase.table("user")\
+        .select("id, username, display_name, profile_pic")\
+        .in_("id", user_ids)\
+        .execute()
+    users_by_id = {u['id']: u for u in (users_res.data or [])}
+    return [users_by_id[uid] for uid in user_ids if uid in users_by_id]
+
 @social_bp.route("/users/<user_id>/followers", methods=["GET"])
 def get_followers(user_id):
-    """Get list of followers for a user"""
+    """
+    Get list of followers for a user
+    Query params: offset (default 0), limit (default: all)
+    """
     try:
-        # Get follower IDs
-        followers_res = supabase.table("followers")\
-            .select("follower_id")\
-            .eq("following_id", user_id)\
-            .execute()
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit', type=int)
 
-        follower_ids = [f['follower_id'] for f in (followers_res.data or [])]
-
-        if not follower_ids:
-            return jsonify({"followers": [], "count": 0}), 200
-
-        # Get user info for followers
-        users_res = supabase.table("user")\
-            .select("id, username, display_name, profile_pic")\
-            .in_("id", follower_ids)\
-            .execute()
+        follower_ids = follow_graph.followers(user_id, offset, limit)
 
         return jsonify({
-            "followers": users_res.data or [],
-            "count": len(users_res.data or [])
+            "followers": _user_summaries(follower_ids),
+            "count": follow_graph.followers_count(user_id)
         }), 200
 
     except Exception as e:
@@ -88,28 +99,19 @@ def get_followers(user_id):
 
 @social_bp.route("/users/<user_id>/following", methods=["GET"])
 def get_following(user_id):
-    """Get list of users that this user follows"""
+    """
+    Get list of users that this user follows
+    Query params: offset (default 0), limit (default: all)
+    """
     try:
-        # Get followed user IDs
-        following_res = supabase.table("followers")\
-            .select("following_id")\
-            .eq("follower_id", user_id)\
-            .execute()
-
-        followed_ids = [f['following_id'] for f in (following_res.data or [])]
-
-        if not followed_ids:
-            return jsonify({"following": [], "count": 0}), 200
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit', type=int)
 
-        # Get user info
-        users_res = supabase.table("user")\
-            .select("id, username, display_name, profile_pic")\
-            .in_("id", followed_ids)\
-            .execute()
+        followed_ids = follow_graph.following(user_id, offset, limit)
 
         return jsonify({
-            "following": users_res.data or [],
-            "count": len(users_res.data or [])
+            "following": _user_summaries(followed_ids),
+            "count": follow_graph.following_count(user_id)
         }), 200
 
     except Exception as e:
@@ -119,13 +121,7 @@ def get_following(user_id):
 def check_following_status(user_id, target_id):
     """Check if user_id follows target_id"""
     try:
-        result = supabase.table("followers")\
-            .select("follower_id")\
-            .eq("follower_id", user_id)\
-            .eq("following_id", target_id)\
-            .execute()
-
-        return jsonify({"following": len(result.data or []) > 0}), 200
+        return jsonify({"following": follow_graph.is_following(user_id, target_id)}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -134,18 +130,6 @@ def check_following_status(user_id, target_id):
 def get_user_stats(user_id):
     """Get follower/following counts"""
     try:
-        # Count followers
-        followers_res = supabase.table("followers")\
-            .select("follower_id", count="exact")\
-            .eq("following_id", user_id)\
-            .execute()
-
-        # Count following
-        following_res = supabase.table("followers")\
-            .select("following_id", count="exact")\
-            .eq("follower_id", user_id)\
-            .execute()
-
         # Count posts
         posts_res = supabase.table("posts")\
             .select("id", count="exact")\
@@ -153,10 +137,16 @@ def get_user_stats(user_id):
             .execute()
 
         return jsonify({
-            "followers_count": followers_res.count or 0,
-            "following_count": following_res.count or 0,
+            "followers_count": follow_graph.followers_count(user_id),
+            "following_count": follow_graph.following_count(user_id),
             "posts_count": posts_res.count or 0
         }), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@social_bp.route("/social/graph-stats", methods=["GET"])
+@service_token_required
+def get_follow_graph_stats():
+    """Memory used by the in-process follow graph cache"""
+    return jsonify(follow_graph.memory_stats()), 200
@@ -1,3 +1,4 @@
+import hmac
 import logging
 import uuid
 from flask import Blueprint, request, jsonify, redirect, url_for, g
@@ -7,6 +8,10 @@ import datetime
 from functools import wraps
 from extensions import app, db
 from models.user_model import User, follow_requests, followers
+from services.cache import TTLCache
+from services.follow_graph import follow_graph
+from services.home_timeline import HomeTimeline
+from services.gamification_events import gamification_events, FOLLOW_GAINED, FOLLOW_MADE
 
 # Configure logging to see debug messages
 logging.basicConfig(level=logging.DEBUG)
@@ -25,6 +30,9 @@ google = oauth.register(
 # Declare this as a blueprint for user-related routes
 users_bp = Blueprint('users', __name__)
 
+# email -> user_id, shared by every authenticated route (see get_user_id_from_jwt)
+user_id_cache = TTLCache(maxsize=10000, ttl=300)
+
 def jwt_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -49,10 +57,44 @@ def jwt_required(f):
     return decorated_function
 
 
+def service_token_required(f):
+    """Restrict a route to internal callers that send the X-Service-Token header"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = app.config.get('SERVICE_TOKEN')
+        token = request.headers.get('X-Service-Token', '')
+        if not expected or not hmac.compare_digest(token.encode(), expected.encode()):
+            return jsonify({"error": "Service token required"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _lookup_user_id(email) -> tuple:
+    """Resolve email -> user_id through user_id_cache, querying Supabase on a miss"""
+    from supabase_client import supabase  # Import here to avoid circular imports
+
+    cached = user_id_cache.get(email)
+    if cached is not None:
+        return cached, None
+
+    try:
+        user_res = supabase.table("user").select("id").eq("email", email).execute()
+        if not user_res.data or len(user_res.data) == 0:
+            return None, (jsonify({"error": "User not found"}), 404)
+        user_id = user_res.data[0]['id']
+        user_id_cache.set(email, user_id)
+        return user_id, None
+    except Exception as e:
+        return None, (jsonify({"error": f"Failed to lookup user: {str(e)}"}), 500)
+
+
 def get_user_id_from_jwt() -> tuple:
     """
-    Get the user ID from the JWT payload by looking up the email in the database.
+    Get the user ID for the current request.
     Must be called within a route decorated with @jwt_required.
+
+    Tokens minted with a `user_id` claim are used as-is; older tokens fall
+    back to an email lookup that is cached in user_id_cache.
     
     Returns:
         tuple: (user_id, None) on success, or (None, error_response) on failure
@@ -63,24 +105,20 @@ def get_user_id_from_jwt() -> tuple:
             return error
         # use user_id...
     """
-    from supabase_client import supabase  # Import here to avoid circular imports
-    
+    if g.jwt.get('user_id'):
+        return g.jwt['user_id'], None
+
     email = g.jwt.get('email')
     if not email:
         return None, (jsonify({"error": "Email not found in token"}), 401)
     
-    try:
-        user_res = supabase.table("user").select("id").eq("email", email).execute()
-        if not user_res.data or len(user_res.data) == 0:
-            return None, (jsonify({"error": "User not found"}), 404)
-        return user_res.data[0]['id'], None
-    except Exception as e:
-        return None, (jsonify({"error": f"Failed to lookup user: {str(e)}"}), 500)
+    return _lookup_user_id(email)
 
 
 def get_user_id_from_email(email) -> tuple:
     """
     Get the user ID from an email address by looking it up in the database.
+    Lookups are served from user_id_cache when possible.
     
     Args:
         email: The email address to look up
@@ -94,18 +132,10 @@ def get_user_id_from_email(email) -> tuple:
             return error
         # use user_id...
     """
-    from supabase_client import supabase  # Import here to avoid circular imports
-    
     if not email:
         return None, (jsonify({"error": "Email is required"}), 400)
     
-    try:
-        user_res = supabase.table("user").select("id").eq("email", email).execute()
-        if not user_res.data or len(user_res.data) == 0:
-            return None, (jsonify({"error": "User not found"}), 404)
-        return user_res.data[0]['id'], None
-    except Exception as e:
-        return None, (jsonify({"error": f"Failed to lookup user: {str(e)}"}), 500)
+    return _lookup_user_id(email)
 
 
 @users_bp.route('/login')
@@ -183,6 +213,9 @@ def authorize_google():
         return redirect(f"{app.config['FRONTEND_URL']}/register?token={jwt_token}")
     else:
         logging.debug(f"Existing user: {user_info['email']}")
+
+        if app.config['JWT_INCLUDE_USER_ID']:
+            payload['user_id'] = str(user.id)
         
         jwt_token = jwt.encode(payload, app.config['JWT_SECRET'], algorithm='HS256')
         
@@ -223,6 +256,7 @@ def complete_profile():
     except Exception as e:
         logging.error(f"Error creating new user: {e}")
         return jsonify({"error": "An error occurred while creating the user. Please try again."}), 500
+    user_id_cache.invalidate(g.jwt['email'])
     
     return jsonify({"message": "User registered successfully", "user_id": new_id}), 201
 
@@ -240,8 +274,8 @@ def get_profile():
         "username": user.username,
         "display_name": user.display_name,
         "profile_pic": user.profile_pic,
-        "followers_count": user.followers.count(),
-        "following_count": user.following.count(),
+        "followers_count": follow_graph.followers_count(user.id),
+        "following_count": follow_graph.following_count(user.id),
     }), 200
 
 @users_bp.route('/update', methods=['PUT'])
@@ -272,6 +306,7 @@ def update_user():
         except Exception as e:
             logging.error(f"Error updating user: {e}")
             return jsonify({"error": "An error occurred while updating the user. Please try again."}), 500
+        user_id_cache.invalidate(user.email)
         return jsonify({"message": "User updated successfully"}), 200
     else:
         return jsonify({"message": "No valid fields to update"}), 400
@@ -421,6 +456,10 @@ def accept_follow_request():
         )
     )
     db.session.commit()
+    follow_graph.add_edge(requester.id, user.id)
+    HomeTimeline.backfill(requester.id, user.id)
+    gamification_events.emit(FOLLOW_GAINED, f"follow:{requester.id}:{user.id}", user_id=user.id, actor_id=requester.id)
+    gamification_events.emit(FOLLOW_MADE, f"follows:{requester.id}:{user.id}", user_id=requester.id)
     return jsonify({'message': 'Follow request accepted'}), 200
 
 
@@ -486,6 +525,11 @@ def dev_login():
         ),
     }
 
+    if app.config['JWT_INCLUDE_USER_ID']:
+        user_id, error = get_user_id_from_email(email)
+        if not error:
+            payload["user_id"] = str(user_id)
+
     token = pyjwt.encode(payload, app.config['JWT_SECRET'], algorithm='HS256')
     return jsonify({"token": token})
 
@@ -526,23 +570,28 @@ def get_user_id_by_email(email):
     return user.id if user else None
 
 
-# --- MESSAGE/CONVERSATION API STUBS ---
-# These are placeholder endpoints until full message system is implemented
+# --- MESSAGE/CONVERSATION API ---
 
 @users_bp.route('/api/messages/unread', methods=['GET'])
 @jwt_required
 def get_unread_message_count():
     """
     Get unread message count for the current user
+
+    Sums the per-conversation unread counters on conversation_participants
+    (maintained by a trigger on `messages`) in a single indexed read.
     
     Returns:
         JSON: {"count": number}
-    
-    Note: This is currently a stub endpoint that returns 0.
-    TODO: Implement real message counting when message system is built.
     """
-    # TODO: Query messages table for unread count when implemented
-    # Example future implementation:
-    # user = User.query.filter_by(email=g.jwt['email']).first()
-    # count = Message.query.filter_by(recipient_id=user.id, is_read=False).count()
-    return jsonify({"count": 0}), 200
\ No newline at end of file
+    from supabase_client import supabase  # Import here to avoid circular imports
+
+    user_id, error = get_user_id_from_jwt()
+    if error:
+        return error
+
+    try:
+        result = supabase.rpc("get_unread_total", {"p_user_id": user_id}).execute()
+        return jsonify({"count": result.data or 0}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
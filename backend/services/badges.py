@@ -0,0 +1,155 @@
+# backend/services/badges.py
+from collections import namedtuple
+import logging
+import threading
+from services.cache import TTLCache
+from services.catalog import Catalog
+from services.gamification_events import (
+    gamification_events, POST_CREATED, RECIPE_POSTED, LIKE_RECEIVED, FOLLOW_MADE,
+)
+
+# Which lifetime counter each gamification event moves; the counters are
+# bumped by apply_gamification_events() (see supabase_schema.sql)
+EVENT_COUNTERS = {
+    POST_CREATED: "posts",
+    RECIPE_POSTED: "recipe_posts",
+    FOLLOW_MADE: "follows",
+    LIKE_RECEIVED: "likes_received",
+}
+COUNTERS = ("posts", "recipe_posts", "follows", "likes_received")
+
+# Threshold rules for the seeded badges (see `badges` in supabase_schema.sql)
+BadgeRule = namedtuple("BadgeRule", "counter threshold")
+BADGE_RULES = {
+    "First Post": BadgeRule("posts", 1),
+    "Recipe Master": BadgeRule("recipe_posts", 10),
+    "Social Butterfly": BadgeRule("follows", 25),
+    "Engagement King": BadgeRule("likes_received", 100),
+    "Week Warrior": BadgeRule("longest_streak", 7),
+}
+
+
+class SupabaseBadgeStore:
+    """Counter and badge persistence used by BadgeEngine"""
+
+    PAGE_SIZE = 1000
+
+    @staticmethod
+    def _client():
+        from supabase_client import supabase  # Import here so the engine can be used without Supabase config
+        return supabase
+
+    def progress(self, user_ids: list) -> list:
+        """Each user's progress row (counters + longest_streak)"""
+        return self._client().rpc("get_badge_progress", {"p_user_ids": user_ids}).execute().data or []
+
+    def badge_ids(self) -> dict:
+        return {b["name"]: b["id"] for b in Catalog.badges()}
+
+    def award(self, rows: list):
+        self._client().table("user_badges")\
+            .upsert(rows, on_conflict="user_id,badge_id", ignore_duplicates=True)\
+            .execute()
+
+    def recompute_counters(self):
+        self._client().rpc("backfill_badge_counters", {}).execute()
+
+    def progress_pages(self):
+        """Every user's progress row, PAGE_SIZE rows at a time"""
+        start = 0
+        while True:
+            res = self._client().table("user_badge_progress")\
+                .select("*")\
+                .order("user_id")\
+                .range(start, start + self.PAGE_SIZE - 1)\
+                .execute()
+            rows = res.data or []
+            if rows:
+                yield rows
+            if len(rows) < self.PAGE_SIZE:
+                return
+            start += self.PAGE_SIZE
+
+
+class BadgeEngine:
+    """
+    Awards badges from running per-user counters instead of count queries.
+
+    Listens to the gamification event pipeline. The counters (posts,
+    recipe posts, follows, likes received) are bumped by the
+    apply_gamification_events RPC in the same transaction that records the
+    events, so they are never lost or double counted. Each batch of newly
+    applied events becomes one read of the affected users' totals and
+    longest streak, which are checked against BADGE_RULES; every badge
+    crossed in the batch is written with one upsert into `user_badges`.
+
+    Counters are lifetime totals: an unlike or unfollow does not lower
+    them, just as it does not take back an earned badge. If reading
+    progress or awarding fails, the users are checked again with the next
+    batch (awarding is idempotent).
+
+    backfill() rebuilds all counters in one statement and then awards
+    whatever existing users have already earned.
+    """
+
+    AWARD_BATCH = 1000
+    MAX_RECHECK = 100000
+
+    def __init__(self, store=None):
+        self._store = store or SupabaseBadgeStore()
+        self._earned = TTLCache(maxsize=200000, ttl=3600)  # (user_id, badge name) known to be awarded
+        self._recheck = set()  # users whose last check failed
+        self._lock = threading.Lock()
+
+    def handle_events(self, events: list) -> int:
+        """on_applied listener: award badges crossed by the users in the batch"""
+        user_ids = set()
+        for event in events:
+            # Activity events change the streak, so the user's progress is re-checked
+            if event["event_type"] in EVENT_COUNTERS or event.get("is_activity"):
+                user_ids.add(event["user_id"])
+        with self._lock:
+            user_ids |= self._recheck
+            self._recheck = set()
+        if not user_ids:
+            return 0
+
+        try:
+            return self._award(self._store.progress(list(user_ids)))
+        except Exception as e:
+            with self._lock:
+                room = self.MAX_RECHECK - len(self._recheck)
+                self._recheck.update(list(user_ids)[:max(room, 0)])
+            logging.error(f"Badge check failed for {len(user_ids)} users, will retry: {e}")
+            return 0
+
+    def backfill(self) -> int:
+        """Recompute every user's counters and award all earned badges; returns badges written"""
+        self._store.recompute_counters()
+        awarded = 0
+        for page in self._store.progress_pages():
+            awarded += self._award(page)
+        return awarded
+
+    def _award(self, progress: list) -> int:
+        ids = self._store.badge_ids()  # served from the cached catalog
+        earned = []
+        for row in progress:
+            for name, rule in BADGE_RULES.items():
+                key = (row["user_id"], name)
+                if name in ids and (row.get(rule.counter) or 0) >= rule.threshold and not self._earned.get(key):
+                    earned.append(key)
+
+        for start in range(0, len(earned), self.AWARD_BATCH):
+            chunk = earned[start:start + self.AWARD_BATCH]
+            self._store.award([{"user_id": user_id, "badge_id": ids[name]} for user_id, name in chunk])
+            for key in chunk:
+                self._earned.set(key, True)
+        if earned:
+            logging.info(f"Awarded {len(earned)} badges")
+        return len(earned)
+
+
+# Process-wide engine, fed by the gamification event pipeline
+badge_engine = BadgeEngine()
+gamification_events.on_applied(badge_engine.handle_events)
@@ -0,0 +1,48 @@
+# backend/services/catalog.py
+from services.cache import TTLCache
+
+
+class Catalog:
+    """
+    Process-wide cache of the badge and challenge catalogs.
+
+    Both tables are small and change only when someone edits them, so
+    they are read once and served from memory. Call invalidate() after
+    changing either table. The TTL only bounds how stale another
+    process's copy can get.
+    """
+
+    TTL = 3600  # seconds
+
+    _cache = TTLCache(maxsize=4, ttl=TTL)
+
+    @staticmethod
+    def _load(key: str, query):
+        cached = Catalog._cache.get(key)
+        if cached is None:
+            cached = query().execute().data or []
+            Catalog._cache.set(key, cached)
+        return cached
+
+    @staticmethod
+    def badges() -> list:
+        """Every badge row"""
+        from supabase_client import supabase  # Import here so the cache can be used without Supabase config
+        return Catalog._load("badges", lambda: supabase.table("badges").select("*"))
+
+    @staticmethod
+    def badges_by_id() -> dict:
+        return {b["id"]: b for b in Catalog.badges()}
+
+    @staticmethod
+    def active_challenges() -> list:
+        """Active challenges, newest first"""
+        from supabase_client import supabase
+        return Catalog._load("challenges", lambda: supabase.table("challenges")
+                             .select("*")
+                             .eq("is_active", True)
+                             .order("created_at", desc=True))
+
+    @staticmethod
+    def invalidate():
+        Catalog._cache.clear()
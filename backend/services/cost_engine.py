@@ -0,0 +1,162 @@
+# backend/services/cost_engine.py
+import numpy as np
+from services.units import MASS, VOLUME, COUNT, CONTAINER, parse_amount, parse_unit, density_for, grams_each, \
+    grams_per_container
+
+
+def _unit_arrays(units: list):
+    """Dimension and base-unit size per unit; has_unit is False where the unit is missing"""
+    parsed = [parse_unit(u) for u in units]
+    has_unit = np.array([p is not None for p in parsed], dtype=bool)
+    dims = np.array([p[0] if p else -1 for p in parsed], dtype=np.int8)
+    sizes = np.array([p[1] if p else np.nan for p in parsed], dtype=np.float64)
+    return has_unit, dims, sizes
+
+
+def _amount(value) -> float:
+    amount = parse_amount(value)
+    return np.nan if amount is None else amount
+
+
+def _container_grams(dims, names: list):
+    """Grams in one container per line; nan for other units and unknown ingredients"""
+    return np.array([
+        grams_per_container(int(d), n or "") if d >= CONTAINER else np.nan for d, n in zip(dims, names)
+    ], dtype=np.float64)
+
+
+def _grams_per_unit(dims, sizes, densities, weights, containers):
+    """Grams in one unit; nan where the ingredient's density, item or container weight is unknown"""
+    return np.select(
+        [dims == MASS, dims == VOLUME, dims == COUNT, dims >= CONTAINER],
+        [sizes, sizes * densities, sizes * weights, sizes * containers],
+        default=np.nan,
+    )
+
+
+class CostEngine:
+    """
+    Recipe and shopping-list costing with unit conversion.
+
+    Amounts are parsed once per line ("1/2", "1 1/2", "2-3"). All unit
+    conversion and pricing then runs as NumPy array operations over every
+    line at once, however many recipes the lines come from. Units in the
+    same dimension convert directly (cups -> tbsp, oz -> lb). Volume and
+    mass convert through DENSITIES, counts through COUNT_WEIGHTS and
+    containers (cans, sticks, bunches) through CONTAINER_WEIGHTS (all in
+    services/units.py); a container with no known weight only converts
+    to itself. A line without a unit counts items, or is taken
+    to be in the price's unit when items can't be weighed (what the
+    estimator always assumed). Lines that can't be converted cost nan
+    rather than a wrong number.
+    """
+
+    @staticmethod
+    def convert(quantities, from_units: list, to_units: list, names: list) -> np.ndarray:
+        """
+        Convert quantities between units, per line.
+
+        Returns:
+            np.ndarray: quantity expressed in to_units, nan where not convertible
+        """
+        quantities = np.asarray(quantities, dtype=np.float64)
+        if quantities.size == 0:
+            return quantities
+        has_from, from_dims, from_sizes = _unit_arrays(from_units)
+        has_to, to_dims, to_sizes = _unit_arrays(to_units)
+        densities = np.array([density_for(n or "") for n in names], dtype=np.float64)
+        weights = np.array([grams_each(n or "") for n in names], dtype=np.float64)
+
+        # A bare number ("2" eggs) counts items
+        from_dims = np.where(has_from, from_dims, COUNT)
+        from_sizes = np.where(has_from, from_sizes, 1.0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            direct = from_sizes / to_sizes
+            via_grams = \
+                _grams_per_unit(from_dims, from_sizes, densities, weights, _container_grams(from_dims, names)) / \
+                _grams_per_unit(to_dims, to_sizes, densities, weights, _container_grams(to_dims, names))
+            ratio = np.where(from_dims == to_dims, direct, via_grams)
+        # Without a price unit, or items we can't weigh, assume the amount is in the price's unit
+        ratio = np.where(~has_to | (~has_from & np.isnan(ratio)), 1.0, ratio)
+        return quantities * ratio
+
+    @staticmethod
+    def line_costs(lines: list) -> np.ndarray:
+        """
+        Cost of each line.
+
+        Args:
+            lines: [{"name", "amount", "unit", "price"}, ...] where amount may be a
+                number or recipe text and price is an ingredient_prices row (or None)
+
+        Returns:
+            np.ndarray: cost per line, nan where the line has no usable price,
+            amount or unit conversion
+        """
+        if not lines:
+            return np.zeros(0)
+        amounts = np.array([_amount(line.get("amount")) for line in lines], dtype=np.float64)
+        prices = np.array([
+            float((line.get("price") or {}).get("price_per_unit") or 0.0) for line in lines
+        ], dtype=np.float64)
+        quantities = CostEngine.convert(
+            amounts,
+            [line.get("unit") for line in lines],
+            [(line.get("price") or {}).get("unit") for line in lines],
+            [line.get("name") for line in lines],
+        )
+        return np.where(prices > 0, quantities * prices, np.nan)
+
+    @staticmethod
+    def recipe_costs(recipes: list, resolve) -> list:
+        """
+        Price many recipes in one pass.
+
+        Args:
+            recipes: [{"id", "ingredients": [{"item", "amount", "unit"}, ...]}, ...]
+                (the recipe_data shape)
+            resolve: names -> price rows (or None) in order, e.g. price_catalog.match_many
+
+        Returns:
+            list: {"id", "total_cost", "priced", "unpriced", "currency"} per recipe;
+            total_cost covers the priced lines only
+        """
+        owners, lines = [], []
+        for index, recipe in enumerate(recipes):
+            for ingredient in recipe.get("ingredients") or []:
+                if not isinstance(ingredient, dict):
+                    continue
+                owners.append(index)
+                lines.append({
+                    "name": (ingredient.get("item") or ingredient.get("name") or "").strip(),
+                    "amount": ingredient.get("amount", 1),
+                    "unit": ingredient.get("unit"),
+                })
+
+        named = [i for i, line in enumerate(lines) if line["name"]]
+        for i, row in zip(named, resolve([lines[i]["name"] for i in named])):
+            lines[i]["price"] = row
+
+        costs = CostEngine.line_costs(lines)
+        owners = np.array(owners, dtype=np.int64)
+        priced = ~np.isnan(costs)
+        totals = np.bincount(owners[priced], weights=costs[priced], minlength=len(recipes))
+        priced_counts = np.bincount(owners[priced], minlength=len(recipes))
+        line_counts = np.bincount(owners, minlength=len(recipes))
+
+        currencies = {}
+        for owner, line, ok in zip(owners, lines, priced):
+            if ok:
+                currencies.setdefault(int(owner), line["price"].get("currency") or "USD")
+
+        return [
+            {
+                "id": recipe.get("id"),
+                "total_cost": round(float(totals[i]), 2),
+                "priced": int(priced_counts[i]),
+                "unpriced": int(line_counts[i] - priced_counts[i]),
+                "currency": currencies.get(i, "USD"),
+            }
+            for i, recipe in enumerate(recipes)
+        ]
@@ -0,0 +1,202 @@
+# backend/services/engagement_buffer.py
+import atexit
+import logging
+import threading
+import time
+from services.write_behind import PeriodicFlusher
+
+LIKE = "like"
+SAVE = "save"
+TABLES = {LIKE: "likes", SAVE: "saved_posts"}
+
+
+def _write_to_supabase(table: str, inserts: list, deletes: dict):
+    """Apply one batch: bulk upsert of new rows, one delete per user for removed rows"""
+    from supabase_client import supabase  # Import here so the buffer can be used without Supabase config
+
+    if inserts:
+        supabase.table(table)\
+            .upsert(inserts, on_conflict="post_id,user_id", ignore_duplicates=True)\
+            .execute()
+    for user_id, post_ids in deletes.items():
+        supabase.table(table)\
+            .delete()\
+            .eq("user_id", user_id)\
+            .in_("post_id", post_ids)\
+            .execute()
+
+
+class EngagementBuffer(PeriodicFlusher):
+    """
+    Write-behind buffer for like/unlike and save/unsave toggles.
+
+    Each toggle records the desired final state for (kind, user, post) and
+    returns immediately. Repeated toggles inside one flush window collapse
+    into a single write. A background thread flushes every
+    `flush_interval` seconds, or sooner once `max_pending` keys are
+    buffered. It writes bulk upserts for rows that should exist and
+    batched deletes for rows that should not. Pending state stays readable
+    until it has been written, so callers still read their own writes.
+
+    Rows that fail to write go back into the buffer and are retried on
+    later flushes, unless a newer toggle replaced them. A row is dropped
+    only after failing for RETRY_SECONDS (e.g. it points at a deleted
+    post) or while MAX_RETAINED rows are already waiting.
+    """
+
+    thread_name = "engagement-flush"
+    RETRY_SECONDS = 300
+    MAX_RETAINED = 50000      # buffered rows kept for retry while the database is unreachable
+    MAX_ROW_FAILURES = 3      # consecutive row failures that mean the database is down, not a bad row
+
+    def __init__(self, writer=_write_to_supabase, flush_interval: float = 0.5, max_pending: int = 500):
+        super().__init__(flush_interval)
+        self._writer = writer
+        self.max_pending = max_pending
+        self._pending = {}
+        self._inflight = {}
+        self._failing_since = {}  # key -> time of its first failed write
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._metrics = {
+            "ops_received": 0,
+            "ops_coalesced": 0,
+            "rows_written": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+            "ops_retried": 0,
+            "ops_dropped": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def record(self, kind: str, user_id, post_id, active: bool):
+        """Buffer the desired state of one toggle"""
+        key = (kind, str(user_id), str(post_id))
+        with self._lock:
+            self._metrics["ops_received"] += 1
+            if key in self._pending:
+                self._metrics["ops_coalesced"] += 1
+            self._pending[key] = active
+            full = len(self._pending) >= self.max_pending
+        self._ensure_thread()
+        if full:
+            self.wake()
+
+    def pending_state(self, kind: str, user_id, post_id):
+        """Buffered state not yet written (True/False), or None if nothing is pending"""
+        key = (kind, str(user_id), str(post_id))
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            return self._inflight.get(key)
+
+    def has_pending(self, kind: str, user_id) -> bool:
+        """Whether any of user_id's `kind` toggles are buffered or being written"""
+        user_id = str(user_id)
+        with self._lock:
+            return any(k == kind and u == user_id for k, u, _ in (*self._pending, *self._inflight))
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of keys flushed"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            grouped = {}
+            for (kind, user_id, post_id), active in batch.items():
+                inserts, deletes = grouped.setdefault(TABLES[kind], ([], {}))
+                if active:
+                    inserts.append({"user_id": user_id, "post_id": post_id})
+                else:
+                    deletes.setdefault(user_id, []).append(post_id)
+
+            written, failed = 0, []
+            for table, (inserts, deletes) in grouped.items():
+                try:
+                    self._writer(table, inserts, deletes)
+                    written += len(inserts) + sum(len(ids) for ids in deletes.values())
+                except Exception as e:
+                    logging.error(f"Bulk {table} flush failed, retrying row by row: {e}")
+                    table_written, table_failed = self._write_rows(table, inserts, deletes)
+                    written += table_written
+                    failed += table_failed
+
+            elapsed = (time.perf_counter() - started) * 1000.0
+            with self._lock:
+                # Requeue before clearing _inflight so pending_state never loses the row
+                failed_keys = self._requeue(batch, failed)
+                for key in batch:
+                    if key not in failed_keys:
+                        self._failing_since.pop(key, None)
+                self._inflight = {}
+                self._metrics["flushes"] += 1
+                self._metrics["rows_written"] += written
+                self._metrics["last_flush_ms"] = round(elapsed, 2)
+                self._metrics["max_flush_ms"] = round(max(self._metrics["max_flush_ms"], elapsed), 2)
+                self._metrics["total_flush_ms"] += elapsed
+            return len(batch)
+
+    def _write_rows(self, table: str, inserts: list, deletes: dict) -> tuple:
+        """
+        Fallback when a bulk write fails: isolate the bad rows (e.g. a deleted post).
+
+        Returns:
+            tuple: (rows written, [(kind, user_id, post_id) keys that were not written])
+        """
+        kind = next(k for k, t in TABLES.items() if t == table)
+        written, failed, streak = 0, [], 0
+        rows = [((row["user_id"], row["post_id"]), [row], {}) for row in inserts] + \
+               [((user_id, post_id), [], {user_id: [post_id]}) for user_id, ids in deletes.items() for post_id in ids]
+        for (user_id, post_id), row_inserts, row_deletes in rows:
+            if streak >= self.MAX_ROW_FAILURES:
+                # Every row is failing: the database is unreachable, keep the rest for the next flush
+                failed.append((kind, user_id, post_id))
+                continue
+            try:
+                self._writer(table, row_inserts, row_deletes)
+                written += 1
+                streak = 0
+            except Exception as e:
+                streak += 1
+                failed.append((kind, user_id, post_id))
+                with self._lock:
+                    self._metrics["flush_failures"] += 1
+                logging.error(f"{table} write {row_inserts or row_deletes} failed: {e}")
+        return written, failed
+
+    def _requeue(self, batch: dict, failed: list) -> set:
+        """Put failed rows back into _pending (called with _lock held); returns the failed keys"""
+        now = time.monotonic()
+        for key in failed:
+            if key in self._pending:
+                continue  # toggled again meanwhile: the newer state is what gets written
+            first_failed = self._failing_since.setdefault(key, now)
+            if now - first_failed > self.RETRY_SECONDS or len(self._pending) >= self.MAX_RETAINED:
+                self._failing_since.pop(key, None)
+                self._metrics["ops_dropped"] += 1
+                logging.error(f"Dropping {key[0]} of post {key[2]} by user {key[1]} after repeated write failures")
+                continue
+            self._pending[key] = batch[key]
+            self._metrics["ops_retried"] += 1
+        return set(failed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["buffered_ops"] = len(self._pending)
+            stats["inflight_ops"] = len(self._inflight)
+            stats["retrying_ops"] = len(self._failing_since)
+        stats["avg_flush_ms"] = round(stats["total_flush_ms"] / stats["flushes"], 2) if stats["flushes"] else 0.0
+        stats["total_flush_ms"] = round(stats["total_flush_ms"], 2)
+        return stats
+
+
+# Process-wide buffer used by engagement_routes; flushed on interpreter exit
+engagement_buffer = EngagementBuffer()
+atexit.register(engagement_buffer.shutdown)
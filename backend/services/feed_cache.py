@@ -0,0 +1,150 @@
+# backend/services/feed_cache.py
+import threading
+from services.cache import TTLCache
+from services.feed_hydration import FeedHydrator, StageTimings
+
+
+class FeedCache:
+    """
+    Two-layer cache for feed pages.
+
+    The shared layer holds what every viewer sees: hydrated post cards
+    (post, author, counts) keyed by post id, and which post ids make up
+    each global feed page. The overlay layer holds each viewer's
+    is_liked / is_saved flags keyed by (user_id, post_id). A request only
+    goes to the database for cards or flags that are missing.
+
+    Engagement endpoints patch cached counts and flags in place, and
+    deleting or creating a post drops the cached pages. Other workers
+    converge within the TTLs below.
+    """
+
+    PAGE_TTL = 15      # seconds
+    CARD_TTL = 60
+    OVERLAY_TTL = 120
+
+    _pages = TTLCache(maxsize=1000, ttl=PAGE_TTL)
+    _cards = TTLCache(maxsize=20000, ttl=CARD_TTL)
+    _overlay = TTLCache(maxsize=200000, ttl=OVERLAY_TTL)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def page(key, load_page, timings: StageTimings = None) -> tuple:
+        """
+        Shared cards for a feed page.
+
+        Args:
+            key: hashable page identity, e.g. ("global", cursor or page, per_page)
+            load_page: callable returning (posts, next_cursor) on a miss
+
+        Returns:
+            tuple: (shared cards, next_cursor)
+        """
+        cached = FeedCache._pages.get(key)
+        if cached is not None:
+            post_ids, next_cursor = cached
+            cards = [FeedCache._cards.get(pid) for pid in post_ids]
+            if all(card is not None for card in cards):
+                return cards, next_cursor
+
+        posts, next_cursor = load_page()
+        cards = FeedCache.shared_cards(posts, timings)
+        FeedCache._pages.set(key, ([c["id"] for c in cards], next_cursor))
+        return cards, next_cursor
+
+    @staticmethod
+    def shared_cards(posts: list, timings: StageTimings = None) -> list:
+        """Cards for posts (in order), hydrating only the ones not already cached"""
+        cards = {}
+        missing = []
+        for post in posts:
+            card = FeedCache._cards.get(post["id"])
+            if card is None:
+                missing.append(post)
+            else:
+                cards[post["id"]] = card
+
+        for card in FeedHydrator.hydrate(missing, None, timings):
+            FeedCache._cards.set(card["id"], card)
+            cards[card["id"]] = card
+
+        return [cards[p["id"]] for p in posts if p["id"] in cards]
+
+    @staticmethod
+    def personalize(cards: list, user_id, timings: StageTimings = None) -> list:
+        """Copies of cards with the viewer's is_liked / is_saved applied"""
+        flags = {}
+        missing = []
+        for card in cards:
+            cached = FeedCache._overlay.get((user_id, card["id"])) if user_id else (False, False)
+            if cached is None:
+                missing.append(card["id"])
+            else:
+                flags[card["id"]] = cached
+
+        if missing:
+            with (timings or StageTimings()).stage("overlay"):
+                fetched = FeedHydrator.viewer_flags(user_id, missing, timings)
+            # viewer_flags() already applies toggles still in the write-behind buffer
+            for pid, value in fetched.items():
+                FeedCache._overlay.set((user_id, pid), value)
+                flags[pid] = value
+
+        personalized = []
+        with FeedCache._lock:
+            for card in cards:
+                is_liked, is_saved = flags.get(card["id"], (False, False))
+                engagement = dict(card["engagement"], is_liked=is_liked, is_saved=is_saved)
+                personalized.append(dict(card, engagement=engagement))
+        return personalized
+
+    @staticmethod
+    def adjust_counts(post_id, likes: int = 0, comments: int = 0):
+        """Apply a like/comment count change to the cached card, if any"""
+        card = FeedCache._cards.get(post_id)
+        if card is None:
+            return
+        with FeedCache._lock:
+            engagement = card["engagement"]
+            engagement["likes_count"] = max(0, engagement["likes_count"] + likes)
+            engagement["comments_count"] = max(0, engagement["comments_count"] + comments)
+
+    @staticmethod
+    def cached_viewer_flags(user_id, post_id):
+        """The viewer's cached (is_liked, is_saved) for post_id, or None if unknown"""
+        return FeedCache._overlay.get((user_id, post_id))
+
+    @staticmethod
+    def has_card(post_id) -> bool:
+        return FeedCache._cards.get(post_id) is not None
+
+    @staticmethod
+    def set_viewer_flags(user_id, post_id, liked: bool = None, saved: bool = None):
+        """Patch the viewer's cached flags for post_id after a like/save toggle"""
+        key = (user_id, post_id)
+        with FeedCache._lock:
+            cached = FeedCache._overlay.get(key)
+            if cached is None:
+                return
+            is_liked, is_saved = cached
+            FeedCache._overlay.set(key, (
+                is_liked if liked is None else liked,
+                is_saved if saved is None else saved,
+            ))
+
+    @staticmethod
+    def invalidate_post(post_id):
+        """Forget a post (e.g. after it was deleted) and every cached page"""
+        FeedCache._cards.invalidate(post_id)
+        FeedCache._pages.clear()
+
+    @staticmethod
+    def invalidate_pages():
+        """Drop cached page memberships, e.g. after a new post shifts the first page"""
+        FeedCache._pages.clear()
+
+    @staticmethod
+    def clear():
+        FeedCache._pages.clear()
+        FeedCache._cards.clear()
+        FeedCache._overlay.clear()
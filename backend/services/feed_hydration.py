@@ -0,0 +1,194 @@
+# backend/services/feed_hydration.py
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import time
+from supabase_client import supabase
+from services.engagement_buffer import engagement_buffer, LIKE, SAVE
+
+
+class StageTimings:
+    """Collects wall-clock durations (ms) for the named stages of a request"""
+
+    def __init__(self):
+        self._stages = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stages[name] = (time.perf_counter() - start) * 1000.0
+
+    def as_dict(self) -> dict:
+        """Stage durations plus the total elapsed time since creation"""
+        timings = {name: round(ms, 2) for name, ms in self._stages.items()}
+        timings["total"] = round((time.perf_counter() - self._started) * 1000.0, 2)
+        return timings
+
+    def to_header(self) -> str:
+        """Format the timings as an HTTP Server-Timing header value"""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
+
+
+class FeedHydrator:
+    """
+    Turns a page of `posts` rows into feed cards.
+
+    The lookups that only depend on the page (authors, the viewer's likes
+    and saves) are independent of each other, so they
+    run concurrently on a shared, bounded thread pool. Request latency is
+    then set by the slowest lookup instead of the sum of all of them.
+    """
+
+    # likes_count / comments_count are counter columns kept up to date by
+    # triggers on `likes` and `comments` (see supabase_schema.sql), so counts
+    # arrive with the page itself instead of as one row per like/comment.
+    # views_count / unique_viewers are written by the view tracker's flushes,
+    # estimated_cost / cost_currency by the recipe cost index.
+    POST_COLUMNS = "id, user_id, image_url, created_at, caption, post_type, recipe_data, " \
+                   "likes_count, comments_count, views_count, unique_viewers, estimated_cost, cost_currency"
+
+    MAX_WORKERS = 8
+    STAGE_TIMEOUT = 10  # seconds
+
+    _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="feed-hydrate")
+
+    @staticmethod
+    def _fetch_users(user_ids: list) -> dict:
+        if not user_ids:
+            return {}
+        users_res = supabase.table("user")\
+            .select("id, username, profile_pic")\
+            .in_("id", user_ids)\
+            .execute()
+        return {u["id"]: u for u in (users_res.data or [])}
+
+    @staticmethod
+    def _viewer_post_ids(table: str, user_id, post_ids: list) -> dict:
+        res = supabase.table(table)\
+            .select("post_id")\
+            .eq("user_id", user_id)\
+            .in_("post_id", post_ids)\
+            .execute()
+        return {row['post_id']: True for row in (res.data or [])}
+
+    @staticmethod
+    def _run_stages(stages: dict, timings: StageTimings) -> dict:
+        """Run every stage callable concurrently and return {name: result}"""
+        def timed(name, fn):
+            with timings.stage(name):
+                return fn()
+
+        futures = {
+            name: FeedHydrator._executor.submit(timed, name, fn)
+            for name, fn in stages.items()
+        }
+        return {name: future.result(timeout=FeedHydrator.STAGE_TIMEOUT) for name, future in futures.items()}
+
+    @staticmethod
+    def build_card(post: dict, user: dict, engagement: dict) -> dict:
+        """Shape a single post row into the feed card returned by the API"""
+        return {
+            "id": post["id"],
+            "image_url": post["image_url"],
+            "caption": post["caption"],
+            "post_type": post.get("post_type", "simple"),
+            "recipe_data": post.get("recipe_data"),
+            "estimated_cost": post.get("estimated_cost"),
+            "cost_currency": post.get("cost_currency"),
+            "created_at": post["created_at"],
+            "user": {
+                "id": post["user_id"],
+                "username": user["username"] if user else "Unknown",
+                "profile_pic": user.get("profile_pic") if user else None,
+            },
+            "engagement": engagement,
+        }
+
+    @staticmethod
+    def hydrate(posts: list, user_id=None, timings: StageTimings = None) -> list:
+        """
+        Hydrate a page of posts into feed cards, preserving the input order.
+
+        Args:
+            posts: rows from `posts` selected with FeedHydrator.POST_COLUMNS
+            user_id: the viewer, used for is_liked / is_saved (optional)
+            timings: StageTimings to record per-stage durations into (optional)
+
+        Returns:
+            list: feed cards in the same order as `posts`
+        """
+        if not posts:
+            return []
+        if timings is None:
+            timings = StageTimings()
+
+        post_ids = [p['id'] for p in posts]
+        user_ids = list({p.get("user_id") for p in posts if p.get("user_id")})
+
+        stages = {
+            "users": lambda: FeedHydrator._fetch_users(user_ids),
+        }
+        if user_id:
+            stages["user_likes"] = lambda: FeedHydrator._viewer_post_ids("likes", user_id, post_ids)
+            stages["user_saves"] = lambda: FeedHydrator._viewer_post_ids("saved_posts", user_id, post_ids)
+
+        with timings.stage("hydrate"):
+            results = FeedHydrator._run_stages(stages, timings)
+
+        users_by_id = results["users"]
+        user_likes = results.get("user_likes", {})
+        user_saves = results.get("user_saves", {})
+
+        cards = []
+        for post in posts:
+            engagement = {
+                "likes_count": post.get("likes_count") or 0,
+                "comments_count": post.get("comments_count") or 0,
+                "views_count": post.get("views_count") or 0,
+                "unique_viewers": post.get("unique_viewers") or 0,
+            }
+            engagement["is_liked"], engagement["is_saved"] = FeedHydrator._with_pending(
+                user_id, post["id"], user_likes.get(post["id"], False), user_saves.get(post["id"], False)
+            )
+            cards.append(FeedHydrator.build_card(post, users_by_id.get(post["user_id"]), engagement))
+        return cards
+
+    @staticmethod
+    def viewer_flags(user_id, post_ids: list, timings: StageTimings = None) -> dict:
+        """
+        The viewer's is_liked / is_saved flags for post_ids.
+
+        Returns:
+            dict: {post_id: (is_liked, is_saved)} for every id in post_ids
+        """
+        if not post_ids:
+            return {}
+        if timings is None:
+            timings = StageTimings()
+
+        stages = {
+            "user_likes": lambda: FeedHydrator._viewer_post_ids("likes", user_id, post_ids),
+            "user_saves": lambda: FeedHydrator._viewer_post_ids("saved_posts", user_id, post_ids),
+        }
+        results = FeedHydrator._run_stages(stages, timings)
+        return {
+            pid: FeedHydrator._with_pending(
+                user_id, pid, results["user_likes"].get(pid, False), results["user_saves"].get(pid, False)
+            )
+            for pid in post_ids
+        }
+
+    @staticmethod
+    def _with_pending(user_id, post_id, is_liked: bool, is_saved: bool) -> tuple:
+        """(is_liked, is_saved) with toggles still in the write-behind buffer winning over the database"""
+        if not user_id:
+            return is_liked, is_saved
+        pending_like = engagement_buffer.pending_state(LIKE, user_id, post_id)
+        pending_save = engagement_buffer.pending_state(SAVE, user_id, post_id)
+        return (
+            is_liked if pending_like is None else pending_like,
+            is_saved if pending_save is None else pending_save,
+        )
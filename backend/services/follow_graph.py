@@ -0,0 +1,256 @@
+# backend/services/follow_graph.py
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+import math
+import sys
+import threading
+import time
+
+FOLLOWERS = "followers"
+FOLLOWING = "following"
+
+
+class FollowGraph:
+    """
+    In-process cache of the follow graph.
+
+    User ids are interned to small integers and each user's adjacency is a
+    sorted array('I'), so an edge costs 4 bytes per direction, membership
+    is a binary search and counts are len(). Adjacency is loaded lazily per
+    user and direction, refreshed after `ttl` seconds, and evicted LRU once
+    more than `max_lists` lists are held. Follow/unfollow writes are
+    applied to any loaded lists (write-through) so reads stay current.
+
+    An id stays interned only while a cached list mentions it; its slot is
+    reused once the last such list is evicted. Edits made while a list is
+    being loaded are replayed onto the loaded copy (from the last
+    MAX_RECENT_EDITS edits), so a slow load cannot undo a follow.
+    """
+
+    MAX_RECENT_EDITS = 10000
+
+    def __init__(self, loader, ttl: float = 600.0, max_lists: int = 200000):
+        self._loader = loader  # loader(user_id, direction) -> iterable of user ids
+        self.ttl = ttl
+        self.max_lists = max_lists
+        self._index = {}
+        self._names = []
+        self._refs = []   # per interned id: cached lists it owns or appears in
+        self._free = []   # interned slots no list references, for reuse
+        self._lists = {FOLLOWERS: OrderedDict(), FOLLOWING: OrderedDict()}
+        self._edit_seq = 0
+        self._edits = deque(maxlen=self.MAX_RECENT_EDITS)  # (seq, follower, following, added)
+        self._lock = threading.RLock()
+
+    def _intern(self, user_id: str) -> int:
+        idx = self._index.get(user_id)
+        if idx is None:
+            if self._free:
+                idx = self._free.pop()
+                self._names[idx] = user_id
+            else:
+                idx = len(self._names)
+                self._names.append(user_id)
+                self._refs.append(0)
+            self._index[user_id] = idx
+        return idx
+
+    def _acquire(self, idx: int):
+        self._refs[idx] += 1
+
+    def _release(self, idx: int):
+        self._refs[idx] -= 1
+        if self._refs[idx] == 0:
+            del self._index[self._names[idx]]
+            self._names[idx] = None
+            self._free.append(idx)
+
+    def _store(self, direction: str, idx: int, entry: tuple):
+        """Cache (loaded_at, neighbours) as idx's list, releasing whatever it replaces or evicts"""
+        lists = self._lists[direction]
+        self._acquire(idx)
+        for n in entry[1]:
+            self._acquire(n)
+        old = lists.get(idx)
+        lists[idx] = entry
+        lists.move_to_end(idx)
+        if old is not None:
+            self._drop(idx, old)
+        while len(lists) > self.max_lists:
+            self._drop(*lists.popitem(last=False))
+
+    def _drop(self, idx: int, entry: tuple):
+        for n in entry[1]:
+            self._release(n)
+        self._release(idx)
+
+    def _read(self, user_id, direction: str, read):
+        """
+        read(adjacency) for user_id's sorted adjacency array, loading it on a
+        miss or after ttl. read runs under the lock, so interned ids in the
+        array cannot be reused while it looks them up.
+        """
+        user_id = str(user_id)
+        with self._lock:
+            idx = self._index.get(user_id)
+            entry = self._lists[direction].get(idx) if idx is not None else None
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                self._lists[direction].move_to_end(idx)
+                return read(entry[1])
+            seq = self._edit_seq
+
+        loaded = {str(n) for n in self._loader(user_id, direction)}
+
+        with self._lock:
+            # Replay follows/unfollows that happened while the loader ran
+            missed = bool(self._edits) and self._edits[0][0] > seq + 1
+            for edit_seq, follower, following, added in self._edits:
+                if edit_seq <= seq:
+                    continue
+                owner, other = (follower, following) if direction == FOLLOWING else (following, follower)
+                if owner == user_id:
+                    if added:
+                        loaded.add(other)
+                    else:
+                        loaded.discard(other)
+            idx = self._intern(user_id)
+            neighbours = array("I", sorted(self._intern(n) for n in loaded))
+            # Too many edits to replay: serve this copy once, reload on the next read
+            self._store(direction, idx, (-math.inf if missed else time.monotonic(), neighbours))
+            return read(neighbours)
+
+    @staticmethod
+    def _contains(arr: array, value: int) -> bool:
+        pos = bisect_left(arr, value)
+        return pos < len(arr) and arr[pos] == value
+
+    def _page(self, user_id, direction: str, offset: int, limit: int) -> list:
+        def read(arr):
+            end = len(arr) if limit is None else offset + limit
+            return [self._names[i] for i in arr[offset:end]]
+        return self._read(user_id, direction, read)
+
+    def followers(self, user_id, offset: int = 0, limit: int = None) -> list:
+        """Ids of users following user_id"""
+        return self._page(user_id, FOLLOWERS, offset, limit)
+
+    def following(self, user_id, offset: int = 0, limit: int = None) -> list:
+        """Ids of users that user_id follows"""
+        return self._page(user_id, FOLLOWING, offset, limit)
+
+    def followers_count(self, user_id) -> int:
+        return self._read(user_id, FOLLOWERS, len)
+
+    def following_count(self, user_id) -> int:
+        return self._read(user_id, FOLLOWING, len)
+
+    def is_following(self, follower_id, following_id) -> bool:
+        def read(arr):
+            target = self._index.get(str(following_id))
+            return target is not None and self._contains(arr, target)
+        return self._read(follower_id, FOLLOWING, read)
+
+    def following_set(self, user_id) -> set:
+        """Followed user ids as a set, for intersecting with other id lists"""
+        return set(self.following(user_id))
+
+    def _edit(self, follower_id, following_id, added: bool):
+        """Apply a follow (added) or unfollow to whichever side is loaded"""
+        follower_id, following_id = str(follower_id), str(following_id)
+        with self._lock:
+            self._edit_seq += 1
+            self._edits.append((self._edit_seq, follower_id, following_id, added))
+            for direction, owner, other in ((FOLLOWING, follower_id, following_id),
+                                            (FOLLOWERS, following_id, follower_id)):
+                idx = self._index.get(owner)
+                entry = self._lists[direction].get(idx) if idx is not None else None
+                if entry is None:
+                    continue
+                arr = entry[1]
+                if added:
+                    value = self._intern(other)
+                    pos = bisect_left(arr, value)
+                    if pos == len(arr) or arr[pos] != value:
+                        arr.insert(pos, value)
+                        self._acquire(value)
+                else:
+                    value = self._index.get(other)
+                    if value is not None and self._contains(arr, value):
+                        del arr[bisect_left(arr, value)]
+                        self._release(value)
+
+    def add_edge(self, follower_id, following_id):
+        """Record follower_id -> following_id in whichever side is loaded"""
+        self._edit(follower_id, following_id, True)
+
+    def remove_edge(self, follower_id, following_id):
+        """Drop follower_id -> following_id from whichever side is loaded"""
+        self._edit(follower_id, following_id, False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            idx = self._index.get(str(user_id))
+            for direction in (FOLLOWERS, FOLLOWING):
+                entry = self._lists[direction].pop(idx, None) if idx is not None else None
+                if entry is not None:
+                    self._drop(idx, entry)
+
+    def clear(self):
+        with self._lock:
+            for lists in self._lists.values():
+                lists.clear()
+            self._index.clear()
+            self._names.clear()
+            self._refs.clear()
+            self._free.clear()
+
+    def memory_stats(self) -> dict:
+        """Approximate memory held by the cache and its cost per cached edge"""
+        with self._lock:
+            edges = 0
+            adjacency_bytes = 0
+            for lists in self._lists.values():
+                adjacency_bytes += sys.getsizeof(lists)
+                for _, arr in lists.values():
+                    edges += len(arr)
+                    adjacency_bytes += sys.getsizeof(arr)
+            intern_bytes = sys.getsizeof(self._index) + sys.getsizeof(self._names) + \
+                sys.getsizeof(self._refs) + sum(sys.getsizeof(name) for name in self._index)
+            return {
+                "users_interned": len(self._index),
+                "lists_cached": sum(len(lists) for lists in self._lists.values()),
+                "edge_entries": edges,
+                "adjacency_bytes": adjacency_bytes,
+                "intern_bytes": intern_bytes,
+                "bytes_per_edge": round(adjacency_bytes / edges, 2) if edges else 0.0,
+            }
+
+
+def _load_from_supabase(user_id: str, direction: str) -> list:
+    """Page through `followers` for one user; PostgREST caps responses at 1000 rows"""
+    from supabase_client import supabase  # Import here so the graph can be used without Supabase config
+
+    if direction == FOLLOWERS:
+        select_col, filter_col = "follower_id", "following_id"
+    else:
+        select_col, filter_col = "following_id", "follower_id"
+
+    ids = []
+    page_size = 1000
+    start = 0
+    while True:
+        res = supabase.table("followers")\
+            .select(select_col)\
+            .eq(filter_col, user_id)\
+            .range(start, start + page_size - 1)\
+            .execute()
+        rows = res.data or []
+        ids.extend(r[select_col] for r in rows)
+        if len(rows) < page_size:
+            return ids
+        start += page_size
+
+
+# Process-wide graph used by social_routes and user_routes
+follow_graph = FollowGraph(_load_from_supabase)
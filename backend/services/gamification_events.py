@@ -0,0 +1,191 @@
+# backend/services/gamification_events.py
+import atexit
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+import logging
+import threading
+import time
+from services.write_behind import PeriodicFlusher
+
+POST_CREATED = "post_created"
+RECIPE_POSTED = "recipe_posted"
+LIKE_RECEIVED = "like_received"
+COMMENT_MADE = "comment_made"
+FOLLOW_GAINED = "follow_gained"
+FOLLOW_MADE = "follow_made"
+
+# What the rewarded user gets per event, and whether the event counts as
+# that user being active today (for streaks). Zero-reward events are still
+# recorded once so the badge engine can count them.
+Rule = namedtuple("Rule", "xp coins activity")
+RULES = {
+    POST_CREATED: Rule(xp=20, coins=5, activity=True),
+    RECIPE_POSTED: Rule(xp=0, coins=0, activity=False),
+    LIKE_RECEIVED: Rule(xp=2, coins=0, activity=False),
+    COMMENT_MADE: Rule(xp=5, coins=1, activity=True),
+    FOLLOW_GAINED: Rule(xp=10, coins=2, activity=False),
+    FOLLOW_MADE: Rule(xp=0, coins=0, activity=False),
+}
+
+
+def _apply_in_supabase(rows: list) -> list:
+    from supabase_client import supabase  # Import here so the pipeline can be used without Supabase config
+
+    res = supabase.rpc("apply_gamification_events", {"p_events": rows}).execute()
+    return res.data or []
+
+
+def _post_authors(post_ids: list) -> dict:
+    from supabase_client import supabase
+
+    res = supabase.table("posts").select("id, user_id").in_("id", post_ids).execute()
+    return {p["id"]: p["user_id"] for p in (res.data or [])}
+
+
+class GamificationPipeline(PeriodicFlusher):
+    """
+    Applies XP, coin and streak rewards for domain events in the background.
+
+    Routes call emit() and return right away. A worker thread drains the
+    queue in batches, resolves who is rewarded (e.g. the author of a liked
+    post), turns events into rewards with RULES and hands the batch to the
+    apply_gamification_events RPC.
+
+    Every event carries a deterministic event_key (e.g. "like:<post>:<user>").
+    The RPC records keys in `gamification_events` and only rewards keys it
+    has not seen, in the same transaction. Retrying a batch, or liking the
+    same post again after an unlike, therefore never pays out twice.
+    Listeners registered with on_applied() receive the events that were
+    newly applied.
+    """
+
+    thread_name = "gamification-events"
+    MAX_BATCH = 500
+    MAX_QUEUE = 100000
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, apply=_apply_in_supabase, resolve_authors=_post_authors, flush_interval: float = 1.0):
+        super().__init__(flush_interval)
+        self._apply = apply
+        self._resolve_authors = resolve_authors
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._listeners = []
+        self._metrics = {
+            "events_emitted": 0,
+            "events_dropped": 0,
+            "events_applied": 0,
+            "events_duplicate": 0,
+            "batch_failures": 0,
+            "last_batch_ms": 0.0,
+        }
+
+    def emit(self, event_type: str, event_key: str, user_id=None, actor_id=None, post_id=None):
+        """
+        Queue a domain event.
+
+        Args:
+            event_type: one of the RULES keys
+            event_key: identifies the event; the same key is rewarded at most once
+            user_id: who is rewarded; for LIKE_RECEIVED leave it out and pass post_id
+            actor_id: who caused the event; nobody is rewarded for their own actions on their own content
+            post_id: the post involved, if any
+        """
+        event = {
+            "event_type": event_type,
+            "event_key": event_key,
+            "user_id": str(user_id) if user_id else None,
+            "actor_id": str(actor_id) if actor_id else None,
+            "post_id": str(post_id) if post_id else None,
+            "occurred_at": datetime.now(timezone.utc).isoformat(),
+            "attempts": 0,
+        }
+        with self._lock:
+            if len(self._queue) >= self.MAX_QUEUE:
+                self._metrics["events_dropped"] += 1
+                logging.error(f"Gamification queue full, dropping {event_key}")
+                return
+            self._queue.append(event)
+            self._metrics["events_emitted"] += 1
+        self._ensure_thread()
+
+    def on_applied(self, listener):
+        """Call listener(events) with each batch of newly applied events"""
+        self._listeners.append(listener)
+
+    def flush(self) -> int:
+        """Apply everything queued so far; returns the number of newly applied events"""
+        applied = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.MAX_BATCH, len(self._queue)))]
+                if not batch:
+                    return applied
+                count = self._apply_batch(batch)
+                if count is None:
+                    return applied  # failed; retried on the next flush
+                applied += count
+
+    def _apply_batch(self, batch: list) -> int:
+        started = time.perf_counter()
+        try:
+            missing = list({e["post_id"] for e in batch if not e["user_id"] and e["post_id"]})
+            authors = self._resolve_authors(missing) if missing else {}
+
+            rows = {}
+            for event in batch:
+                user_id = event["user_id"] or authors.get(event["post_id"])
+                if not user_id or user_id == event["actor_id"]:
+                    continue
+                rule = RULES[event["event_type"]]
+                rows[event["event_key"]] = {
+                    "event_key": event["event_key"],
+                    "event_type": event["event_type"],
+                    "user_id": user_id,
+                    "xp": rule.xp,
+                    "coins": rule.coins,
+                    "is_activity": rule.activity,
+                    "occurred_at": event["occurred_at"],
+                }
+            applied = self._apply(list(rows.values())) if rows else []
+        except Exception as e:
+            self._retry(batch, e)
+            return None
+
+        with self._lock:
+            self._metrics["events_applied"] += len(applied)
+            self._metrics["events_duplicate"] += len(rows) - len(applied)
+            self._metrics["last_batch_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+
+        for listener in self._listeners:
+            try:
+                listener(applied)
+            except Exception as e:
+                logging.error(f"Gamification listener failed: {e}")
+        return len(applied)
+
+    def _retry(self, batch: list, error: Exception):
+        """Put a failed batch back; event keys make the retry safe"""
+        with self._lock:
+            self._metrics["batch_failures"] += 1
+            for event in reversed(batch):
+                event["attempts"] += 1
+                if event["attempts"] >= self.MAX_ATTEMPTS:
+                    self._metrics["events_dropped"] += 1
+                    logging.error(f"Giving up on gamification event {event['event_key']}: {error}")
+                else:
+                    self._queue.appendleft(event)
+        logging.error(f"Gamification batch failed, will retry: {error}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["queued_events"] = len(self._queue)
+        return stats
+
+
+# Process-wide pipeline; routes emit into it and it drains on interpreter exit
+gamification_events = GamificationPipeline()
+atexit.register(gamification_events.shutdown)
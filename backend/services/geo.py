@@ -0,0 +1,154 @@
+# backend/services/geo.py
+import heapq
+import math
+import re
+
+EARTH_RADIUS_KM = 6371.0088
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_LAT_LNG = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def parse_location(value):
+    """
+    (lat, lng) from {"lat", "lng"} / {"latitude", "longitude"} or a "lat,lng" string.
+
+    Returns:
+        tuple, or None for anything else (including free text such as "Anaheim, CA")
+    """
+    if isinstance(value, dict):
+        lat = value.get("lat", value.get("latitude"))
+        lng = value.get("lng", value.get("longitude", value.get("lon")))
+    elif isinstance(value, str) and _LAT_LNG.match(value):
+        lat, lng = _LAT_LNG.match(value).groups()
+    else:
+        return None
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return lat, lng
+
+
+def geohash(lat: float, lng: float, precision: int = 6) -> str:
+    """Standard base32 geohash; precision 6 cells are about 1.2 km x 0.6 km"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2.0
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_center(cell: str) -> tuple:
+    """(lat, lng) at the middle of a geohash cell"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2.0
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2.0, (lng_range[0] + lng_range[1]) / 2.0
+
+
+def _unit_vector(lat: float, lng: float) -> tuple:
+    phi, lam = math.radians(lat), math.radians(lng)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def _chord(km: float) -> float:
+    """Straight-line distance through the unit sphere for a surface distance"""
+    return 2.0 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2.0)
+
+
+def _surface_km(chord: float) -> float:
+    return 2.0 * EARTH_RADIUS_KM * math.asin(min(chord / 2.0, 1.0))
+
+
+def distance_km(a: tuple, b: tuple) -> float:
+    """Great-circle distance between two (lat, lng) points"""
+    return _surface_km(math.dist(_unit_vector(*a), _unit_vector(*b)))
+
+
+class KDTree:
+    """
+    Static 3-d tree over points on the globe, for k-nearest-within-radius queries.
+
+    Points are stored as unit vectors, so straight-line distance orders
+    them exactly like great-circle distance, with no special cases at the
+    poles or the antimeridian. Built once (O(n log n)); each query visits
+    O(log n + k) nodes on typical data.
+    """
+
+    def __init__(self, points: list):
+        """points: [(lat, lng, payload), ...]"""
+        self._size = len(points)
+        self._root = self._build([(_unit_vector(lat, lng), payload) for lat, lng, payload in points], 0)
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _build(items: list, axis: int):
+        if not items:
+            return None
+        items.sort(key=lambda item: item[0][axis])
+        mid = len(items) // 2
+        point, payload = items[mid]
+        return (point, payload, axis,
+                KDTree._build(items[:mid], (axis + 1) % 3),
+                KDTree._build(items[mid + 1:], (axis + 1) % 3))
+
+    def nearest(self, lat: float, lng: float, k: int, radius_km: float) -> list:
+        """
+        Up to k payloads within radius_km of (lat, lng), closest first.
+
+        Returns:
+            list: [(distance_km, payload), ...]
+        """
+        if k <= 0 or self._root is None:
+            return []
+        target = _unit_vector(lat, lng)
+        limit = _chord(radius_km)
+        best = []  # max-heap of (-distance, tiebreak, payload)
+        counter = 0
+
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, payload, axis, left, right = node
+            bound = limit if len(best) < k else min(limit, -best[0][0])
+            dist = math.dist(point, target)
+            if dist <= bound:
+                counter += 1
+                heapq.heappush(best, (-dist, counter, payload))
+                if len(best) > k:
+                    heapq.heappop(best)
+                bound = limit if len(best) < k else min(limit, -best[0][0])
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            if abs(diff) <= bound:
+                stack.append(far)
+            stack.append(near)  # popped first
+
+        return [(round(_surface_km(-d), 3), payload) for d, _, payload in sorted(best, key=lambda b: (-b[0], b[1]))]
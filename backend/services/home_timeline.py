@@ -0,0 +1,159 @@
+# backend/services/home_timeline.py
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import logging
+from supabase_client import supabase
+from services.cache import TTLCache
+from services.follow_graph import follow_graph
+from services.pagination import encode_cursor, keyset_filter
+
+
+def _sort_key(entry: dict):
+    """(created_at, id) as comparable values; timestamps vary in fractional digits"""
+    return datetime.fromisoformat(entry["created_at"]), entry["id"]
+
+
+class HomeTimeline:
+    """
+    Following-only feed backed by a materialized per-user timeline.
+
+    When a post is created its id is pushed (fan-out-on-write) into the
+    `home_timeline` rows of the author and each follower, trimmed to the
+    newest MAX_ENTRIES per user. Authors with more than
+    FANOUT_MAX_FOLLOWERS followers are recorded in `timeline_celebrities`
+    instead, and their posts are merged in when the timeline is read
+    (fan-out-on-read), so one post never turns into millions of writes.
+
+    Following someone backfills their newest BACKFILL_POSTS posts into the
+    follower's timeline. Unfollowing leaves rows behind; they are filtered
+    out when the timeline is read.
+    """
+
+    MAX_ENTRIES = 500
+    FANOUT_MAX_FOLLOWERS = 5000
+    BACKFILL_POSTS = 50
+    MAX_READ_ROUNDS = 5  # batches scanned per page when unfollowed authors are skipped
+
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="timeline-fanout")
+    _celebrities = TTLCache(maxsize=1, ttl=60)
+
+    @staticmethod
+    def publish(post: dict):
+        """Fan a newly created post out in the background; returns the Future"""
+        return HomeTimeline._executor.submit(HomeTimeline._fan_out, post)
+
+    @staticmethod
+    def _fan_out(post: dict):
+        author_id = post["user_id"]
+        try:
+            if follow_graph.followers_count(author_id) > HomeTimeline.FANOUT_MAX_FOLLOWERS:
+                supabase.table("timeline_celebrities").upsert({"user_id": author_id}).execute()
+                HomeTimeline._celebrities.clear()
+                recipients = [author_id]
+            else:
+                recipients = follow_graph.followers(author_id) + [author_id]
+
+            supabase.rpc("fan_out_post", {
+                "p_post_id": post["id"],
+                "p_author_id": author_id,
+                "p_created_at": post["created_at"],
+                "p_user_ids": recipients,
+                "p_max_entries": HomeTimeline.MAX_ENTRIES,
+            }).execute()
+        except Exception as e:
+            logging.error(f"Timeline fan-out failed for post {post.get('id')}: {e}")
+
+    @staticmethod
+    def backfill(follower_id, author_id):
+        """Copy a newly followed author's recent posts into the follower's timeline in the background"""
+        return HomeTimeline._executor.submit(HomeTimeline._backfill, str(follower_id), str(author_id))
+
+    @staticmethod
+    def _backfill(follower_id: str, author_id: str):
+        try:
+            if author_id in HomeTimeline._celebrity_ids():
+                return  # merged in at read time
+            supabase.rpc("backfill_timeline", {
+                "p_user_id": follower_id,
+                "p_author_id": author_id,
+                "p_limit": HomeTimeline.BACKFILL_POSTS,
+                "p_max_entries": HomeTimeline.MAX_ENTRIES,
+            }).execute()
+        except Exception as e:
+            logging.error(f"Timeline backfill failed for {follower_id} -> {author_id}: {e}")
+
+    @staticmethod
+    def _celebrity_ids() -> set:
+        cached = HomeTimeline._celebrities.get("ids")
+        if cached is None:
+            res = supabase.table("timeline_celebrities").select("user_id").execute()
+            cached = {r["user_id"] for r in (res.data or [])}
+            HomeTimeline._celebrities.set("ids", cached)
+        return cached
+
+    @staticmethod
+    def read(user_id, after: list, per_page: int) -> tuple:
+        """
+        A page of the viewer's following-only timeline, newest first.
+
+        Args:
+            user_id: the viewer
+            after: decoded (created_at, id) cursor values, or None for the first page
+            per_page: page size
+
+        Returns:
+            tuple: (list of {"id", "created_at", "user_id"} entries, next_cursor)
+        """
+        visible, cursor = [], after
+        for _ in range(HomeTimeline.MAX_READ_ROUNDS):
+            batch, exhausted = HomeTimeline._merged_batch(user_id, cursor, per_page + 1)
+            # Drop posts from authors the viewer has since unfollowed
+            visible.extend(
+                e for e in batch
+                if e["user_id"] == user_id or follow_graph.is_following(user_id, e["user_id"])
+            )
+            if len(visible) > per_page:
+                entries = visible[:per_page]
+                return entries, encode_cursor(entries[-1], ("created_at", "id"))
+            if exhausted:
+                return visible, None
+            cursor = [batch[-1]["created_at"], batch[-1]["id"]]
+        # Mostly unfollowed authors: return a short page and let the client continue from here
+        return visible, encode_cursor({"created_at": cursor[0], "id": cursor[1]}, ("created_at", "id"))
+
+    @staticmethod
+    def _merged_batch(user_id, after: list, limit: int) -> tuple:
+        """
+        The next `limit` entries after the cursor, from the materialized
+        timeline and followed celebrities combined.
+
+        Returns:
+            tuple: (entries newest first, True if nothing follows them)
+        """
+        query = supabase.table("home_timeline")\
+            .select("post_id, author_id, created_at")\
+            .eq("user_id", user_id)\
+            .order("created_at", desc=True)\
+            .order("post_id", desc=True)
+        if after:
+            query = query.or_(keyset_filter(("created_at", "post_id"), after))
+        rows = query.limit(limit).execute().data or []
+        entries = [{"id": r["post_id"], "created_at": r["created_at"], "user_id": r["author_id"]} for r in rows]
+
+        celebrities = [uid for uid in HomeTimeline._celebrity_ids() if follow_graph.is_following(user_id, uid)]
+        if celebrities:
+            query = supabase.table("posts")\
+                .select("id, created_at, user_id")\
+                .in_("user_id", celebrities)\
+                .order("created_at", desc=True)\
+                .order("id", desc=True)
+            if after:
+                query = query.or_(keyset_filter(("created_at", "id"), after))
+            entries.extend(query.limit(limit).execute().data or [])
+
+        # A post can be in both sources if its author became a celebrity later
+        entries = list({e["id"]: e for e in entries}.values())
+        entries.sort(key=_sort_key, reverse=True)
+        # Each source returned at most `limit` rows, so only the first `limit`
+        # of the merge are certain to have nothing missing between them
+        return entries[:limit], len(entries) < limit
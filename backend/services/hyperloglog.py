@@ -0,0 +1,60 @@
+# backend/services/hyperloglog.py
+import hashlib
+import math
+
+PRECISION = 10                   # 2^10 = 1024 one-byte registers, ~3.3% standard error
+REGISTERS = 1 << PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def _hash64(value) -> int:
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Fixed-size sketch estimating how many distinct values were added.
+
+    The top PRECISION bits of a value's 64-bit hash select a register,
+    which keeps the longest run of leading zeros seen in the remaining
+    bits. Sketches merge by taking the per-register maximum, so buckets
+    can be combined in Python or in SQL (hll_merge / hll_estimate in
+    supabase_schema.sql implement the same layout and estimate).
+    """
+
+    __slots__ = ("registers",)
+
+    def __init__(self, registers: bytes = None):
+        if registers is not None and len(registers) != REGISTERS:
+            raise ValueError(f"HyperLogLog sketch must be {REGISTERS} bytes")
+        self.registers = bytearray(registers) if registers is not None else bytearray(REGISTERS)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - PRECISION)
+        rest = h & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        registers = self.registers
+        for i, value in enumerate(other.registers):
+            if value > registers[i]:
+                registers[i] = value
+
+    def count(self) -> int:
+        total = 0.0
+        zeros = 0
+        for value in self.registers:
+            total += 2.0 ** -value
+            if value == 0:
+                zeros += 1
+        estimate = _ALPHA * REGISTERS * REGISTERS / total
+        if estimate <= 2.5 * REGISTERS and zeros:
+            # Linear counting is more accurate while most registers are still empty
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
@@ -0,0 +1,25 @@
+# backend/services/ingredient_prices.py
+from supabase_client import supabase
+
+
+class IngredientPriceLookup:
+    """Finds a store price for each ingredient name of an estimate"""
+
+    @staticmethod
+    def match(names: list) -> list:
+        """
+        Price rows for names, resolved in one round trip.
+
+        Uses the match_ingredient_prices RPC: each name matches the newest
+        `ingredient_prices` row whose ingredient_name contains it
+        (case-insensitive, served by a trigram index).
+
+        Returns:
+            list: the matching row (dict) or None for each name, in order
+        """
+        if not names:
+            return []
+        unique = list(dict.fromkeys(name.lower() for name in names))
+        res = supabase.rpc("match_ingredient_prices", {"p_names": unique}).execute()
+        by_name = {unique[row["idx"] - 1]: row["price"] for row in (res.data or [])}
+        return [by_name.get(name.lower()) for name in names]
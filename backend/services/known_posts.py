@@ -0,0 +1,6 @@
+# backend/services/known_posts.py
+from services.cache import TTLCache
+
+# Post ids known to exist, so repeated taps skip the existence round trip.
+# Shared by the post and engagement routes; deleting a post invalidates its id.
+known_posts = TTLCache(maxsize=50000, ttl=300)
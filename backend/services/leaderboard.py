@@ -0,0 +1,260 @@
+# backend/services/leaderboard.py
+import logging
+import random
+import threading
+import time
+from services.gamification_events import gamification_events
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels: int):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [0] * levels
+
+
+class RankedSkipList:
+    """
+    Sorted collection with O(log n) insert, remove, rank and select.
+
+    Every forward link stores its width: how many elements it skips.
+    Summing widths while searching gives a key's position, and following
+    widths down from the head finds the element at a given index. Keys
+    must be unique and comparable.
+    """
+
+    MAX_LEVEL = 24  # comfortable for ~16M elements
+
+    def __init__(self):
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._head.width = [1] * self.MAX_LEVEL
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < RankedSkipList.MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def _find(self, key) -> tuple:
+        """(last node < key at each level, its position); the head is position 0"""
+        update = [None] * self.MAX_LEVEL
+        steps = [0] * self.MAX_LEVEL
+        node, pos = self._head, 0
+        for i in reversed(range(self.MAX_LEVEL)):
+            while node.next[i] is not None and node.next[i].key < key:
+                pos += node.width[i]
+                node = node.next[i]
+            update[i] = node
+            steps[i] = pos
+        return update, steps
+
+    def insert(self, key):
+        update, steps = self._find(key)
+        level = self._random_level()
+        new = _Node(key, level)
+        new_pos = steps[0] + 1
+        for i in range(self.MAX_LEVEL):
+            prev = update[i]
+            if i < level:
+                new.next[i] = prev.next[i]
+                new.width[i] = steps[i] + prev.width[i] + 1 - new_pos
+                prev.next[i] = new
+                prev.width[i] = new_pos - steps[i]
+            else:
+                prev.width[i] += 1
+        self._size += 1
+
+    def remove(self, key) -> bool:
+        update, _ = self._find(key)
+        target = update[0].next[0]
+        if target is None or target.key != key:
+            return False
+        for i in range(self.MAX_LEVEL):
+            prev = update[i]
+            if prev.next[i] is target:
+                prev.width[i] += target.width[i] - 1
+                prev.next[i] = target.next[i]
+            else:
+                prev.width[i] -= 1
+        self._size -= 1
+        return True
+
+    def count_less(self, key) -> int:
+        """Number of keys strictly smaller than key"""
+        _, steps = self._find(key)
+        return steps[0]
+
+    def iter_from(self, index: int):
+        """Keys in order starting at 0-based index"""
+        if index < 0 or index >= self._size:
+            return
+        target = index + 1
+        node, pos = self._head, 0
+        for i in reversed(range(self.MAX_LEVEL)):
+            while node.next[i] is not None and pos + node.width[i] <= target:
+                pos += node.width[i]
+                node = node.next[i]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+
+def _load_all_xp() -> dict:
+    from supabase_client import supabase  # Import here so the leaderboard can be used without Supabase config
+
+    xp, start, page_size = {}, 0, 1000
+    while True:
+        res = supabase.table("user_gamification")\
+            .select("user_id, xp")\
+            .gt("xp", 0)\
+            .order("user_id")\
+            .range(start, start + page_size - 1)\
+            .execute()
+        rows = res.data or []
+        xp.update((r["user_id"], r["xp"]) for r in rows)
+        if len(rows) < page_size:
+            return xp
+        start += page_size
+
+
+class Leaderboard:
+    """
+    In-memory XP leaderboard.
+
+    Users are kept in a RankedSkipList ordered by (-xp, user_id), so top-K,
+    a user's rank and the users around them are O(log n + k) with no
+    `ORDER BY xp` against the database. Ranks are competition style:
+    users with equal XP share a rank. Awards made in this process update
+    the board as they happen (RewardService results and applied
+    gamification events). The board is reloaded from `user_gamification`
+    every RELOAD_INTERVAL seconds to pick up other processes' writes.
+    """
+
+    RELOAD_INTERVAL = 300  # seconds
+
+    def __init__(self, loader=_load_all_xp, clock=time.monotonic):
+        self._loader = loader
+        self._clock = clock
+        self._entries = RankedSkipList()
+        self._xp = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is not None and self._clock() - self._loaded_at < self.RELOAD_INTERVAL:
+            return
+        if not self._reload_lock.acquire(blocking=self._loaded_at is None):
+            return  # another thread is reloading; serve the current board meanwhile
+        try:
+            self.reload()
+        except Exception as e:
+            logging.error(f"Leaderboard reload failed: {e}")
+            self._loaded_at = self._clock()
+        finally:
+            self._reload_lock.release()
+
+    def reload(self):
+        xp = {str(uid): value for uid, value in self._loader().items() if value > 0}
+        entries = RankedSkipList()
+        for user_id, value in xp.items():
+            entries.insert((-value, user_id))
+        with self._lock:
+            self._entries, self._xp = entries, xp
+            self._loaded_at = self._clock()
+
+    def _set(self, user_id: str, xp: int):
+        old = self._xp.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self._entries.remove((-old, user_id))
+        if xp > 0:
+            self._entries.insert((-xp, user_id))
+            self._xp[user_id] = xp
+        else:
+            self._xp.pop(user_id, None)
+
+    def set_xp(self, user_id, xp: int):
+        with self._lock:
+            self._set(str(user_id), xp)
+
+    def add_xp(self, user_id, delta: int):
+        user_id = str(user_id)
+        with self._lock:
+            self._set(user_id, self._xp.get(user_id, 0) + delta)
+
+    def apply_events(self, events: list):
+        """on_applied listener for the gamification event pipeline"""
+        gained = {}
+        for event in events:
+            if event.get("xp"):
+                gained[event["user_id"]] = gained.get(event["user_id"], 0) + event["xp"]
+        for user_id, xp in gained.items():
+            self.add_xp(user_id, xp)
+
+    def _rank_of(self, xp: int) -> int:
+        return self._entries.count_less((-xp, "")) + 1
+
+    def _page(self, start: int, limit: int) -> list:
+        entries = []
+        rank = None
+        for index, (neg_xp, user_id) in enumerate(self._entries.iter_from(start), start):
+            if len(entries) >= limit:
+                break
+            if rank is None or -neg_xp != entries[-1]["xp"]:
+                rank = self._rank_of(-neg_xp) if rank is None else index + 1
+            entries.append({"rank": rank, "user_id": user_id, "xp": -neg_xp})
+        return entries
+
+    def top(self, limit: int = 10, offset: int = 0) -> list:
+        """[{"rank", "user_id", "xp"}, ...] from the top of the board"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._page(offset, limit)
+
+    def rank(self, user_id) -> dict:
+        """{"rank", "xp", "total"} for user_id; users without XP rank after everyone with XP"""
+        self._ensure_loaded()
+        with self._lock:
+            xp = self._xp.get(str(user_id), 0)
+            return {"rank": self._rank_of(xp), "xp": xp, "total": len(self._entries)}
+
+    def around(self, user_id, radius: int = 2) -> list:
+        """The user's entry with up to `radius` users above and below"""
+        self._ensure_loaded()
+        user_id = str(user_id)
+        with self._lock:
+            xp = self._xp.get(user_id)
+            if xp is None:
+                return []
+            index = self._entries.count_less((-xp, user_id))
+            start = max(0, index - radius)
+            return self._page(start, index - start + radius + 1)
+
+    def friends(self, user_id, following_ids, limit: int = 50) -> list:
+        """The board restricted to user_id and the users they follow"""
+        self._ensure_loaded()
+        members = set(map(str, following_ids)) | {str(user_id)}
+        with self._lock:
+            ranked = sorted((-self._xp.get(uid, 0), uid) for uid in members)
+        entries = []
+        for index, (neg_xp, uid) in enumerate(ranked[:limit]):
+            if entries and entries[-1]["xp"] == -neg_xp:
+                rank = entries[-1]["rank"]
+            else:
+                rank = index + 1
+            entries.append({"rank": rank, "user_id": uid, "xp": -neg_xp})
+        return entries
+
+
+# Process-wide board, kept current by the gamification event pipeline
+leaderboard = Leaderboard()
+gamification_events.on_applied(leaderboard.apply_events)
@@ -0,0 +1,143 @@
+# backend/services/message_broker.py
+import json
+import os
+import queue
+import threading
+
+
+class Subscription:
+    """A subscriber's view of one channel; events are buffered until read"""
+
+    MAX_PENDING = 100
+
+    def __init__(self, broker, channel: str):
+        self.broker = broker
+        self.channel = channel
+        self._queue = queue.Queue(maxsize=self.MAX_PENDING)
+
+    def deliver(self, event: dict):
+        """Queue an event, dropping the oldest one if the subscriber has fallen behind"""
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float = None):
+        """Next event, or None if nothing arrived within timeout seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """
+    Process-local pub/sub. Publishers and subscribers must live in the same
+    worker, which is enough for a single-process deployment and for tests.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel: str, event: dict) -> int:
+        """Deliver event to every local subscriber of channel; returns how many received it"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+class RedisBroker(InMemoryBroker):
+    """
+    Fans events out across workers through Redis pub/sub.
+
+    Each worker keeps its local subscribers as InMemoryBroker does; publish()
+    goes through Redis and a listener thread delivers whatever arrives to
+    the local subscribers of that channel.
+    """
+
+    def __init__(self, url: str):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("MESSAGE_BROKER_URL points at Redis but the 'redis' package is not installed") from e
+        self._redis = redis.Redis.from_url(url)
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.psubscribe(**{"conversation:*": self._on_message})
+        self._listener = self._pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+
+    def _on_message(self, message):
+        channel = message["channel"].decode() if isinstance(message["channel"], bytes) else message["channel"]
+        super().publish(channel, json.loads(message["data"]))
+
+    def publish(self, channel: str, event: dict) -> int:
+        return self._redis.publish(channel, json.dumps(event, default=str))
+
+
+def format_sse(event: dict) -> str:
+    """Serialize an event ({"type", "data", optional "id"}) as a Server-Sent Events frame"""
+    lines = []
+    if event.get("id"):
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event.get('data'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def conversation_channel(conversation_id) -> str:
+    return f"conversation:{conversation_id}"
+
+
+def _create_broker():
+    url = os.getenv("MESSAGE_BROKER_URL", "")
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBroker(url)
+    return InMemoryBroker()
+
+
+# Process-wide broker used by messages_routes; swap with set_broker() in tests
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = _create_broker()
+        return _broker
+
+
+def set_broker(broker):
+    global _broker
+    with _broker_lock:
+        _broker = broker
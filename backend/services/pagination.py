@@ -0,0 +1,93 @@
+# backend/services/pagination.py
+import base64
+import json
+import re
+
+# Cursor values end up inside PostgREST filter strings, so only plain
+# timestamps (for *_at columns) and UUID / integer keys are accepted
+_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d{1,9})?(?:Z|[+-]\d{2}(?::?\d{2})?)?$")
+_KEY = re.compile(r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9]{1,19})$")
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_cursor(row: dict, columns: tuple) -> str:
+    """Build an opaque cursor pointing just past `row` for the given sort columns"""
+    raw = json.dumps([row[c] for c in columns], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: tuple) -> list:
+    """Decode a cursor from encode_cursor() back into its sort-key values"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(columns) or not all(isinstance(v, str) for v in values):
+        raise InvalidCursor("Invalid cursor")
+    for column, value in zip(columns, values):
+        pattern = _TIMESTAMP if column.endswith("_at") else _KEY
+        if not pattern.match(value):
+            raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def keyset_filter(columns: tuple, values: list, desc: bool = True) -> str:
+    """
+    PostgREST `or` filter selecting rows strictly after the cursor position.
+
+    For columns (a, b) in descending order this is
+    a < va OR (a = va AND b < vb), which Postgres answers with an index
+    range scan instead of counting and discarding every earlier row.
+    """
+    op = "lt" if desc else "gt"
+    (first, last), (first_val, last_val) = columns, values
+    return f'{first}.{op}."{first_val}",and({first}.eq."{first_val}",{last}.{op}."{last_val}")'
+
+
+def paginate(query, request_args, columns: tuple = ("created_at", "id"), desc: bool = True, default_per_page: int = 20):
+    """
+    Apply page/per_page or cursor pagination to a Supabase query.
+
+    When `cursor` is present in the request args the query is positioned
+    with a keyset filter; otherwise the classic `page` offset is used.
+    One extra row is fetched either way so callers can tell whether
+    another page exists.
+
+    Returns:
+        tuple: (query, page, per_page)
+    Raises:
+        InvalidCursor: if the cursor cannot be decoded
+    """
+    page = int(request_args.get("page", 1))
+    per_page = int(request_args.get("per_page", default_per_page))
+    cursor = request_args.get("cursor")
+
+    for column in columns:
+        query = query.order(column, desc=desc)
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.or_(keyset_filter(columns, values, desc)).limit(per_page + 1)
+    else:
+        start = (page - 1) * per_page
+        query = query.range(start, start + per_page)
+
+    return query, page, per_page
+
+
+def split_page(rows: list, per_page: int, columns: tuple = ("created_at", "id")) -> tuple:
+    """
+    Trim the look-ahead row added by paginate().
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page
+    """
+    rows = rows or []
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor(rows[-1], columns)
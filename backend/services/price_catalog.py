@@ -0,0 +1,442 @@
+# backend/services/price_catalog.py
+from array import array
+from collections import namedtuple
+from datetime import datetime
+import logging
+import math
+import re
+import sys
+import threading
+import time
+import numpy as np
+from services.cache import TTLCache
+from services.geo import KDTree, distance_km, geohash, geohash_center, parse_location
+
+GRAM = 3
+MAX_CANDIDATES = 50
+MIN_SCORE = 0.3
+# Trigrams in more names than this (" ch", "ese", ...) barely narrow the
+# candidates, so they are left out of candidate counting when most of the
+# query's trigrams are rarer
+COMMON_GRAM_POSTINGS = 2000
+
+# Location-aware lookups: the cheapest of the NEAREST_STORES closest stores
+# within RADIUS_KM, computed once per geohash cell of CELL_PRECISION
+NEAREST_STORES = 5
+RADIUS_KM = 25.0
+CELL_PRECISION = 6  # ~1.2 km x 0.6 km
+
+# Query words mapped to the word stores usually list the ingredient under
+SYNONYMS = {
+    "scallion": "green onion",
+    "scallions": "green onion",
+    "spring onion": "green onion",
+    "cilantro": "coriander",
+    "garbanzo": "chickpea",
+    "garbanzo bean": "chickpea",
+    "courgette": "zucchini",
+    "aubergine": "eggplant",
+    "capsicum": "bell pepper",
+    "prawn": "shrimp",
+    "minced beef": "ground beef",
+    "mince": "ground beef",
+    "confectioners sugar": "powdered sugar",
+    "icing sugar": "powdered sugar",
+    "heavy whipping cream": "heavy cream",
+    "evoo": "extra virgin olive oil",
+}
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def _singular(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("oes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize(name: str) -> str:
+    """Lowercase, drop punctuation and plurals: "Tomatoes, Roma" -> "tomato roma" """
+    words = _NON_WORD.sub(" ", (name or "").lower()).split()
+    return " ".join(_singular(w) for w in words)
+
+
+def _grams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1)}
+
+
+def _edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _token_similarity(query_tokens: list, name_tokens: list) -> float:
+    """Overlap of the two token sets, counting a one-letter typo in a long word as a near match"""
+    matched = 0.0
+    for q in query_tokens:
+        best = 0.0
+        for n in name_tokens:
+            if q == n:
+                best = 1.0
+                break
+            if len(q) >= 4 and abs(len(q) - len(n)) <= 1 and _edit_distance(q, n) <= 1:
+                best = 0.8
+        matched += best
+    return matched / (len(query_tokens) + len(name_tokens) - matched)
+
+
+# names: sorted normalized names; rows: newest row per name; postings:
+# trigram -> name positions; offers: per name, {store position: newest row
+# at that store}; stores: KDTree of store positions; locations: (lat, lng)
+# per store position; version: increases with every refresh
+_Snapshot = namedtuple("_Snapshot", "names rows postings offers stores locations version")
+
+
+def _store_coordinates(row: dict):
+    if row.get("latitude") is not None and row.get("longitude") is not None:
+        return parse_location({"lat": row["latitude"], "lng": row["longitude"]})
+    return parse_location(row.get("store_location"))
+
+
+def _load_from_supabase() -> list:
+    from supabase_client import supabase  # Import here so the catalog can be used without Supabase config
+
+    rows, start, page_size = [], 0, 1000
+    while True:
+        res = supabase.table("ingredient_prices")\
+            .select("ingredient_name, price_per_unit, unit, store_name, store_location, latitude, longitude, "
+                    "currency, source_url, last_updated")\
+            .order("id")\
+            .range(start, start + page_size - 1)\
+            .execute()
+        page = res.data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+class PriceCatalog:
+    """
+    In-process copy of `ingredient_prices` with a fuzzy name matcher.
+
+    Rows are grouped by normalized ingredient name, keeping the most
+    recently updated price for each name. Every name is indexed by its
+    character trigrams, with postings stored as compact arrays. A lookup
+    takes the names that share the most trigrams with the query (counted
+    with NumPy, leaving out trigrams found in more than
+    COMMON_GRAM_POSTINGS names), then ranks them by token overlap, trigram
+    similarity and edit distance.
+    Ties are broken by name, so matches are deterministic. The query is
+    tried as typed and with SYNONYMS applied. Results are memoized per
+    normalized name until the next refresh.
+
+    Given the shopper's location, a name resolves to the cheapest offer
+    among the NEAREST_STORES stores within RADIUS_KM that stock it. Stores
+    are placed by latitude/longitude (or a "lat,lng" store_location) in a
+    KDTree. Answers are cached per (geohash cell, name), measured from the
+    cell centre, so shoppers in the same area share the work.
+
+    The catalog is loaded in the background at startup and reloaded every
+    REFRESH_INTERVAL seconds. Requests keep using the previous copy until
+    the new one is built.
+    """
+
+    REFRESH_INTERVAL = 900  # seconds
+
+    def __init__(self, loader=_load_from_supabase, clock=time.monotonic):
+        self._loader = loader
+        self._clock = clock
+        self._catalog = _Snapshot((), (), {}, (), KDTree([]), (), 0)
+        self._matches = TTLCache(maxsize=100000, ttl=self.REFRESH_INTERVAL)  # (version, name) -> (index, score)
+        self._nearby = TTLCache(maxsize=100000, ttl=self.REFRESH_INTERVAL)  # (version, cell, name, k, radius) -> (row, km)
+        self._loaded_at = None
+        self._refreshing = threading.Lock()
+        self._listeners = []
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    @property
+    def version(self) -> int:
+        """Increases with every refresh, so results derived from the catalog can be keyed by it"""
+        return self._catalog.version
+
+    def refresh(self):
+        """Rebuild the catalog from the loader and swap it in"""
+        newest = {}
+        at_store = {}  # (name, store position) -> newest row
+        stores = {}    # (store_name, store_location) -> (position, lat, lng)
+        for row in self._loader():
+            name = normalize(row.get("ingredient_name"))
+            if not name:
+                continue
+            current = newest.get(name)
+            if current is None or _updated(row) > _updated(current):
+                newest[name] = row
+
+            coordinates = _store_coordinates(row)
+            if coordinates is None:
+                continue
+            store_key = (row.get("store_name"), row.get("store_location"))
+            store = stores.setdefault(store_key, (len(stores),) + coordinates)
+            current = at_store.get((name, store[0]))
+            if current is None or _updated(row) > _updated(current):
+                at_store[(name, store[0])] = row
+
+        names = tuple(sorted(newest))
+        position = {name: i for i, name in enumerate(names)}
+        postings = {}
+        for i, name in enumerate(names):
+            for gram in _grams(name):
+                postings.setdefault(gram, array("I")).append(i)
+        offers = [None] * len(names)
+        for (name, store), row in at_store.items():
+            if _unit_price(row)[1] == math.inf:
+                continue  # no usable price (zero, negative, missing): never the cheapest, never sets the unit
+            if offers[position[name]] is None:
+                offers[position[name]] = {}
+            offers[position[name]][store] = row
+
+        # One rebind, so readers see either the old or the new catalog
+        self._catalog = _Snapshot(
+            names, tuple(newest[n] for n in names), postings, tuple(offers),
+            KDTree([(lat, lng, pos) for pos, lat, lng in stores.values()]),
+            tuple((lat, lng) for _, lat, lng in sorted(stores.values())),
+            self._catalog.version + 1,
+        )
+        self._matches.clear()
+        self._nearby.clear()
+        self._loaded_at = self._clock()
+
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                logging.error(f"Price catalog listener failed: {e}")
+
+    def on_refresh(self, listener):
+        """Call listener() after every (re)load of the catalog"""
+        self._listeners.append(listener)
+
+    def warm(self):
+        """Load in a background thread (e.g. at startup)"""
+        self._refresh_async()
+
+    def _refresh_async(self):
+        if not self._refreshing.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Price catalog refresh failed: {e}")
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, name="price-catalog-refresh", daemon=True).start()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None:
+            with self._refreshing:
+                if self._loaded_at is None:
+                    self.refresh()
+        elif self._clock() - self._loaded_at > self.REFRESH_INTERVAL:
+            self._refresh_async()
+
+    def _variants(self, query: str) -> list:
+        variants = [query]
+        for alias, canonical in SYNONYMS.items():
+            alias = normalize(alias)
+            if re.search(rf"\b{re.escape(alias)}\b", query):
+                variants.append(re.sub(rf"\b{re.escape(alias)}\b", normalize(canonical), query))
+        return variants
+
+    @staticmethod
+    def _score(query: str, query_grams: set, name: str, shared: int) -> float:
+        name_grams = len(_grams(name))
+        trigram = shared / (len(query_grams) + name_grams - shared)
+        tokens = _token_similarity(query.split(), name.split())
+        edit = 1.0 - _edit_distance(query, name) / max(len(query), len(name))
+        return 0.5 * tokens + 0.3 * trigram + 0.2 * edit
+
+    def _best(self, catalog: _Snapshot, name: str):
+        """(name position, score) of the best-scoring catalog name, or None"""
+        name = normalize(name)
+        cached = self._matches.get((catalog.version, name))
+        if cached is not None:
+            return cached or None
+
+        best = None
+        for query in self._variants(name):
+            if not query:
+                continue
+            query_grams = _grams(query)
+            postings = [catalog.postings.get(gram, ()) for gram in query_grams]
+            selective = [p for p in postings if len(p) <= COMMON_GRAM_POSTINGS]
+            if 2 * len(selective) < len(postings):
+                selective = postings  # mostly common grams: skipping them would lose the real matches
+            for index in _most_shared(selective):
+                candidate = catalog.names[index]
+                score = self._score(query, query_grams, candidate, len(query_grams & _grams(candidate)))
+                key = (-score, candidate, index)
+                if best is None or key < best:
+                    best = key
+        result = None if best is None or -best[0] < MIN_SCORE else (best[2], round(-best[0], 3))
+        self._matches.set((catalog.version, name), result or ())
+        return result
+
+    def _cheapest_nearby(self, catalog: _Snapshot, index: int, near: tuple, k: int, radius_km: float):
+        """(row, distance_km) for the cheapest offer among the k nearest stores stocking the name"""
+        offers = catalog.offers[index]
+        if not offers:
+            return None
+        cell = geohash(near[0], near[1], CELL_PRECISION)
+        # The version keeps an answer computed from a replaced snapshot out of the new one's cache
+        key = (catalog.version, cell, catalog.names[index], k, radius_km)
+        cached = self._nearby.get(key)
+        if cached is not None:
+            return cached or None
+
+        center = geohash_center(cell)
+        if len(offers) <= 4 * k:
+            # Few stores stock it: measuring each is cheaper than walking the tree
+            stocked = sorted(
+                (distance_km(center, catalog.locations[store]), store) for store in offers
+            )
+            stocked = [(round(d, 3), offers[store]) for d, store in stocked if d <= radius_km][:k]
+        else:
+            # Widen the tree search until k of the nearest stores stock it
+            want = 4 * k
+            while True:
+                nearest = catalog.stores.nearest(center[0], center[1], want, radius_km)
+                stocked = [(d, offers[store]) for d, store in nearest if store in offers][:k]
+                if len(stocked) == k or len(nearest) < want:
+                    break
+                want *= 4
+
+        result = None
+        if stocked:
+            # Compare like with like: offers priced in the nearest offer's kind of unit
+            dimension = _unit_price(stocked[0][1])[0]
+            comparable = [o for o in stocked if _unit_price(o[1])[0] == dimension]
+            distance, row = min(comparable, key=lambda offer: (_unit_price(offer[1])[1], offer[0]))
+            result = (row, distance)
+        self._nearby.set(key, result or ())
+        return result
+
+    def match(self, name: str, near=None, k: int = NEAREST_STORES, radius_km: float = RADIUS_KM):
+        """
+        Best catalog row for an ingredient name.
+
+        Args:
+            near: the shopper's (lat, lng); when given, the row is the cheapest offer
+                among the k nearest stores within radius_km that stock the name,
+                with "distance_km" added. If no such store exists the newest row is used.
+
+        Returns:
+            tuple: (row, score) for the best match, or None if nothing scores MIN_SCORE
+        """
+        self._ensure_fresh()
+        catalog = self._catalog
+        best = self._best(catalog, name)
+        if best is None:
+            return None
+        index, score = best
+        if near is not None:
+            nearby = self._cheapest_nearby(catalog, index, near, k, radius_km)
+            if nearby is not None:
+                row, distance = nearby
+                return dict(row, distance_km=distance), score
+        return catalog.rows[index], score
+
+    def match_many(self, names: list, near=None, **kwargs) -> list:
+        """match() for each name: the row (dict) or None, in order"""
+        return [(result[0] if result else None) for result in (self.match(n, near, **kwargs) for n in names)]
+
+    def memory_stats(self) -> dict:
+        """Approximate bytes held by the catalog, by structure"""
+        catalog = self._catalog
+        names, rows, postings, offers = catalog.names, catalog.rows, catalog.postings, catalog.offers
+        names_bytes = sys.getsizeof(names) + sum(sys.getsizeof(n) for n in names)
+        rows_bytes = sys.getsizeof(rows) + sum(
+            sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in rows
+        )
+        index_bytes = sys.getsizeof(postings) + sum(
+            sys.getsizeof(g) + sys.getsizeof(p) for g, p in postings.items()
+        )
+        offer_bytes = sys.getsizeof(offers) + sum(sys.getsizeof(o) for o in offers if o)
+        return {
+            "names": len(names),
+            "stores": len(catalog.stores),
+            "grams": len(postings),
+            "postings": sum(len(p) for p in postings.values()),
+            "names_bytes": names_bytes,
+            "rows_bytes": rows_bytes,
+            "index_bytes": index_bytes,
+            "offer_bytes": offer_bytes,
+            "total_bytes": names_bytes + rows_bytes + index_bytes + offer_bytes,
+        }
+
+
+def _most_shared(postings: list) -> list:
+    """
+    Up to MAX_CANDIDATES name positions that appear in the most postings,
+    ordered by that count and then by position
+    """
+    postings = [np.frombuffer(p, dtype=np.uintc) for p in postings if len(p)]
+    if not postings:
+        return []
+    counts = np.bincount(np.concatenate(postings))
+    positions = np.flatnonzero(counts)
+    shared = counts[positions]
+    if len(positions) > MAX_CANDIDATES:
+        # Keep every position above the cut-off count, then the lowest positions at it
+        cutoff = np.partition(shared, -MAX_CANDIDATES)[-MAX_CANDIDATES]
+        keep = shared > cutoff
+        keep[np.flatnonzero(shared == cutoff)[:MAX_CANDIDATES - np.count_nonzero(keep)]] = True
+        positions, shared = positions[keep], shared[keep]
+    order = np.lexsort((positions, -shared))
+    return positions[order].tolist()
+
+
+def _unit_price(row: dict) -> tuple:
+    """
+    (dimension, price per gram / millilitre / item), so "per lb" and "per oz"
+    offers compare fairly; rows with a missing or unknown unit compare on
+    the raw price among themselves
+    """
+    from services.units import parse_unit  # units imports normalize from this module
+
+    price = float(row.get("price_per_unit") or 0.0)
+    if price <= 0:
+        return None, math.inf
+    unit = parse_unit(row.get("unit"))
+    if unit is None or math.isnan(unit[1]):
+        return None, price
+    return unit[0], price / unit[1]
+
+
+def _updated(row: dict) -> datetime:
+    value = row.get("last_updated")
+    if not value:
+        return datetime.min
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+# Process-wide catalog used by the estimate endpoint
+price_catalog = PriceCatalog()
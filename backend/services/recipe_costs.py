@@ -0,0 +1,272 @@
+# backend/services/recipe_costs.py
+import hashlib
+import json
+import logging
+import threading
+from services.cache import TTLCache
+from services.cost_engine import CostEngine
+from services.price_catalog import price_catalog, normalize
+from services.write_behind import PeriodicFlusher
+
+
+def _ingredient_name(ingredient: dict) -> str:
+    return (ingredient.get("item") or ingredient.get("name") or "").strip()
+
+
+def _ingredient_list(recipe_data) -> list:
+    ingredients = (recipe_data or {}).get("ingredients") if isinstance(recipe_data, dict) else None
+    return [i for i in (ingredients or []) if isinstance(i, dict)]
+
+
+def ingredients_hash(recipe_data) -> str:
+    """Content hash of recipe_data.ingredients; ignores case, plurals and key order"""
+    canonical = [
+        [normalize(_ingredient_name(i)), str(i.get("amount", "")).strip(), str(i.get("unit") or "").strip().lower()]
+        for i in _ingredient_list(recipe_data)
+    ]
+    return hashlib.blake2b(json.dumps(canonical).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _load_recipe_posts():
+    from supabase_client import supabase  # Import here so the index can be used without Supabase config
+
+    start, page_size = 0, 1000
+    while True:
+        res = supabase.table("posts")\
+            .select("id, recipe_data, ingredients_hash, estimated_cost, cost_currency")\
+            .eq("post_type", "recipe")\
+            .order("id")\
+            .range(start, start + page_size - 1)\
+            .execute()
+        rows = res.data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+
+def _write_costs(rows: list):
+    from supabase_client import supabase
+
+    supabase.rpc("set_recipe_costs", {"p_costs": rows}).execute()
+
+
+class RecipeCostIndex(PeriodicFlusher):
+    """
+    Keeps every recipe post's estimated_cost current without pricing on read.
+
+    Recipes are priced once, when they are created (price_fields() output
+    is inserted with the post), and stored in `posts.estimated_cost`, so
+    feed and search pages read the cost with the rest of the row. Results
+    are memoized by catalog version and ingredients_hash(): reposting the
+    same ingredient list costs nothing until the catalog reloads.
+
+    A reverse index maps each ingredient name to the recipe posts that use
+    it, together with the catalog row the name last resolved to. When the
+    price catalog is reloaded, every ingredient name is resolved again and
+    only the recipes whose ingredients now resolve to a different row or
+    price are re-priced and written back, in one RPC per WRITE_BATCH.
+    Costs that come out unchanged are not written.
+    """
+
+    thread_name = "recipe-costs"
+    WRITE_BATCH = 500
+
+    def __init__(self, catalog=price_catalog, load_recipes=_load_recipe_posts, write_costs=_write_costs,
+                 flush_interval: float = 30.0):
+        super().__init__(flush_interval)
+        self._catalog = catalog
+        self._load_recipes = load_recipes
+        self._write_costs = write_costs
+        self._memo = TTLCache(maxsize=50000, ttl=86400)   # (catalog version, ingredients_hash) -> priced result
+        self._recipes = {}        # post_id -> (ingredients_hash, recipe_data, stored (cost, currency))
+        self._by_ingredient = {}  # normalized ingredient name -> set of post ids
+        self._resolved = {}       # normalized ingredient name -> signature of the row it matched
+        self._dirty = set()
+        self._loaded = False
+        self._applied_version = None  # catalog version whose changes are already in _dirty
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._metrics = {"recipes_priced": 0, "memo_hits": 0, "costs_written": 0, "last_affected": 0}
+        catalog.on_refresh(self._on_catalog_refresh)
+
+    def price_fields(self, recipe_data) -> dict:
+        """
+        Columns to store with a new recipe post.
+
+        Only prices against a catalog that is already loaded, so creating a
+        post never waits for the catalog; until then the post is stored
+        without a cost and track() has the background worker price it.
+
+        Returns:
+            dict: {"estimated_cost", "cost_currency", "ingredients_hash"}; estimated_cost
+            is None when no ingredient could be priced. Empty if the catalog is not loaded.
+        """
+        if not self._catalog.loaded:
+            return {}
+        digest = ingredients_hash(recipe_data)
+        result = self._price([(digest, recipe_data)])[digest]
+        return {
+            "estimated_cost": result["estimated_cost"],
+            "cost_currency": result["cost_currency"],
+            "ingredients_hash": digest,
+        }
+
+    def track(self, post: dict):
+        """Add a created recipe post to the index; it is priced in the background if it was stored without a cost"""
+        with self._lock:
+            self._add(post)
+        self._ensure_thread()
+        self.wake()
+
+    def forget(self, post_id):
+        with self._lock:
+            self._remove(post_id)
+            self._dirty.discard(post_id)
+
+    def _add(self, post: dict):
+        self._remove(post["id"])
+        recipe_data = post.get("recipe_data")
+        digest = ingredients_hash(recipe_data)
+        stored = (post.get("estimated_cost"), post.get("cost_currency"))
+        self._recipes[post["id"]] = (digest, recipe_data, stored)
+        for ingredient in _ingredient_list(recipe_data):
+            name = normalize(_ingredient_name(ingredient))
+            if name:
+                self._by_ingredient.setdefault(name, set()).add(post["id"])
+        if post.get("ingredients_hash") != digest:
+            self._dirty.add(post["id"])
+
+    def _remove(self, post_id):
+        entry = self._recipes.pop(post_id, None)
+        if entry is None:
+            return
+        for ingredient in _ingredient_list(entry[1]):
+            name = normalize(_ingredient_name(ingredient))
+            posts = self._by_ingredient.get(name)
+            if posts is not None:
+                posts.discard(post_id)
+                if not posts:
+                    del self._by_ingredient[name]
+                    self._resolved.pop(name, None)
+
+    def start(self):
+        """Start the background worker (e.g. at app startup)"""
+        self._ensure_thread()
+
+    def _on_catalog_refresh(self):
+        # Memo keys carry the catalog version, so entries from the old catalog are never read again
+        self._memo.clear()
+        self._ensure_thread()
+        self.wake()
+
+    @staticmethod
+    def _signature(row):
+        if row is None:
+            return None
+        return (normalize(row.get("ingredient_name")), row.get("price_per_unit"), row.get("unit"), row.get("currency"))
+
+    def _price(self, recipes: list) -> dict:
+        """{ingredients_hash: {"estimated_cost", "cost_currency"}} for (hash, recipe_data) pairs"""
+        results, missing = {}, {}
+        version = self._catalog.version
+        for digest, recipe_data in recipes:
+            cached = self._memo.get((version, digest))
+            if cached is not None:
+                results[digest] = cached
+            else:
+                missing[digest] = recipe_data
+        with self._lock:
+            self._metrics["memo_hits"] += len(recipes) - len(missing)
+        if missing:
+            priced = CostEngine.recipe_costs(
+                [{"id": digest, "ingredients": _ingredient_list(data)} for digest, data in missing.items()],
+                self._catalog.match_many,
+            )
+            for result in priced:
+                value = {
+                    "estimated_cost": result["total_cost"] if result["priced"] else None,
+                    "cost_currency": result["currency"] if result["priced"] else None,
+                }
+                self._memo.set((version, result["id"]), value)
+                results[result["id"]] = value
+            with self._lock:
+                self._metrics["recipes_priced"] += len(missing)
+        return results
+
+    def _affected_by_catalog(self) -> set:
+        """Recipes using an ingredient that resolves differently than last time"""
+        with self._lock:
+            names = list(self._by_ingredient)
+        rows = self._catalog.match_many(names)
+        affected = set()
+        with self._lock:
+            for name, row in zip(names, rows):
+                signature = self._signature(row)
+                if name in self._resolved and self._resolved[name] == signature:
+                    continue
+                self._resolved[name] = signature
+                affected |= self._by_ingredient.get(name, set())
+        return affected
+
+    def flush(self) -> int:
+        """Load the index if needed, re-price affected recipes and write changed costs; returns rows written"""
+        with self._flush_lock:
+            if not self._loaded:
+                posts = list(self._load_recipes())
+                with self._lock:
+                    for post in posts:
+                        self._add(post)
+                    self._loaded = True
+
+            version = self._catalog.version
+            if version != self._applied_version:
+                affected = self._affected_by_catalog()
+                with self._lock:
+                    self._dirty |= affected
+                    self._metrics["last_affected"] = len(affected)
+                # Marked applied only now, so a failed re-match is retried on the next flush
+                self._applied_version = version
+
+            with self._lock:
+                dirty = [(pid, self._recipes[pid]) for pid in self._dirty if pid in self._recipes]
+                self._dirty.clear()
+            if not dirty:
+                return 0
+
+            try:
+                priced = self._price([(digest, data) for _, (digest, data, _) in dirty])
+                rows = []
+                for pid, (digest, data, stored) in dirty:
+                    value = priced[digest]
+                    if stored != (value["estimated_cost"], value["cost_currency"]):
+                        rows.append(dict(value, post_id=pid, ingredients_hash=digest))
+                for start in range(0, len(rows), self.WRITE_BATCH):
+                    self._write_costs(rows[start:start + self.WRITE_BATCH])
+            except Exception:
+                with self._lock:
+                    self._dirty.update(pid for pid, _ in dirty)
+                raise
+
+            with self._lock:
+                for row in rows:
+                    digest, data, _ = self._recipes.get(row["post_id"], (None, None, None))
+                    if digest is not None:
+                        self._recipes[row["post_id"]] = (digest, data, (row["estimated_cost"], row["cost_currency"]))
+                self._metrics["costs_written"] += len(rows)
+            if rows:
+                logging.info(f"Updated estimated cost for {len(rows)} recipes")
+            return len(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["recipes"] = len(self._recipes)
+            stats["ingredients"] = len(self._by_ingredient)
+            stats["pending"] = len(self._dirty)
+        stats["memo"] = self._memo.stats()
+        return stats
+
+
+# Process-wide index; re-prices recipes whenever the price catalog reloads
+recipe_costs = RecipeCostIndex()
@@ -0,0 +1,52 @@
+# backend/services/rewards.py
+from supabase_client import supabase
+from services.leaderboard import leaderboard
+
+XP_PER_LEVEL = 100
+
+
+def level_for(xp: int) -> int:
+    """Level reached with `xp` total XP (every XP_PER_LEVEL XP is one level)"""
+    return xp // XP_PER_LEVEL + 1
+
+
+class RewardService:
+    """
+    XP and coin awards applied atomically in the database.
+
+    The award_rewards RPC adds each amount with `xp = xp + n` in a single
+    upsert and returns the new totals. Concurrent awards can't overwrite
+    each other, and one call settles any number of users.
+    """
+
+    MAX_BATCH = 1000
+
+    @staticmethod
+    def award(user_id, xp: int = 0, coins: int = 0) -> dict:
+        """Award one user; returns their new totals (see award_many)"""
+        return RewardService.award_many([{"user_id": user_id, "xp": xp, "coins": coins}])[0]
+
+    @staticmethod
+    def award_many(awards: list) -> list:
+        """
+        Apply a batch of awards in as few round trips as possible.
+
+        Args:
+            awards: [{"user_id", "xp", "coins"}, ...]; a user may appear more than once
+
+        Returns:
+            list: one {"user_id", "xp", "level", "coins", "xp_gained",
+            "coins_gained", "level_up"} per distinct user
+        """
+        results = []
+        for start in range(0, len(awards), RewardService.MAX_BATCH):
+            chunk = [
+                {"user_id": str(a["user_id"]), "xp": int(a.get("xp") or 0), "coins": int(a.get("coins") or 0)}
+                for a in awards[start:start + RewardService.MAX_BATCH]
+            ]
+            res = supabase.rpc("award_rewards", {"p_awards": chunk}).execute()
+            for row in res.data or []:
+                row["level_up"] = row["level"] > level_for(row["xp"] - row["xp_gained"])
+                leaderboard.set_xp(row["user_id"], row["xp"])
+                results.append(row)
+        return results
@@ -0,0 +1,169 @@
+# backend/services/trending.py
+from datetime import datetime, timedelta, timezone
+import heapq
+import logging
+import math
+import threading
+import time
+
+LIKE = "like"
+COMMENT = "comment"
+SAVE = "save"
+VIEW = "view"
+
+# How much one event of each kind is worth at the moment it happens
+WEIGHTS = {LIKE: 1.0, COMMENT: 3.0, SAVE: 4.0, VIEW: 0.05}
+
+
+def _load_recent_posts(since: datetime) -> list:
+    from supabase_client import supabase  # Import here so the engine can be used without Supabase config
+
+    res = supabase.table("posts")\
+        .select("id, created_at, likes_count, comments_count, views_count")\
+        .gte("created_at", since.isoformat())\
+        .order("created_at", desc=True)\
+        .limit(TrendingEngine.SEED_LIMIT)\
+        .execute()
+    return res.data or []
+
+
+class TrendingEngine:
+    """
+    Incrementally maintained top-K of posts by time-decayed engagement.
+
+    An event's weight decays with a half-life of HALF_LIFE seconds. Rather
+    than re-decaying every score as time passes, each event is added as
+    weight * exp((t - t0) / tau) for a fixed reference time t0. Older
+    events are then worth relatively less and the ranking never has to
+    be recomputed. When the exponent grows large every score is divided
+    by the same factor and t0 moves forward, an O(capacity) step that
+    happens once every few months.
+
+    At most `capacity` posts are tracked. A min-heap with lazy deletion
+    finds the lowest score to evict, so one event costs O(log capacity)
+    regardless of how many posts exist.
+    """
+
+    HALF_LIFE = 6 * 3600       # seconds
+    RESCALE_EXPONENT = 600.0   # rescale well before exp() overflows
+    SEED_WINDOW = 48 * 3600    # seconds of recent posts to seed from after a restart
+    SEED_LIMIT = 2000
+
+    def __init__(self, capacity: int = 5000, loader=_load_recent_posts, clock=time.time):
+        self.capacity = capacity
+        self._loader = loader
+        self._clock = clock
+        self._tau = self.HALF_LIFE / math.log(2)
+        self._t0 = clock()
+        self._scores = {}
+        self._heap = []
+        self._lock = threading.Lock()
+        self._seed_lock = threading.Lock()
+        self._seeded = False
+
+    def _weight(self, kind: str, at: float, count: float) -> float:
+        return WEIGHTS[kind] * count * math.exp((at - self._t0) / self._tau)
+
+    def record(self, post_id, kind: str, count: float = 1, at: float = None):
+        """
+        Apply an engagement event to post_id's score.
+
+        A negative count (an unlike, unsave, ...) takes back the weight the
+        event would have added now.
+        """
+        at = self._clock() if at is None else at
+        post_id = str(post_id)
+        with self._lock:
+            if (at - self._t0) / self._tau > self.RESCALE_EXPONENT:
+                self._rescale(at)
+            self._add(post_id, self._weight(kind, at, count))
+
+    def _add(self, post_id: str, delta: float):
+        score = self._scores.get(post_id, 0.0) + delta
+        if score <= 0:
+            self._scores.pop(post_id, None)
+            return
+        if post_id not in self._scores and len(self._scores) >= self.capacity:
+            lowest = self._peek_min()
+            if lowest is None or score <= lowest[0]:
+                return
+            del self._scores[lowest[1]]
+            heapq.heappop(self._heap)
+        self._scores[post_id] = score
+        heapq.heappush(self._heap, (score, post_id))
+        if len(self._heap) > 4 * self.capacity:
+            self._compact()
+
+    def _peek_min(self):
+        """Lowest (score, post_id) still current, discarding stale heap entries"""
+        heap = self._heap
+        while heap:
+            score, post_id = heap[0]
+            if self._scores.get(post_id) == score:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def _compact(self):
+        self._heap = [(score, post_id) for post_id, score in self._scores.items()]
+        heapq.heapify(self._heap)
+
+    def _rescale(self, now: float):
+        factor = math.exp((now - self._t0) / self._tau)
+        self._t0 = now
+        self._scores = {pid: score / factor for pid, score in self._scores.items() if score / factor > 0}
+        self._compact()
+
+    def remove(self, post_id):
+        """Stop ranking a post, e.g. after it was deleted"""
+        with self._lock:
+            self._scores.pop(str(post_id), None)
+
+    def top(self, offset: int = 0, limit: int = 20) -> list:
+        """Post ids ranked by trending score, highest first"""
+        self._ensure_seeded()
+        with self._lock:
+            ranked = heapq.nlargest(offset + limit, self._scores.items(), key=lambda item: item[1])
+        return [post_id for post_id, _ in ranked[offset:offset + limit]]
+
+    def score(self, post_id) -> float:
+        """Current decayed score of post_id (0 if it is not tracked)"""
+        with self._lock:
+            raw = self._scores.get(str(post_id), 0.0)
+            return raw * math.exp((self._t0 - self._clock()) / self._tau)
+
+    def _ensure_seeded(self):
+        """
+        After a restart, rebuild scores once from the counters on recent
+        posts, treating each post's engagement as if it happened when the
+        post was created.
+        """
+        if self._seeded:
+            return
+        with self._seed_lock:
+            if self._seeded:
+                return
+            self._seeded = True
+            now = self._clock()
+            since = datetime.fromtimestamp(now, tz=timezone.utc) - timedelta(seconds=self.SEED_WINDOW)
+            try:
+                rows = self._loader(since)
+            except Exception as e:
+                logging.error(f"Seeding trending scores failed: {e}")
+                return
+        with self._lock:
+            for row in rows:
+                at = datetime.fromisoformat(row["created_at"].replace("Z", "+00:00")).timestamp()
+                for kind, column in ((LIKE, "likes_count"), (COMMENT, "comments_count"), (VIEW, "views_count")):
+                    if row.get(column):
+                        self._add(str(row["id"]), self._weight(kind, min(at, now), row[column]))
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+            self._heap.clear()
+            self._t0 = self._clock()
+
+
+# Process-wide engine fed by engagement_routes and read by /api/feed?mode=trending
+trending = TrendingEngine()
@@ -0,0 +1,161 @@
+# backend/services/units.py
+from fractions import Fraction
+from functools import lru_cache
+import re
+from services.price_catalog import normalize
+
+MASS, VOLUME, COUNT = 0, 1, 2
+CONTAINER = 3  # first container dimension; see CONTAINERS
+UNKNOWN = -1
+
+# unit -> (dimension, size in the dimension's base unit: grams, millilitres or items)
+UNITS = {
+    "g": (MASS, 1.0), "gram": (MASS, 1.0), "kg": (MASS, 1000.0), "kilogram": (MASS, 1000.0),
+    "mg": (MASS, 0.001), "oz": (MASS, 28.3495), "ounce": (MASS, 28.3495),
+    "lb": (MASS, 453.592), "pound": (MASS, 453.592),
+    "ml": (VOLUME, 1.0), "milliliter": (VOLUME, 1.0), "millilitre": (VOLUME, 1.0),
+    "l": (VOLUME, 1000.0), "liter": (VOLUME, 1000.0), "litre": (VOLUME, 1000.0),
+    "tsp": (VOLUME, 4.92892), "teaspoon": (VOLUME, 4.92892),
+    "tbsp": (VOLUME, 14.7868), "tablespoon": (VOLUME, 14.7868),
+    "cup": (VOLUME, 236.588), "fl oz": (VOLUME, 29.5735), "fluid ounce": (VOLUME, 29.5735),
+    "pint": (VOLUME, 473.176), "quart": (VOLUME, 946.353), "gallon": (VOLUME, 3785.41),
+    "gal": (VOLUME, 3785.41), "qt": (VOLUME, 946.353), "pt": (VOLUME, 473.176), "c": (VOLUME, 236.588),
+    "pinch": (VOLUME, 0.31), "dash": (VOLUME, 0.62),
+    "each": (COUNT, 1.0), "ea": (COUNT, 1.0), "whole": (COUNT, 1.0), "piece": (COUNT, 1.0),
+    "pc": (COUNT, 1.0), "item": (COUNT, 1.0), "unit": (COUNT, 1.0), "ct": (COUNT, 1.0),
+    "count": (COUNT, 1.0), "large": (COUNT, 1.0), "medium": (COUNT, 1.0), "small": (COUNT, 1.0),
+    "dozen": (COUNT, 12.0),
+}
+
+# Containers and portions hold a different amount of every ingredient (a can
+# of beans, a bunch of basil), so each is its own dimension: it converts to
+# itself, and to grams only where CONTAINER_WEIGHTS knows the ingredient.
+CONTAINERS = [
+    ("can",), ("jar",), ("bottle",), ("box",), ("package", "pkg", "pack"), ("bag",), ("carton",),
+    ("bunch",), ("head",), ("slice",), ("stick",), ("clove",), ("sprig",),
+]
+UNITS.update({alias: (CONTAINER + offset, 1.0) for offset, aliases in enumerate(CONTAINERS) for alias in aliases})
+
+# Typical grams in one container of an ingredient
+CONTAINER_WEIGHTS = {
+    "stick": {"butter": 113.4},
+    "clove": {"garlic": 5.0},
+    "head": {"garlic": 50.0, "lettuce": 600.0, "cabbage": 900.0, "cauliflower": 850.0, "broccoli": 600.0},
+}
+# Abbreviations where case matters ("1 T sugar" vs "1 t salt")
+CASED_UNITS = {"T": "tbsp", "t": "tsp"}
+
+# Grams per millilitre, for converting between cups and pounds
+DENSITIES = {
+    "water": 1.0, "milk": 1.03, "buttermilk": 1.03, "heavy cream": 1.01, "cream": 1.01,
+    "yogurt": 1.03, "sour cream": 0.96, "butter": 0.911, "oil": 0.92, "olive oil": 0.91,
+    "honey": 1.42, "maple syrup": 1.32, "molasses": 1.4, "flour": 0.53, "bread flour": 0.55,
+    "sugar": 0.85, "brown sugar": 0.83, "powdered sugar": 0.56, "salt": 1.22, "kosher salt": 0.64,
+    "rice": 0.85, "oat": 0.41, "cocoa": 0.42, "cornstarch": 0.54, "baking soda": 0.87,
+    "baking powder": 0.9, "cheese": 0.45, "parmesan": 0.42, "soy sauce": 1.15, "vinegar": 1.01,
+    "broth": 1.0, "stock": 1.0, "tomato sauce": 1.03, "peanut butter": 1.09,
+    "chocolate chip": 0.72, "lentil": 0.82, "quinoa": 0.72, "pasta": 0.42,
+}
+
+# Typical grams per item, for converting "2 onions" to a per-lb price
+COUNT_WEIGHTS = {
+    "egg": 50.0, "onion": 150.0, "garlic": 50.0, "shallot": 40.0, "lemon": 100.0, "lime": 67.0,
+    "orange": 140.0, "apple": 182.0, "banana": 118.0, "avocado": 170.0, "potato": 213.0,
+    "sweet potato": 130.0, "tomato": 123.0, "carrot": 61.0, "bell pepper": 120.0,
+    "jalapeno": 14.0, "cucumber": 300.0, "zucchini": 200.0, "broccoli": 600.0,
+    "cauliflower": 850.0, "lettuce": 600.0, "cabbage": 900.0, "chicken breast": 174.0,
+    "chicken thigh": 115.0, "tortilla": 45.0, "bagel": 105.0,
+}
+
+_VULGAR = {"¼": "1/4", "½": "1/2", "¾": "3/4", "⅓": "1/3", "⅔": "2/3", "⅛": "1/8", "⅜": "3/8",
+           "⅝": "5/8", "⅞": "7/8"}
+_NUMBER = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+)"
+_AMOUNT = re.compile(rf"^\s*({_NUMBER})(?:\s*(?:-|–|to)\s*({_NUMBER}))?")
+
+
+def _number(text: str) -> float:
+    whole, _, frac = text.strip().rpartition(" ")
+    return float(Fraction(frac)) + (float(whole) if whole else 0.0)
+
+
+def parse_amount(value):
+    """
+    Quantity from a recipe amount: 2, "1/2", "1 1/2", "1½", "2-3" (midpoint), "0.25 cups".
+
+    Returns:
+        float, or None if no leading number is found
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or "")
+    for glyph, fraction in _VULGAR.items():
+        text = re.sub(rf"(\d){glyph}", rf"\1 {fraction}", text).replace(glyph, fraction)
+    match = _AMOUNT.match(text)
+    if not match:
+        return None
+    try:
+        low = _number(match.group(1))
+        if match.group(2):
+            return (low + _number(match.group(2))) / 2.0
+        return low
+    except ZeroDivisionError:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def parse_unit(text) -> tuple:
+    """
+    (dimension, size) for a unit name, tolerating case, plurals, periods and "per ".
+
+    Returns:
+        tuple: (MASS | VOLUME | COUNT, size in base units), (UNKNOWN, nan) for an
+        unrecognised unit, or None for a missing one
+    """
+    raw = (text or "").strip().rstrip(".")
+    if not raw:
+        return None
+    if raw in CASED_UNITS:
+        return UNITS[CASED_UNITS[raw]]
+    unit = re.sub(r"[^a-z ]+", "", raw.lower()).strip()
+    unit = re.sub(r"^per ", "", unit)
+    candidates = [unit]
+    if unit.endswith("es"):
+        candidates.append(unit[:-2])
+    if unit.endswith("s"):
+        candidates.append(unit[:-1])
+    for candidate in candidates:
+        if candidate in UNITS:
+            return UNITS[candidate]
+    return UNKNOWN, float("nan")
+
+
+def _lookup(table: dict, name: str) -> float:
+    """Value for the longest table key found as whole words in the name, else nan"""
+    name = normalize(name)
+    for key in sorted(table, key=len, reverse=True):
+        if re.search(rf"\b{re.escape(normalize(key))}\b", name):
+            return table[key]
+    return float("nan")
+
+
+@lru_cache(maxsize=4096)
+def density_for(name: str) -> float:
+    """Grams per millilitre for an ingredient name, nan if unknown"""
+    return _lookup(DENSITIES, name)
+
+
+@lru_cache(maxsize=4096)
+def grams_each(name: str) -> float:
+    """Typical grams per item for an ingredient name, nan if unknown"""
+    return _lookup(COUNT_WEIGHTS, name)
+
+
+@lru_cache(maxsize=4096)
+def grams_per_container(dimension: int, name: str) -> float:
+    """Typical grams in one container (a CONTAINER dimension) of an ingredient, nan if unknown"""
+    offset = dimension - CONTAINER
+    if not 0 <= offset < len(CONTAINERS):
+        return float("nan")
+    return _lookup(CONTAINER_WEIGHTS.get(CONTAINERS[offset][0], {}), name)
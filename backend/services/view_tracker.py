@@ -0,0 +1,134 @@
+# backend/services/view_tracker.py
+import atexit
+import base64
+from datetime import datetime, timezone
+import logging
+import threading
+import time
+from services.cache import TTLCache
+from services.hyperloglog import HyperLogLog
+from services.write_behind import PeriodicFlusher
+
+
+def _write_to_supabase(rows: list):
+    from supabase_client import supabase  # Import here so the tracker can be used without Supabase config
+
+    supabase.rpc("record_post_views", {"p_rows": rows}).execute()
+
+
+class ViewTracker(PeriodicFlusher):
+    """
+    Aggregates post impressions in memory and writes them in batches.
+
+    Views are counted per (post, time bucket) together with a
+    HyperLogLog sketch of who viewed, so a flush sends one row per post
+    and bucket no matter how many impressions it covers. The
+    record_post_views RPC adds the counts and merges the sketches into
+    `post_view_buckets` and the posts.views_count / unique_viewers
+    counters that feed cards read.
+    """
+
+    thread_name = "view-flush"
+    BUCKET_SECONDS = 3600
+    MAX_RETAINED = 50000   # buckets kept for retry while the database is unreachable
+    MAX_SEEN = 200000      # (viewer, post, bucket) keys remembered for first_views
+
+    def __init__(self, writer=_write_to_supabase, flush_interval: float = 5.0):
+        super().__init__(flush_interval)
+        self._writer = writer
+        self._pending = {}
+        self._seen = TTLCache(maxsize=self.MAX_SEEN, ttl=self.BUCKET_SECONDS)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._metrics = {
+            "views_received": 0,
+            "rows_written": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def _bucket(self, viewed_at: float) -> str:
+        start = int(viewed_at) - int(viewed_at) % self.BUCKET_SECONDS
+        return datetime.fromtimestamp(start, tz=timezone.utc).isoformat()
+
+    def record(self, user_id, post_ids: list, viewed_at: float = None) -> list:
+        """
+        Count one impression of each post in post_ids by user_id.
+
+        Returns:
+            list: the posts user_id had not already viewed in this time bucket
+        """
+        bucket = self._bucket(viewed_at if viewed_at is not None else time.time())
+        first_views = []
+        with self._lock:
+            for post_id in post_ids:
+                if self._seen.get((user_id, post_id, bucket)) is None:
+                    self._seen.set((user_id, post_id, bucket), True)
+                    first_views.append(post_id)
+                entry = self._pending.get((post_id, bucket))
+                if entry is None:
+                    entry = self._pending[(post_id, bucket)] = [0, HyperLogLog()]
+                entry[0] += 1
+                entry[1].add(user_id)
+            self._metrics["views_received"] += len(post_ids)
+        self._ensure_thread()
+        return first_views
+
+    def flush(self) -> int:
+        """Write every buffered bucket; returns the number of rows sent"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            rows = [
+                {
+                    "post_id": post_id,
+                    "bucket_start": bucket,
+                    "views": views,
+                    "sketch": base64.b64encode(sketch.to_bytes()).decode(),
+                }
+                for (post_id, bucket), (views, sketch) in batch.items()
+            ]
+            started = time.perf_counter()
+            try:
+                self._writer(rows)
+            except Exception as e:
+                logging.error(f"Post view flush failed, keeping {len(rows)} buckets for retry: {e}")
+                self._requeue(batch)
+                with self._lock:
+                    self._metrics["flush_failures"] += 1
+                return 0
+
+            with self._lock:
+                self._metrics["flushes"] += 1
+                self._metrics["rows_written"] += len(rows)
+                self._metrics["last_flush_ms"] = round((time.perf_counter() - started) * 1000.0, 2)
+            return len(rows)
+
+    def _requeue(self, batch: dict):
+        """Merge an unwritten batch back into whatever arrived meanwhile"""
+        with self._lock:
+            for key, (views, sketch) in batch.items():
+                entry = self._pending.get(key)
+                if entry is None:
+                    if len(self._pending) >= self.MAX_RETAINED:
+                        continue
+                    self._pending[key] = [views, sketch]
+                else:
+                    entry[0] += views
+                    entry[1].merge(sketch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats["buffered_buckets"] = len(self._pending)
+            stats["buffered_views"] = sum(views for views, _ in self._pending.values())
+        return stats
+
+
+# Process-wide tracker used by engagement_routes; flushed on interpreter exit
+view_tracker = ViewTracker()
+atexit.register(view_tracker.shutdown)
@@ -0,0 +1,54 @@
+# backend/services/write_behind.py
+from abc import ABC, abstractmethod
+import logging
+import threading
+
+
+class PeriodicFlusher(ABC):
+    """
+    Base for in-memory buffers that are written out in the background.
+
+    Subclasses implement flush(). A daemon thread calls it every
+    `flush_interval` seconds, or as soon as wake() is called, and
+    shutdown() stops the thread and flushes one last time.
+    """
+
+    thread_name = "write-behind"
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._wakeup = threading.Event()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+
+    @abstractmethod
+    def flush(self):
+        """Write out everything buffered so far"""
+
+    def wake(self):
+        """Flush now instead of waiting for the next interval"""
+        self._wakeup.set()
+
+    def _ensure_thread(self):
+        if self._thread is not None or self._stopped:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"{self.thread_name} flush failed: {e}")
+
+    def shutdown(self):
+        """Stop the flush thread and write whatever is still buffered"""
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
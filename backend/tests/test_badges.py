@@ -0,0 +1,97 @@
+import pytest
+from services.badges import BadgeEngine, COUNTERS, EVENT_COUNTERS
+from services.gamification_events import POST_CREATED, RECIPE_POSTED, LIKE_RECEIVED, FOLLOW_MADE, COMMENT_MADE
+
+BADGE_IDS = {"First Post": "b1", "Recipe Master": "b2", "Social Butterfly": "b3",
+             "Engagement King": "b4", "Week Warrior": "b5"}
+
+class FakeStore:
+    def __init__(self):
+        self.counters = {}
+        self.streaks = {}
+        self.awarded = []
+        self.reads = 0
+        self.fail_reads = 0
+
+    def _progress(self, user_id):
+        return dict(self.counters[user_id], user_id=user_id, longest_streak=self.streaks.get(user_id, 0))
+
+    def apply(self, events):
+        """What apply_gamification_events does to the counters"""
+        for e in events:
+            counters = self.counters.setdefault(e["user_id"], dict.fromkeys(COUNTERS, 0))
+            if e["event_type"] in EVENT_COUNTERS:
+                counters[EVENT_COUNTERS[e["event_type"]]] += 1
+
+    def progress(self, user_ids):
+        self.reads += 1
+        if self.fail_reads:
+            self.fail_reads -= 1
+            raise RuntimeError("timeout")
+        return [self._progress(user_id) for user_id in user_ids if user_id in self.counters]
+
+    def badge_ids(self):
+        return BADGE_IDS
+
+    def award(self, rows):
+        self.awarded.extend((r["user_id"], r["badge_id"]) for r in rows)
+
+    def recompute_counters(self):
+        self.counters = {"old": {"posts": 12, "recipe_posts": 10, "follows": 3, "likes_received": 150}}
+
+    def progress_pages(self):
+        yield [self._progress(user_id) for user_id in self.counters]
+
+def event(event_type, user_id, is_activity=False):
+    return {"event_type": event_type, "user_id": user_id, "is_activity": is_activity}
+
+@pytest.fixture
+def store():
+    return FakeStore()
+
+def applied(engine, store, events):
+    store.apply(events)
+    return engine.handle_events(events)
+
+def test_first_post_awarded_once(store):
+    engine = BadgeEngine(store)
+    applied(engine, store, [event(POST_CREATED, "u1", True)])
+    applied(engine, store, [event(POST_CREATED, "u1", True)])
+    assert store.awarded == [("u1", "b1")]
+
+def test_counters_accumulate_across_batches(store):
+    engine = BadgeEngine(store)
+    for _ in range(4):
+        applied(engine, store, [event(LIKE_RECEIVED, "u1")] * 25)
+    applied(engine, store, [event(FOLLOW_MADE, "u2")] * 25 + [event(RECIPE_POSTED, "u2")])
+
+    assert ("u1", "b4") in store.awarded
+    assert ("u2", "b3") in store.awarded
+    assert ("u2", "b2") not in store.awarded
+    assert store.reads == 5
+
+def test_activity_rechecks_streak(store):
+    engine = BadgeEngine(store)
+    store.counters["u1"] = dict.fromkeys(COUNTERS, 0)
+    store.streaks["u1"] = 7
+    applied(engine, store, [event(COMMENT_MADE, "u1", True)])
+    assert store.awarded == [("u1", "b5")]
+
+def test_events_without_counters_skip_the_store(store):
+    engine = BadgeEngine(store)
+    assert applied(engine, store, [event(COMMENT_MADE, "u1", False)]) == 0
+    assert store.reads == 0
+
+def test_failed_check_is_retried_with_next_batch(store):
+    engine = BadgeEngine(store)
+    store.fail_reads = 1
+    assert applied(engine, store, [event(POST_CREATED, "u1", True)]) == 0
+    assert store.awarded == []
+
+    applied(engine, store, [event(COMMENT_MADE, "u2", False)])
+    assert store.awarded == [("u1", "b1")]
+
+def test_backfill_awards_existing_progress(store):
+    engine = BadgeEngine(store)
+    assert engine.backfill() == 3
+    assert sorted(store.awarded) == [("old", "b1"), ("old", "b2"), ("old", "b4")]
@@ -0,0 +1,43 @@
+import pytest
+import supabase_client
+from services.catalog import Catalog
+
+class FakeQuery:
+    def __init__(self, table, calls):
+        self.table, self.calls = table, calls
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def execute(self):
+        self.calls.append(self.table)
+        rows = {"badges": [{"id": "b1", "name": "First Post"}], "challenges": [{"id": "c1"}]}
+        return type("Result", (), {"data": rows[self.table]})()
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    client = type("Client", (), {"table": lambda self, name: FakeQuery(name, calls)})()
+    monkeypatch.setattr(supabase_client, "supabase", client)
+    Catalog.invalidate()
+    yield calls
+    Catalog.invalidate()
+
+def test_catalogs_are_read_once(calls):
+    assert Catalog.badges_by_id() == {"b1": {"id": "b1", "name": "First Post"}}
+    Catalog.badges()
+    Catalog.active_challenges()
+    Catalog.active_challenges()
+    assert calls == ["badges", "challenges"]
+
+def test_invalidate_forces_reload(calls):
+    Catalog.badges()
+    Catalog.invalidate()
+    Catalog.badges()
+    assert calls == ["badges", "badges"]
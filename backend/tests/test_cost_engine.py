@@ -0,0 +1,75 @@
+import math
+import numpy as np
+from services.cost_engine import CostEngine
+
+def price(per_unit, unit, currency="USD"):
+    return {"price_per_unit": per_unit, "unit": unit, "currency": currency}
+
+def test_convert_within_and_across_dimensions():
+    out = CostEngine.convert(
+        [2, 1, 3, 2, 1],
+        ["lb", "cup", "tbsp", "each", "cup"],
+        ["oz", "lb", "cup", "lb", "each"],
+        ["chicken", "flour", "milk", "onion", "tofu"],
+    )
+    assert out[0] == 32.0
+    assert math.isclose(out[1], 236.588 * 0.53 / 453.592)
+    assert math.isclose(out[2], 3 / 16, rel_tol=1e-5)
+    assert math.isclose(out[3], 300 / 453.592)
+    assert math.isnan(out[4])  # no density or item weight for tofu
+
+def test_containers_convert_only_to_themselves_or_by_known_weight():
+    out = CostEngine.convert(
+        [2, 1, 3, 1, 2, 2],
+        ["cans", "bunch", "slices", "stick", "sticks", "cloves"],
+        ["each", "can", "slice", "lb", "lb", "head"],
+        ["black beans", "basil", "bread", "butter", "cinnamon", "garlic"],
+    )
+    assert math.isnan(out[0]) and math.isnan(out[1])
+    assert out[2] == 3.0
+    assert math.isclose(out[3], 113.4 / 453.592)
+    assert math.isnan(out[4])  # a stick of cinnamon is not a stick of butter
+    assert math.isclose(out[5], 2 * 5.0 / 50.0)
+
+def test_missing_units():
+    out = CostEngine.convert([2, 2, 2, 5], [None, None, "", "lb"], ["dozen", "lb", "lb", None],
+                             ["egg", "chicken", "tofu", "rice"])
+    assert math.isclose(out[0], 2 / 12)  # a bare number counts items
+    assert out[1] == 2.0 and out[2] == 2.0  # can't weigh them: assume the price's unit
+    assert out[3] == 5.0
+
+def test_line_costs():
+    costs = CostEngine.line_costs([
+        {"name": "flour", "amount": "2 1/2", "unit": "cups", "price": price(0.8, "lb")},
+        {"name": "eggs", "amount": "6", "unit": None, "price": price(3.6, "dozen")},
+        {"name": "salt", "amount": "a pinch", "unit": "tsp", "price": price(0.1, "oz")},
+        {"name": "tofu", "amount": "1", "unit": "block", "price": price(2.0, "each")},
+        {"name": "basil", "amount": "1", "unit": "bunch", "price": None},
+    ])
+    assert math.isclose(costs[0], 2.5 * 236.588 * 0.53 / 453.592 * 0.8)
+    assert math.isclose(costs[1], 1.8)
+    assert np.isnan(costs[2:]).all()
+    assert CostEngine.line_costs([]).size == 0
+
+def test_recipe_costs_totals_each_recipe():
+    prices = {"flour": price(0.8, "lb"), "egg": price(3.6, "dozen"), "saffron": price(5.0, "g", "EUR")}
+    calls = []
+
+    def resolve(names):
+        calls.append(names)
+        return [prices.get(n) for n in names]
+
+    results = CostEngine.recipe_costs([
+        {"id": "a", "ingredients": [{"item": "flour", "amount": "1 lb", "unit": "lb"},
+                                     {"item": "egg", "amount": "12"}]},
+        {"id": "b", "ingredients": []},
+        {"id": "c", "ingredients": [{"item": "saffron", "amount": "1/2", "unit": "g"},
+                                     {"item": "unicorn", "amount": "1"}, "not a dict", {"item": ""}]},
+    ], resolve)
+
+    assert calls == [["flour", "egg", "saffron", "unicorn"]]
+    assert results == [
+        {"id": "a", "total_cost": 4.4, "priced": 2, "unpriced": 0, "currency": "USD"},
+        {"id": "b", "total_cost": 0.0, "priced": 0, "unpriced": 0, "currency": "USD"},
+        {"id": "c", "total_cost": 2.5, "priced": 1, "unpriced": 2, "currency": "EUR"},
+    ]
@@ -0,0 +1,123 @@
+import time
+import pytest
+from services.engagement_buffer import EngagementBuffer, LIKE, SAVE
+
+class FakeWriter:
+    def __init__(self, fail_bulk=False, bad_posts=()):
+        self.calls = []
+        self.fail_bulk = fail_bulk
+        self.bad_posts = set(bad_posts)
+
+    def __call__(self, table, inserts, deletes):
+        if self.fail_bulk and len(inserts) + sum(len(ids) for ids in deletes.values()) > 1:
+            raise Exception("bulk write failed")
+        if any(row["post_id"] in self.bad_posts for row in inserts):
+            raise Exception("violates foreign key constraint")
+        self.calls.append((table, inserts, deletes))
+
+@pytest.fixture
+def writer():
+    return FakeWriter()
+
+def test_toggles_coalesce_to_final_state(writer):
+    buffer = EngagementBuffer(writer)
+    buffer.record(LIKE, "u1", "p1", True)
+    buffer.record(LIKE, "u1", "p1", False)
+    buffer.record(LIKE, "u1", "p1", True)
+
+    assert buffer.pending_state(LIKE, "u1", "p1") is True
+    assert buffer.pending_state(SAVE, "u1", "p1") is None
+    assert buffer.flush() == 1
+    assert writer.calls == [("likes", [{"user_id": "u1", "post_id": "p1"}], {})]
+    assert buffer.pending_state(LIKE, "u1", "p1") is None
+
+def test_has_pending_is_per_user_and_kind(writer):
+    buffer = EngagementBuffer(writer)
+    buffer.record(SAVE, "u1", "p1", True)
+    assert buffer.has_pending(SAVE, "u1")
+    assert not buffer.has_pending(LIKE, "u1") and not buffer.has_pending(SAVE, "u2")
+    buffer.flush()
+    assert not buffer.has_pending(SAVE, "u1")
+
+def test_flush_groups_by_table(writer):
+    buffer = EngagementBuffer(writer)
+    buffer.record(LIKE, "u1", "p1", True)
+    buffer.record(LIKE, "u2", "p1", True)
+    buffer.record(LIKE, "u1", "p2", False)
+    buffer.record(LIKE, "u1", "p3", False)
+    buffer.record(SAVE, "u1", "p1", True)
+    buffer.flush()
+
+    by_table = {table: (inserts, deletes) for table, inserts, deletes in writer.calls}
+    assert len(writer.calls) == 2
+    assert len(by_table["likes"][0]) == 2
+    assert sorted(by_table["likes"][1]["u1"]) == ["p2", "p3"]
+    assert by_table["saved_posts"][0] == [{"user_id": "u1", "post_id": "p1"}]
+
+def test_failed_bulk_write_falls_back_to_rows():
+    writer = FakeWriter(fail_bulk=True, bad_posts={"gone"})
+    buffer = EngagementBuffer(writer)
+    buffer.record(LIKE, "u1", "p1", True)
+    buffer.record(LIKE, "u1", "gone", True)
+    buffer.record(LIKE, "u1", "p2", False)
+    buffer.flush()
+
+    stats = buffer.stats()
+    assert stats["rows_written"] == 2
+    assert stats["flush_failures"] == 1
+    assert buffer.pending_state(LIKE, "u1", "gone") is True  # kept for retry
+    buffer.shutdown()
+
+def test_rows_survive_a_database_outage():
+    writer = FakeWriter()
+    buffer = EngagementBuffer(writer)
+    for post in ("p1", "p2", "p3", "p4", "p5"):
+        buffer.record(LIKE, "u1", post, True)
+    writer.bad_posts = {"p1", "p2", "p3", "p4", "p5"}  # every write fails
+    buffer.flush()
+
+    assert len(writer.calls) == 0
+    assert buffer.stats()["flush_failures"] == EngagementBuffer.MAX_ROW_FAILURES
+    assert buffer.stats()["buffered_ops"] == 5
+    assert buffer.pending_state(LIKE, "u1", "p1") is True
+
+    buffer.record(LIKE, "u1", "p2", False)  # a newer toggle wins over the retried row
+    writer.bad_posts = set()
+    buffer.flush()
+    assert writer.calls == [("likes", [{"user_id": "u1", "post_id": p} for p in ("p1", "p3", "p4", "p5")],
+                             {"u1": ["p2"]})]
+    assert buffer.stats()["buffered_ops"] == 0
+    assert buffer.stats()["retrying_ops"] == 0
+
+def test_rows_that_keep_failing_are_dropped():
+    writer = FakeWriter(bad_posts={"gone"})
+    buffer = EngagementBuffer(writer)
+    buffer.RETRY_SECONDS = -1
+    buffer.record(LIKE, "u1", "gone", True)
+    buffer.flush()
+    assert buffer.stats()["ops_dropped"] == 1
+    assert buffer.stats()["buffered_ops"] == 0
+
+def test_stats_report_buffered_ops_and_latency(writer):
+    buffer = EngagementBuffer(writer)
+    buffer.record(SAVE, "u1", "p1", True)
+    buffer.record(SAVE, "u1", "p1", False)
+    stats = buffer.stats()
+    assert stats["buffered_ops"] == 1
+    assert stats["ops_received"] == 2
+    assert stats["ops_coalesced"] == 1
+
+    buffer.shutdown()
+    stats = buffer.stats()
+    assert stats["buffered_ops"] == 0
+    assert stats["flushes"] == 1
+    assert stats["avg_flush_ms"] >= 0
+
+def test_background_thread_flushes(writer):
+    buffer = EngagementBuffer(writer, flush_interval=0.01)
+    buffer.record(LIKE, "u1", "p1", True)
+    deadline = time.time() + 2
+    while not writer.calls and time.time() < deadline:
+        time.sleep(0.01)
+    buffer.shutdown()
+    assert writer.calls
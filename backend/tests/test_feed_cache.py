@@ -0,0 +1,77 @@
+import pytest
+from services.feed_cache import FeedCache
+from services.feed_hydration import FeedHydrator
+
+POSTS = [
+    {"id": "p1", "user_id": "u1", "image_url": "a.jpg", "caption": "one",
+     "created_at": "2025-01-02T00:00:00Z", "likes_count": 3, "comments_count": 0},
+    {"id": "p2", "user_id": "u1", "image_url": "b.jpg", "caption": "two",
+     "created_at": "2025-01-01T00:00:00Z", "likes_count": 0, "comments_count": 1},
+]
+
+@pytest.fixture
+def lookups(monkeypatch):
+    FeedCache.clear()
+    calls = {"users": 0, "viewer": 0, "pages": 0}
+
+    def fetch_users(user_ids):
+        calls["users"] += 1
+        return {"u1": {"id": "u1", "username": "alice", "profile_pic": None}}
+
+    def viewer_post_ids(table, user_id, post_ids):
+        calls["viewer"] += 1
+        return {"p1": True} if table == "likes" and user_id == "viewer" else {}
+
+    monkeypatch.setattr(FeedHydrator, "_fetch_users", staticmethod(fetch_users))
+    monkeypatch.setattr(FeedHydrator, "_viewer_post_ids", staticmethod(viewer_post_ids))
+
+    def load_page():
+        calls["pages"] += 1
+        return POSTS, None
+
+    calls["load_page"] = load_page
+    yield calls
+    FeedCache.clear()
+
+def feed_for(user_id, lookups):
+    cards, _ = FeedCache.page(("global", 1, 10), lookups["load_page"])
+    return FeedCache.personalize(cards, user_id)
+
+def test_second_request_is_served_from_memory(lookups):
+    first = feed_for("viewer", lookups)
+    second = feed_for("viewer", lookups)
+
+    assert first == second
+    assert lookups["pages"] == 1
+    assert lookups["users"] == 1
+    assert lookups["viewer"] == 2  # likes + saves, once
+
+def test_shared_cards_with_per_viewer_overlay(lookups):
+    mine = feed_for("viewer", lookups)
+    theirs = feed_for("someone-else", lookups)
+
+    assert mine[0]["engagement"]["is_liked"] is True
+    assert theirs[0]["engagement"]["is_liked"] is False
+    assert lookups["pages"] == 1
+
+def test_like_patches_counts_and_overlay(lookups):
+    feed_for("viewer", lookups)
+
+    FeedCache.adjust_counts("p2", likes=1)
+    FeedCache.set_viewer_flags("viewer", "p2", liked=True)
+    feed = feed_for("viewer", lookups)
+
+    assert feed[1]["engagement"]["likes_count"] == 1
+    assert feed[1]["engagement"]["is_liked"] is True
+    assert lookups["pages"] == 1
+
+def test_overlay_does_not_leak_into_shared_card(lookups):
+    feed_for("viewer", lookups)
+    cards, _ = FeedCache.page(("global", 1, 10), lookups["load_page"])
+    assert cards[0]["engagement"]["is_liked"] is False
+
+def test_delete_invalidates_pages(lookups):
+    feed_for("viewer", lookups)
+    FeedCache.invalidate_post("p1")
+    feed_for("viewer", lookups)
+    assert lookups["pages"] == 2
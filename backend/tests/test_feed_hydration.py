@@ -0,0 +1,73 @@
+import time
+import pytest
+from services.feed_hydration import FeedHydrator, StageTimings
+
+POSTS = [
+    {"id": "p1", "user_id": "u1", "image_url": "a.jpg", "caption": "one", "created_at": "2025-01-02T00:00:00Z",
+     "likes_count": 3, "comments_count": 0},
+    {"id": "p2", "user_id": "u2", "image_url": "b.jpg", "caption": "two", "created_at": "2025-01-01T00:00:00Z",
+     "likes_count": 0, "comments_count": 1},
+]
+
+@pytest.fixture
+def slow_lookups(monkeypatch):
+    """Replace every Supabase lookup with a 100ms fake"""
+    def fetch_users(user_ids):
+        time.sleep(0.1)
+        return {"u1": {"id": "u1", "username": "alice", "profile_pic": None}}
+
+    def viewer_post_ids(table, user_id, post_ids):
+        time.sleep(0.1)
+        return {"p1": True} if table == "likes" else {}
+
+    monkeypatch.setattr(FeedHydrator, "_fetch_users", staticmethod(fetch_users))
+    monkeypatch.setattr(FeedHydrator, "_viewer_post_ids", staticmethod(viewer_post_ids))
+
+def test_hydrate_builds_cards_in_order(slow_lookups):
+    cards = FeedHydrator.hydrate(POSTS, "viewer")
+
+    assert [c["id"] for c in cards] == ["p1", "p2"]
+    assert cards[0]["user"]["username"] == "alice"
+    assert cards[1]["user"]["username"] == "Unknown"
+    assert cards[0]["engagement"] == {"likes_count": 3, "comments_count": 0, "views_count": 0, "unique_viewers": 0,
+                                      "is_liked": True, "is_saved": False}
+    assert cards[1]["engagement"]["comments_count"] == 1
+
+def test_hydrate_runs_lookups_concurrently(slow_lookups):
+    timings = StageTimings()
+    FeedHydrator.hydrate(POSTS, "viewer", timings)
+    result = timings.as_dict()
+
+    # Three 100ms lookups should take about as long as one of them
+    assert result["hydrate"] < 250
+    for stage in ("users", "user_likes", "user_saves"):
+        assert stage in result
+
+def test_hydrate_skips_viewer_stages_without_user(slow_lookups):
+    timings = StageTimings()
+    cards = FeedHydrator.hydrate(POSTS, None, timings)
+
+    assert "user_likes" not in timings.as_dict()
+    assert cards[0]["engagement"]["is_liked"] is False
+
+def test_buffered_toggles_win_over_the_database(slow_lookups, monkeypatch):
+    import services.feed_hydration as feed_hydration
+    from services.engagement_buffer import EngagementBuffer, LIKE, SAVE
+
+    buffer = EngagementBuffer(writer=lambda *args: None)
+    monkeypatch.setattr(buffer, "_ensure_thread", lambda: None)
+    monkeypatch.setattr(feed_hydration, "engagement_buffer", buffer)
+    buffer.record(LIKE, "viewer", "p1", False)
+    buffer.record(SAVE, "viewer", "p2", True)
+
+    cards = FeedHydrator.hydrate(POSTS, "viewer")
+    assert [(c["engagement"]["is_liked"], c["engagement"]["is_saved"]) for c in cards] == [(False, False), (False, True)]
+    assert FeedHydrator.viewer_flags("viewer", ["p1", "p2"]) == {"p1": (False, False), "p2": (False, True)}
+
+def test_server_timing_header():
+    timings = StageTimings()
+    with timings.stage("posts"):
+        pass
+    header = timings.to_header()
+    assert header.startswith("posts;dur=")
+    assert "total;dur=" in header
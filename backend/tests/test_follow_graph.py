@@ -0,0 +1,111 @@
+import pytest
+from services.follow_graph import FollowGraph, FOLLOWERS, FOLLOWING
+
+EDGES = {("alice", "bob"), ("carol", "bob"), ("bob", "alice")}
+
+@pytest.fixture
+def graph():
+    calls = []
+
+    def loader(user_id, direction):
+        calls.append((user_id, direction))
+        if direction == FOLLOWERS:
+            return [a for a, b in EDGES if b == user_id]
+        return [b for a, b in EDGES if a == user_id]
+
+    graph = FollowGraph(loader)
+    graph.loader_calls = calls
+    return graph
+
+def test_counts_and_membership(graph):
+    assert graph.followers_count("bob") == 2
+    assert graph.following_count("bob") == 1
+    assert graph.is_following("alice", "bob") is True
+    assert graph.is_following("bob", "carol") is False
+    assert sorted(graph.followers("bob")) == ["alice", "carol"]
+
+def test_lists_are_loaded_once(graph):
+    graph.followers_count("bob")
+    graph.followers("bob")
+    graph.followers("bob", offset=1, limit=1)
+    assert graph.loader_calls == [("bob", FOLLOWERS)]
+
+def test_write_through_updates_loaded_lists(graph):
+    assert graph.followers_count("carol") == 0
+    assert graph.following_count("alice") == 1
+
+    graph.add_edge("alice", "carol")
+    assert graph.followers_count("carol") == 1
+    assert graph.is_following("alice", "carol") is True
+
+    graph.add_edge("alice", "carol")  # duplicate follow is a no-op
+    assert graph.followers_count("carol") == 1
+
+    graph.remove_edge("alice", "carol")
+    assert graph.followers("carol") == []
+    assert graph.is_following("alice", "carol") is False
+
+def test_pagination(graph):
+    page_one = graph.followers("bob", offset=0, limit=1)
+    page_two = graph.followers("bob", offset=1, limit=1)
+    assert len(page_one) == len(page_two) == 1
+    assert set(page_one + page_two) == {"alice", "carol"}
+
+def test_lru_eviction_bounds_cached_lists():
+    graph = FollowGraph(lambda user_id, direction: [], max_lists=2)
+    for user in ("a", "b", "c"):
+        graph.followers_count(user)
+    assert graph.memory_stats()["lists_cached"] == 2
+
+def test_memory_stats_reports_per_edge_cost(graph):
+    graph.followers("bob")
+    stats = graph.memory_stats()
+    assert stats["edge_entries"] == 2
+    assert stats["bytes_per_edge"] > 0
+
+def test_interned_ids_are_released_with_their_lists():
+    graph = FollowGraph(lambda user_id, direction: [f"{user_id}-fan"], max_lists=2)
+    for i in range(100):
+        graph.followers_count(f"random-{i}")
+    stats = graph.memory_stats()
+    assert stats["lists_cached"] == 2
+    assert stats["users_interned"] == 4  # two owners and one follower each
+    assert graph.followers("random-99") == ["random-99-fan"]
+
+    graph.clear()
+    assert graph.memory_stats()["users_interned"] == 0
+
+def test_unloaded_edits_do_not_intern(graph):
+    graph.add_edge("stranger", "nobody")
+    graph.remove_edge("stranger", "nobody")
+    assert graph.memory_stats()["users_interned"] == 0
+
+def test_edits_during_a_load_are_replayed():
+    edges = {("alice", "bob")}
+    graph = None
+
+    def loader(user_id, direction):
+        snapshot = [a for a, b in edges if b == user_id]  # read before the follow below commits
+        graph.add_edge("carol", "bob")
+        edges.add(("carol", "bob"))
+        return snapshot
+
+    graph = FollowGraph(loader)
+    assert sorted(graph.followers("bob")) == ["alice", "carol"]
+
+def test_a_load_that_missed_edits_is_not_kept(monkeypatch):
+    monkeypatch.setattr(FollowGraph, "MAX_RECENT_EDITS", 2)
+    calls = []
+    graph = None
+
+    def loader(user_id, direction):
+        calls.append(user_id)
+        if len(calls) == 1:
+            for fan in ("x", "y", "z"):
+                graph.add_edge(fan, "other")
+        return []
+
+    graph = FollowGraph(loader)
+    graph.followers_count("bob")
+    graph.followers_count("bob")
+    assert calls == ["bob", "bob"]
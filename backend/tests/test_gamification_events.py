@@ -0,0 +1,76 @@
+import pytest
+from services.gamification_events import (
+    GamificationPipeline, POST_CREATED, LIKE_RECEIVED, COMMENT_MADE, FOLLOW_GAINED, RULES,
+)
+
+class FakeStore:
+    """Stands in for apply_gamification_events: remembers keys, rewards new ones once"""
+
+    def __init__(self):
+        self.seen = {}
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self, rows):
+        self.calls += 1
+        if self.fail:
+            raise Exception("database unavailable")
+        applied = [r for r in rows if r["event_key"] not in self.seen]
+        for row in applied:
+            self.seen[row["event_key"]] = row
+        return applied
+
+    def xp(self, user_id):
+        return sum(r["xp"] for r in self.seen.values() if r["user_id"] == user_id)
+
+@pytest.fixture
+def store():
+    return FakeStore()
+
+@pytest.fixture
+def pipeline(store):
+    return GamificationPipeline(store, resolve_authors=lambda post_ids: {pid: "author" for pid in post_ids})
+
+def test_events_are_applied_in_one_batch(pipeline, store):
+    pipeline.emit(POST_CREATED, "post:p1", user_id="author", post_id="p1")
+    pipeline.emit(LIKE_RECEIVED, "like:p1:fan", actor_id="fan", post_id="p1")
+    pipeline.emit(COMMENT_MADE, "comment:c1", user_id="fan", post_id="p1")
+    pipeline.emit(FOLLOW_GAINED, "follow:fan:author", user_id="author", actor_id="fan")
+
+    assert pipeline.flush() == 4
+    assert store.calls == 1
+    assert store.xp("author") == RULES[POST_CREATED].xp + RULES[LIKE_RECEIVED].xp + RULES[FOLLOW_GAINED].xp
+    assert store.xp("fan") == RULES[COMMENT_MADE].xp
+
+def test_each_event_key_is_rewarded_once(pipeline, store):
+    for _ in range(3):
+        pipeline.emit(LIKE_RECEIVED, "like:p1:fan", actor_id="fan", post_id="p1")
+    pipeline.flush()
+    pipeline.emit(LIKE_RECEIVED, "like:p1:fan", actor_id="fan", post_id="p1")
+    pipeline.flush()
+
+    assert store.xp("author") == RULES[LIKE_RECEIVED].xp
+    assert pipeline.stats()["events_duplicate"] == 1
+
+def test_no_reward_for_liking_own_post(pipeline, store):
+    pipeline.emit(LIKE_RECEIVED, "like:p1:author", actor_id="author", post_id="p1")
+    pipeline.flush()
+    assert store.xp("author") == 0
+
+def test_failed_batch_is_retried(pipeline, store):
+    pipeline.emit(POST_CREATED, "post:p1", user_id="author", post_id="p1")
+    store.fail = True
+    assert pipeline.flush() == 0
+    assert pipeline.stats()["queued_events"] == 1
+
+    store.fail = False
+    assert pipeline.flush() == 1
+    assert store.xp("author") == RULES[POST_CREATED].xp
+
+def test_listeners_receive_applied_events(pipeline):
+    received = []
+    pipeline.on_applied(received.extend)
+    pipeline.emit(POST_CREATED, "post:p1", user_id="author", post_id="p1")
+    pipeline.emit(POST_CREATED, "post:p1", user_id="author", post_id="p1")
+    pipeline.shutdown()
+    assert [e["event_key"] for e in received] == ["post:p1"]
@@ -0,0 +1,42 @@
+import pytest
+from app import app
+from services.catalog import Catalog
+
+@pytest.fixture
+def client(monkeypatch):
+    app.config['TESTING'] = True
+    monkeypatch.setitem(app.config, 'SERVICE_TOKEN', 'internal-secret')
+    with app.test_client() as client:
+        yield client
+
+AWARDS = {"awards": [{"user_id": "u1", "xp": 50}]}
+
+def test_awards_require_the_service_token(client):
+    assert client.post("/api/gamification/awards", json=AWARDS).status_code == 403
+    wrong = {"X-Service-Token": "guess"}
+    assert client.post("/api/gamification/awards", json=AWARDS, headers=wrong).status_code == 403
+
+def test_service_routes_are_disabled_without_a_configured_token(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'SERVICE_TOKEN', None)
+    headers = {"X-Service-Token": ""}
+    assert client.post("/api/gamification/awards", json=AWARDS, headers=headers).status_code == 403
+
+def test_awards_reject_boolean_amounts(client):
+    headers = {"X-Service-Token": "internal-secret"}
+    res = client.post("/api/gamification/awards", json={"awards": [{"user_id": "u1", "xp": True}]}, headers=headers)
+    assert res.status_code == 400
+
+def test_catalog_invalidate_requires_the_service_token(client, monkeypatch):
+    cleared = []
+    monkeypatch.setattr(Catalog, "invalidate", staticmethod(lambda: cleared.append(True)))
+    assert client.post("/api/gamification/catalog/invalidate").status_code == 403
+    assert cleared == []
+    res = client.post("/api/gamification/catalog/invalidate", headers={"X-Service-Token": "internal-secret"})
+    assert res.status_code == 200
+    assert cleared == [True]
+
+def test_event_stats_require_the_service_token(client):
+    assert client.get("/api/gamification/events/stats").status_code == 403
+    res = client.get("/api/gamification/events/stats", headers={"X-Service-Token": "internal-secret"})
+    assert res.status_code == 200
+    assert "queued_events" in res.get_json()
@@ -0,0 +1,42 @@
+import math
+import random
+from services.geo import KDTree, distance_km, geohash, geohash_center, parse_location
+
+def test_parse_location():
+    assert parse_location({"lat": 33.8, "lng": -117.9}) == (33.8, -117.9)
+    assert parse_location({"latitude": "33.8", "longitude": "-117.9"}) == (33.8, -117.9)
+    assert parse_location(" 33.8, -117.9 ") == (33.8, -117.9)
+    assert parse_location("Anaheim, CA") is None
+    assert parse_location({"lat": 95, "lng": 0}) is None
+    assert parse_location({"lat": "x", "lng": 0}) is None
+    assert parse_location(None) is None
+
+def test_geohash_round_trip():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    lat, lng = geohash_center(geohash(33.8366, -117.9143))
+    assert distance_km((lat, lng), (33.8366, -117.9143)) < 1.0
+
+def test_distance_km():
+    # Anaheim to San Diego is about 135 km as the crow flies
+    assert 125 < distance_km((33.8366, -117.9143), (32.7157, -117.1611)) < 145
+    assert distance_km((10.0, 179.9), (10.0, -179.9)) < 25  # across the antimeridian
+
+def test_kdtree_matches_brute_force():
+    rng = random.Random(7)
+    points = [(rng.uniform(32, 35), rng.uniform(-119, -116), i) for i in range(2000)]
+    tree = KDTree(points)
+    assert len(tree) == 2000
+
+    for _ in range(50):
+        here = (rng.uniform(32, 35), rng.uniform(-119, -116))
+        expected = sorted((distance_km(here, (lat, lng)), i) for lat, lng, i in points)
+        expected = [i for d, i in expected if d <= 20][:5]
+        assert [i for _, i in tree.nearest(here[0], here[1], 5, 20)] == expected
+
+def test_kdtree_edge_cases():
+    assert KDTree([]).nearest(0, 0, 5, 10) == []
+    tree = KDTree([(0.0, 0.0, "a")])
+    assert tree.nearest(0, 0, 0, 10) == []
+    assert tree.nearest(0, 1, 1, 10) == []  # ~111 km away
+    (distance, payload), = tree.nearest(0, 0.05, 1, 10)
+    assert payload == "a" and math.isclose(distance, 5.56, abs_tol=0.01)
@@ -0,0 +1,47 @@
+import pytest
+from services.home_timeline import HomeTimeline
+from services.pagination import decode_cursor
+import services.home_timeline as home_timeline
+
+# Newest first: post 9 ... post 0, alternating between a followed and an unfollowed author
+ENTRIES = [{"id": str(i), "created_at": f"2025-01-01T00:00:{i:02d}+00:00", "user_id": "friend" if i % 2 else "gone"}
+           for i in range(9, -1, -1)]
+
+@pytest.fixture
+def timeline(monkeypatch):
+    calls = []
+
+    def merged_batch(user_id, after, limit):
+        calls.append(after)
+        start = 0
+        if after:
+            start = next(i for i, e in enumerate(ENTRIES) if [e["created_at"], e["id"]] == list(after)) + 1
+        batch = ENTRIES[start:start + limit]
+        return batch, start + limit >= len(ENTRIES)
+
+    class Graph:
+        def is_following(self, user_id, author_id):
+            return author_id == "friend"
+
+    monkeypatch.setattr(HomeTimeline, "_merged_batch", staticmethod(merged_batch))
+    monkeypatch.setattr(home_timeline, "follow_graph", Graph())
+    return calls
+
+def test_unfollowed_authors_do_not_shorten_pages(timeline):
+    entries, cursor = HomeTimeline.read("viewer", None, 2)
+    assert [e["id"] for e in entries] == ["9", "7"]
+    assert decode_cursor(cursor, ("created_at", "id")) == [ENTRIES[2]["created_at"], "7"]
+
+    entries, cursor = HomeTimeline.read("viewer", decode_cursor(cursor, ("created_at", "id")), 2)
+    assert [e["id"] for e in entries] == ["5", "3"]
+
+    entries, cursor = HomeTimeline.read("viewer", decode_cursor(cursor, ("created_at", "id")), 2)
+    assert [e["id"] for e in entries] == ["1"] and cursor is None
+
+def test_read_rounds_are_bounded(timeline, monkeypatch):
+    monkeypatch.setattr(HomeTimeline, "MAX_READ_ROUNDS", 1)
+    entries, cursor = HomeTimeline.read("viewer", None, 4)
+    assert [e["id"] for e in entries] == ["9", "7", "5"]
+    # Short page, but the cursor continues after everything scanned
+    assert decode_cursor(cursor, ("created_at", "id"))[1] == "5"
+    assert len(timeline) == 1
@@ -0,0 +1,32 @@
+from services.hyperloglog import HyperLogLog, REGISTERS
+
+def test_small_counts_are_close_to_exact():
+    sketch = HyperLogLog()
+    for i in range(100):
+        sketch.add(f"user-{i}")
+        sketch.add(f"user-{i}")  # repeats do not change the estimate
+    assert abs(sketch.count() - 100) <= 3
+
+def test_large_count_within_error_bound():
+    sketch = HyperLogLog()
+    for i in range(50000):
+        sketch.add(i)
+    assert abs(sketch.count() - 50000) / 50000 < 0.1
+
+def test_merge_equals_union():
+    a, b, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(3000):
+        a.add(i)
+        both.add(i)
+    for i in range(2000, 6000):
+        b.add(i)
+        both.add(i)
+    a.merge(b)
+    assert a.to_bytes() == both.to_bytes()
+
+def test_round_trips_through_bytes():
+    sketch = HyperLogLog()
+    sketch.add("alice")
+    restored = HyperLogLog(sketch.to_bytes())
+    assert len(restored.to_bytes()) == REGISTERS
+    assert restored.count() == 1
@@ -0,0 +1,135 @@
+import json
+import pytest
+from app import app
+import routes.ingredient_prices_routes as ingredient_prices_routes
+import services.ingredient_prices as ingredient_prices
+from services.ingredient_prices import IngredientPriceLookup
+from services.price_catalog import PriceCatalog
+
+PRICES = {
+    "chicken": {"ingredient_name": "Chicken Breast", "price_per_unit": 4.5, "unit": "lb",
+                "store_name": "Market", "currency": "USD"},
+    "salt": {"ingredient_name": "Sea Salt", "price_per_unit": 0, "unit": "oz"},
+}
+
+class FakeRpc:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, name, params):
+        self.calls.append(params["p_names"])
+        self.names = params["p_names"]
+        return self
+
+    def execute(self):
+        rows = [{"idx": i + 1, "price": PRICES[n]} for i, n in enumerate(self.names) if n in PRICES]
+        return type("Result", (), {"data": rows})()
+
+@pytest.fixture
+def rpc(monkeypatch):
+    fake = FakeRpc()
+    monkeypatch.setattr(ingredient_prices, "supabase", type("Client", (), {"rpc": fake})())
+    return fake
+
+def _failing_loader():
+    raise RuntimeError("catalog unavailable")
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_match_is_one_call_in_input_order(rpc):
+    rows = IngredientPriceLookup.match(["Chicken", "tofu", "chicken"])
+    assert rpc.calls == [["chicken", "tofu"]]
+    assert rows == [PRICES["chicken"], None, PRICES["chicken"]]
+
+ESTIMATE = {"ingredients": [
+    {"name": "chicken", "quantity": 2, "unit": "lb"},
+    {"name": ""},
+    {"name": "tofu", "quantity": 1},
+    {"name": "salt"},
+], "max_budget": 20}
+
+def _assert_per_item_semantics(data):
+    found, missing_name, not_found, zero = data["items"]
+    assert found["found"] is True and found["estimated_cost"] == 9.0
+    assert missing_name["message"] == "Missing ingredient name"
+    assert not_found["message"] == "No price data found for this ingredient"
+    assert zero["message"] == "Invalid or zero price in database"
+    assert data["total_estimated_cost"] == 9.0
+    assert data["budget_goal"]["coins_earned"] == 5
+
+def test_estimate_resolves_from_catalog_without_database(rpc, client, monkeypatch):
+    catalog = PriceCatalog(loader=lambda: list(PRICES.values()))
+    monkeypatch.setattr(ingredient_prices_routes, "price_catalog", catalog)
+
+    response = client.post('/api/ingredient-prices/estimate', data=json.dumps(ESTIMATE),
+                           headers={'Content-Type': 'application/json'})
+
+    assert response.status_code == 200
+    assert rpc.calls == []
+    _assert_per_item_semantics(response.get_json())
+
+def test_estimate_falls_back_to_rpc_when_catalog_unavailable(rpc, client, monkeypatch):
+    monkeypatch.setattr(ingredient_prices_routes, "price_catalog", PriceCatalog(loader=_failing_loader))
+    response = client.post('/api/ingredient-prices/estimate', data=json.dumps(ESTIMATE),
+                           headers={'Content-Type': 'application/json'})
+
+    assert response.status_code == 200
+    assert len(rpc.calls) == 1
+    _assert_per_item_semantics(response.get_json())
+
+def test_estimate_converts_units(client, monkeypatch):
+    rows = [{"ingredient_name": "Flour", "price_per_unit": 0.8, "unit": "lb"},
+            {"ingredient_name": "Tofu", "price_per_unit": 2.0, "unit": "lb"}]
+    monkeypatch.setattr(ingredient_prices_routes, "price_catalog", PriceCatalog(loader=lambda: rows))
+    payload = {"ingredients": [
+        {"name": "flour", "quantity": "1 1/2", "unit": "cups"},
+        {"name": "tofu", "quantity": 1, "unit": "cup"},
+    ]}
+    response = client.post('/api/ingredient-prices/estimate', data=json.dumps(payload),
+                           headers={'Content-Type': 'application/json'})
+
+    flour, tofu = response.get_json()["items"]
+    assert flour["quantity"] == 1.5 and flour["price_unit"] == "lb"
+    assert abs(flour["estimated_cost"] - 1.5 * 236.588 * 0.53 / 453.592 * 0.8) < 1e-9
+    assert tofu["found"] is False and tofu["message"] == "Cannot convert cup to lb for this ingredient"
+
+def test_estimate_recipes_in_one_call(client, monkeypatch):
+    rows = [{"ingredient_name": "Eggs", "price_per_unit": 3.6, "unit": "dozen"}]
+    monkeypatch.setattr(ingredient_prices_routes, "price_catalog", PriceCatalog(loader=lambda: rows))
+    payload = {"recipes": [{"id": "omelette", "ingredients": [{"item": "eggs", "amount": "3"}]},
+                           {"id": "toast", "ingredients": [{"item": "bread", "amount": "2"}]}]}
+    response = client.post('/api/ingredient-prices/recipes/estimate', data=json.dumps(payload),
+                           headers={'Content-Type': 'application/json'})
+
+    assert response.status_code == 200
+    assert response.get_json()["recipes"] == [
+        {"id": "omelette", "total_cost": 0.9, "priced": 1, "unpriced": 0, "currency": "USD"},
+        {"id": "toast", "total_cost": 0.0, "priced": 0, "unpriced": 1, "currency": "USD"},
+    ]
+
+def test_estimate_recipes_validates_body(client):
+    response = client.post('/api/ingredient-prices/recipes/estimate', data=json.dumps({}),
+                           headers={'Content-Type': 'application/json'})
+    assert response.status_code == 400
+
+def test_estimate_uses_location(client, monkeypatch):
+    rows = [{"ingredient_name": "Chicken Breast", "price_per_unit": p, "unit": "lb", "store_name": s,
+             "latitude": lat, "longitude": -117.91} for s, p, lat in (("A", 5.0, 33.84), ("B", 4.0, 33.85))]
+    monkeypatch.setattr(ingredient_prices_routes, "price_catalog", PriceCatalog(loader=lambda: rows))
+    payload = {"ingredients": [{"name": "chicken breast", "quantity": 1, "unit": "lb"}],
+               "location": "33.8366,-117.9143"}
+    response = client.post('/api/ingredient-prices/estimate', data=json.dumps(payload),
+                           headers={'Content-Type': 'application/json'})
+
+    item, = response.get_json()["items"]
+    assert item["store_name"] == "B" and item["estimated_cost"] == 4.0
+    assert item["distance_km"] < 5
+
+    payload["radius_km"] = 0
+    response = client.post('/api/ingredient-prices/estimate', data=json.dumps(payload),
+                           headers={'Content-Type': 'application/json'})
+    assert response.status_code == 400
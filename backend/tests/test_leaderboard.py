@@ -0,0 +1,71 @@
+import random
+import pytest
+from services.leaderboard import Leaderboard, RankedSkipList
+
+XP = {"alice": 500, "bob": 300, "carol": 300, "dave": 100, "erin": 50}
+
+@pytest.fixture
+def board():
+    return Leaderboard(loader=lambda: dict(XP))
+
+def test_skip_list_rank_and_select_match_sorted_list():
+    random.seed(7)
+    skip, expected = RankedSkipList(), []
+    for _ in range(2000):
+        key = random.randint(0, 500)
+        if key in expected:
+            assert skip.remove(key)
+            expected.remove(key)
+        else:
+            skip.insert(key)
+            expected.append(key)
+        expected.sort()
+    assert len(skip) == len(expected)
+    for probe in (0, 100, 250, 501):
+        assert skip.count_less(probe) == sum(1 for k in expected if k < probe)
+    assert list(skip.iter_from(10))[:5] == expected[10:15]
+    assert skip.remove(-1) is False
+
+def test_top_with_shared_ranks(board):
+    top = board.top(limit=4)
+    assert [(e["rank"], e["user_id"]) for e in top] == [(1, "alice"), (2, "bob"), (2, "carol"), (4, "dave")]
+    assert [e["rank"] for e in board.top(limit=2, offset=2)] == [2, 4]
+
+def test_rank_and_around(board):
+    assert board.rank("dave") == {"rank": 4, "xp": 100, "total": 5}
+    assert board.rank("nobody")["rank"] == 6
+    around = board.around("dave", radius=1)
+    assert [e["user_id"] for e in around] == ["carol", "dave", "erin"]
+    assert board.around("nobody") == []
+
+def test_updates_move_users(board):
+    board.top()
+    board.add_xp("erin", 1000)
+    board.set_xp("alice", 0)
+    assert board.top(limit=1)[0]["user_id"] == "erin"
+    assert board.rank("alice")["xp"] == 0
+    assert board.rank("bob")["rank"] == 2
+
+def test_apply_events_adds_xp(board):
+    board.top()
+    board.apply_events([{"user_id": "dave", "xp": 150}, {"user_id": "dave", "xp": 100}, {"user_id": "bob", "xp": 0}])
+    assert board.rank("dave") == {"rank": 2, "xp": 350, "total": 5}
+
+def test_friends_board(board):
+    entries = board.friends("dave", {"alice", "erin", "zed"})
+    assert [(e["rank"], e["user_id"]) for e in entries] == [(1, "alice"), (2, "dave"), (3, "erin"), (4, "zed")]
+
+def test_reloads_after_interval():
+    now = [0.0]
+    loads = []
+
+    def loader():
+        loads.append(now[0])
+        return dict(XP)
+
+    board = Leaderboard(loader=loader, clock=lambda: now[0])
+    board.top()
+    board.top()
+    now[0] += Leaderboard.RELOAD_INTERVAL + 1
+    board.top()
+    assert len(loads) == 2
@@ -0,0 +1,42 @@
+import json
+import threading
+from services.message_broker import InMemoryBroker, Subscription, format_sse, conversation_channel
+
+def test_publish_reaches_channel_subscribers_only():
+    broker = InMemoryBroker()
+    mine = broker.subscribe(conversation_channel("c1"))
+    other = broker.subscribe(conversation_channel("c2"))
+
+    delivered = broker.publish(conversation_channel("c1"), {"type": "message", "data": {"content": "hi"}})
+
+    assert delivered == 1
+    assert mine.get(timeout=0.1)["data"]["content"] == "hi"
+    assert other.get(timeout=0.01) is None
+
+def test_close_unsubscribes():
+    broker = InMemoryBroker()
+    subscription = broker.subscribe("conversation:c1")
+    subscription.close()
+    assert broker.subscriber_count("conversation:c1") == 0
+    assert broker.publish("conversation:c1", {"type": "read"}) == 0
+
+def test_slow_subscriber_keeps_newest_events():
+    broker = InMemoryBroker()
+    subscription = broker.subscribe("conversation:c1")
+    for i in range(Subscription.MAX_PENDING + 5):
+        broker.publish("conversation:c1", {"type": "message", "data": i})
+    assert subscription.get(timeout=0.1)["data"] == 5
+
+def test_subscriber_wakes_on_publish_from_another_thread():
+    broker = InMemoryBroker()
+    subscription = broker.subscribe("conversation:c1")
+    threading.Timer(0.05, broker.publish, args=("conversation:c1", {"type": "read"})).start()
+    assert subscription.get(timeout=1)["type"] == "read"
+
+def test_format_sse():
+    frame = format_sse({"type": "message", "id": "m1", "data": {"content": "hi"}})
+    assert frame.endswith("\n\n")
+    lines = frame.strip().split("\n")
+    assert lines[0] == "id: m1"
+    assert lines[1] == "event: message"
+    assert json.loads(lines[2][len("data: "):]) == {"content": "hi"}
@@ -0,0 +1,13 @@
+import pytest
+from app import app
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def test_conversation_with_yourself_is_rejected(client):
+    me = "6f1c2b1e-5c9a-4f0e-9a57-0d3c8e1f2a4b"
+    res = client.post("/api/conversations", json={"user_id": me, "other_user_id": me.upper()})
+    assert res.status_code == 400
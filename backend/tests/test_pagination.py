@@ -0,0 +1,74 @@
+import pytest
+from services.pagination import (
+    encode_cursor, decode_cursor, keyset_filter, paginate, split_page, InvalidCursor
+)
+
+class FakeQuery:
+    """Records the PostgREST builder calls paginate() makes"""
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return record
+
+ROWS = [
+    {"id": "3", "created_at": "2025-01-03T00:00:00+00:00"},
+    {"id": "2", "created_at": "2025-01-02T00:00:00+00:00"},
+    {"id": "1", "created_at": "2025-01-01T00:00:00+00:00"},
+]
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(ROWS[1], ("created_at", "id"))
+    assert decode_cursor(cursor, ("created_at", "id")) == ["2025-01-02T00:00:00+00:00", "2"]
+
+@pytest.mark.parametrize("bad", ["not-base64!!", "e30", encode_cursor({"x": "1"}, ("x",))])
+def test_decode_rejects_foreign_cursors(bad):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(bad, ("created_at", "id"))
+
+@pytest.mark.parametrize("values", [
+    ['2025-01-02T00:00:00Z",id.gt."0', "2"],
+    ["2025-01-02T00:00:00+00:00", '2"),or(id.gt.0'],
+    ["yesterday", "2"],
+    ["2025-01-02T00:00:00Z", "not-a-key"],
+])
+def test_decode_rejects_values_that_are_not_timestamps_or_keys(values):
+    cursor = encode_cursor(dict(zip(("created_at", "id"), values)), ("created_at", "id"))
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, ("created_at", "id"))
+
+def test_decode_accepts_uuid_and_integer_keys():
+    for key in ("3f2b8c1e-9a4d-4e6f-8b2a-1c3d5e7f9a0b", "42"):
+        cursor = encode_cursor({"saved_at": "2025-01-02 00:00:00.123456+00", "id": key}, ("saved_at", "id"))
+        assert decode_cursor(cursor, ("saved_at", "id"))[1] == key
+
+def test_keyset_filter_descending():
+    assert keyset_filter(("created_at", "id"), ["t", "b"]) == \
+        'created_at.lt."t",and(created_at.eq."t",id.lt."b")'
+
+def test_keyset_filter_ascending():
+    assert keyset_filter(("created_at", "id"), ["t", "b"], desc=False).startswith('created_at.gt."t"')
+
+def test_paginate_uses_offset_without_cursor():
+    query, page, per_page = paginate(FakeQuery(), {"page": "3", "per_page": "10"})
+    assert (page, per_page) == (3, 10)
+    assert ("range", (20, 30), {}) in query.calls
+
+def test_paginate_uses_keyset_with_cursor():
+    cursor = encode_cursor(ROWS[0], ("created_at", "id"))
+    query, _, per_page = paginate(FakeQuery(), {"cursor": cursor, "per_page": "2"})
+    names = [name for name, _, _ in query.calls]
+    assert "range" not in names
+    assert ("limit", (3,), {}) in query.calls
+    assert "or_" in names
+
+def test_split_page_emits_cursor_only_when_more_rows():
+    rows, next_cursor = split_page(ROWS, 2)
+    assert [r["id"] for r in rows] == ["3", "2"]
+    assert decode_cursor(next_cursor, ("created_at", "id"))[1] == "2"
+
+    rows, next_cursor = split_page(ROWS, 3)
+    assert len(rows) == 3 and next_cursor is None
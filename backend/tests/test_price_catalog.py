@@ -0,0 +1,171 @@
+from services.price_catalog import PriceCatalog, normalize
+
+NAMES = ["Olive Oil", "Boiled Ham", "Chicken Breast", "Green Onions", "Coriander",
+         "Roma Tomatoes", "Powdered Sugar", "Sugar", "Broccoli"]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_catalog(rows=None, clock=None):
+    rows = rows if rows is not None else [{"ingredient_name": n, "price_per_unit": 1.0} for n in NAMES]
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return rows
+
+    catalog = PriceCatalog(loader=loader, clock=clock or FakeClock())
+    return catalog, calls
+
+def name_of(result):
+    return result[0]["ingredient_name"] if result else None
+
+def test_normalize_drops_case_punctuation_and_plurals():
+    assert normalize("Tomatoes, Roma") == "tomato roma"
+    assert normalize("  Green ONIONS ") == "green onion"
+    assert normalize("Berries") == "berry"
+    assert normalize("Swiss") == "swiss"
+
+def test_exact_plural_and_partial_names():
+    catalog, _ = make_catalog()
+    assert catalog.match("olive oil") == ({"ingredient_name": "Olive Oil", "price_per_unit": 1.0}, 1.0)
+    assert name_of(catalog.match("roma tomato")) == "Roma Tomatoes"
+    assert name_of(catalog.match("oil")) == "Olive Oil"
+    assert name_of(catalog.match("sugar")) == "Sugar"
+
+def test_typos_and_synonyms():
+    catalog, _ = make_catalog()
+    assert name_of(catalog.match("chiken breast")) == "Chicken Breast"
+    assert name_of(catalog.match("brocoli")) == "Broccoli"
+    assert name_of(catalog.match("scallions")) == "Green Onions"
+    assert name_of(catalog.match("cilantro")) == "Coriander"
+    assert name_of(catalog.match("icing sugar")) == "Powdered Sugar"
+
+def test_unrelated_names_do_not_match():
+    catalog, _ = make_catalog()
+    assert catalog.match("tofu") is None
+    assert catalog.match("") is None
+    assert catalog.match_many(["xyz", "olive oil"]) == [None, {"ingredient_name": "Olive Oil", "price_per_unit": 1.0}]
+
+def test_newest_row_wins_for_a_name():
+    rows = [
+        {"ingredient_name": "Eggs", "price_per_unit": 3.0, "last_updated": "2024-01-01T00:00:00Z"},
+        {"ingredient_name": "eggs", "price_per_unit": 4.0, "last_updated": "2024-06-01T00:00:00+00:00"},
+        {"ingredient_name": "EGG", "price_per_unit": 2.0},
+    ]
+    catalog, _ = make_catalog(rows)
+    assert catalog.match("egg")[0]["price_per_unit"] == 4.0
+
+def test_ties_are_deterministic():
+    rows = [{"ingredient_name": n, "price_per_unit": 1.0} for n in ("Red Apple", "Big Apple")]
+    forward, _ = make_catalog(rows)
+    backward, _ = make_catalog(list(reversed(rows)))
+    assert name_of(forward.match("apple")) == name_of(backward.match("apple")) == "Big Apple"
+
+def test_loads_once_and_refreshes_after_interval():
+    clock = FakeClock()
+    catalog, calls = make_catalog(clock=clock)
+    assert not catalog.loaded
+    catalog.match("sugar")
+    catalog.match("oil")
+    assert calls == [1]
+
+    clock.now = PriceCatalog.REFRESH_INTERVAL + 1
+    catalog._refresh_async = catalog.refresh  # run the scheduled reload inline
+    catalog.match("sugar")
+    assert calls == [1, 1]
+
+def test_matches_are_memoized_until_the_next_refresh(monkeypatch):
+    rows = [{"ingredient_name": "Sugar", "price_per_unit": 1.0}]
+    catalog, _ = make_catalog(rows)
+    assert name_of(catalog.match("sugar")) == "Sugar"
+
+    scored = []
+    original = PriceCatalog._score
+    monkeypatch.setattr(PriceCatalog, "_score", staticmethod(lambda *args: scored.append(1) or original(*args)))
+    assert name_of(catalog.match("Sugars")) == "Sugar"
+    assert scored == []
+
+    rows[:] = [{"ingredient_name": "Brown Sugar", "price_per_unit": 2.0}]
+    catalog.refresh()
+    assert name_of(catalog.match("sugar")) == "Brown Sugar"
+    assert scored
+
+def test_common_trigrams_do_not_crowd_out_the_match(monkeypatch):
+    import services.price_catalog as price_catalog
+    monkeypatch.setattr(price_catalog, "COMMON_GRAM_POSTINGS", 3)
+    monkeypatch.setattr(price_catalog, "MAX_CANDIDATES", 2)
+    names = [f"Cheddar Cheese {i}" for i in range(5)] + ["Cheese Blend", "Chickpea"]
+    catalog, _ = make_catalog([{"ingredient_name": n, "price_per_unit": 1.0} for n in names])
+    assert name_of(catalog.match("chickpeas")) == "Chickpea"
+    assert name_of(catalog.match("cheddar cheese 3")) == "Cheddar Cheese 3"
+
+def test_memory_stats_counts_index():
+    catalog, _ = make_catalog()
+    catalog.refresh()
+    stats = catalog.memory_stats()
+    assert stats["names"] == len(NAMES)
+    assert stats["postings"] >= stats["names"]
+    assert stats["total_bytes"] == sum(stats[k] for k in ("names_bytes", "rows_bytes", "index_bytes", "offer_bytes"))
+
+ANAHEIM = (33.8366, -117.9143)
+
+def offer(store, lat, lng, price, unit="lb", name="Chicken Breast"):
+    return {"ingredient_name": name, "price_per_unit": price, "unit": unit, "store_name": store,
+            "store_location": f"{lat},{lng}"}
+
+def test_cheapest_of_nearby_stores():
+    rows = [
+        offer("Near", 33.84, -117.91, 5.0),
+        offer("Cheaper", 33.85, -117.95, 4.0),
+        offer("Cheapest but far", 34.05, -118.24, 1.0),   # Los Angeles, ~35 km
+        {"ingredient_name": "Chicken Breast", "price_per_unit": 9.0, "unit": "lb", "store_name": "Online",
+         "last_updated": "2030-01-01T00:00:00Z"},
+    ]
+    catalog, _ = make_catalog(rows)
+
+    row, _ = catalog.match("chicken breast", near=ANAHEIM)
+    assert row["store_name"] == "Cheaper" and 0 < row["distance_km"] < 10
+    assert catalog.match("chicken breast", near=ANAHEIM, radius_km=50)[0]["store_name"] == "Cheapest but far"
+    assert catalog.match("chicken breast", near=ANAHEIM, k=1)[0]["store_name"] == "Near"
+    # No stocking store in range, or no location: the newest row
+    assert catalog.match("chicken breast", near=(40.7, -74.0))[0]["store_name"] == "Online"
+    assert catalog.match("chicken breast")[0]["store_name"] == "Online"
+
+def test_nearby_prices_compare_per_unit():
+    rows = [offer("Per lb", 33.84, -117.91, 4.0, "lb"), offer("Per oz", 33.85, -117.92, 0.3, "oz")]
+    catalog, _ = make_catalog(rows)
+    assert catalog.match("chicken breast", near=ANAHEIM)[0]["store_name"] == "Per lb"  # 0.3/oz is 4.80/lb
+
+def test_nearby_skips_offers_without_a_price():
+    rows = [offer("Free", 33.8366, -117.9143, 0, "each"), offer("Missing", 33.837, -117.914, None),
+            offer("Per lb", 33.85, -117.92, 4.0, "lb")]
+    catalog, _ = make_catalog(rows)
+    assert catalog.match("chicken breast", near=ANAHEIM)[0]["store_name"] == "Per lb"
+
+def test_nearby_answer_from_a_replaced_snapshot_is_not_reused():
+    rows = [offer("Old", 33.84, -117.91, 5.0)]
+    catalog, _ = make_catalog(rows)
+    catalog.match("chicken breast")
+    stale = catalog._catalog
+    rows[:] = [offer("New", 33.84, -117.91, 4.0)]
+    catalog.refresh()
+    # A lookup that started before the refresh finishes after it
+    catalog._cheapest_nearby(stale, 0, ANAHEIM, 5, 25.0)
+    assert catalog.match("chicken breast", near=ANAHEIM)[0]["store_name"] == "New"
+
+def test_nearby_answers_are_cached_per_cell():
+    rows = [offer("Store %d" % i, 33.8 + i * 0.001, -117.9, 5.0 - i * 0.01) for i in range(40)]
+    catalog, _ = make_catalog(rows)
+    first = catalog.match("chicken breast", near=ANAHEIM)
+    stats = catalog._nearby.stats()
+    again = catalog.match("chicken breast", near=(ANAHEIM[0] + 0.0001, ANAHEIM[1]))  # same cell
+    assert again == first
+    assert catalog._nearby.stats()["hits"] == stats["hits"] + 1
+
+    catalog.refresh()
+    assert len(catalog._nearby) == 0
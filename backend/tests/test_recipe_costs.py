@@ -0,0 +1,140 @@
+import time
+from services.price_catalog import PriceCatalog
+from services.recipe_costs import RecipeCostIndex, ingredients_hash
+
+PASTA = {"title": "Pasta", "ingredients": [{"item": "Pasta", "amount": "1", "unit": "lb"},
+                                           {"item": "garlic", "amount": "2", "unit": "cloves"}]}
+OMELETTE = {"title": "Omelette", "ingredients": [{"item": "eggs", "amount": "3"}]}
+
+def make_index(posts=(), background=False):
+    prices = {"pasta": {"ingredient_name": "Pasta", "price_per_unit": 2.0, "unit": "lb"},
+              "egg": {"ingredient_name": "Eggs", "price_per_unit": 3.6, "unit": "dozen"}}
+    catalog = PriceCatalog(loader=lambda: list(prices.values()))
+    writes = []
+    index = RecipeCostIndex(catalog=catalog, load_recipes=lambda: list(posts), write_costs=writes.extend)
+    if not background:
+        index._ensure_thread = lambda: None  # the tests call flush() themselves
+    return index, catalog, prices, writes
+
+def test_hash_ignores_case_plurals_and_key_order():
+    a = {"ingredients": [{"item": "Eggs", "amount": "3", "unit": "Large"}]}
+    b = {"ingredients": [{"unit": "large", "amount": "3", "item": "egg"}]}
+    assert ingredients_hash(a) == ingredients_hash(b)
+    assert ingredients_hash(a) != ingredients_hash({"ingredients": [{"item": "egg", "amount": "4"}]})
+
+def test_price_fields_are_memoized_by_ingredients():
+    index, catalog, _, _ = make_index()
+    catalog.refresh()
+    calls = []
+    match_many = catalog.match_many
+    catalog.match_many = lambda names: calls.append(names) or match_many(names)
+
+    fields = index.price_fields(OMELETTE)
+    again = index.price_fields(dict(OMELETTE, title="Another omelette"))
+
+    assert fields == {"estimated_cost": 0.9, "cost_currency": "USD", "ingredients_hash": ingredients_hash(OMELETTE)}
+    assert again == fields
+    assert len(calls) == 1
+    assert index.stats()["memo_hits"] == 1
+
+def test_unpriced_recipe_has_no_cost():
+    index, catalog, _, _ = make_index()
+    catalog.refresh()
+    fields = index.price_fields({"ingredients": [{"item": "unicorn tears", "amount": "1"}]})
+    assert fields["estimated_cost"] is None and fields["cost_currency"] is None
+
+def test_price_fields_leave_a_cold_catalog_to_the_worker():
+    index, catalog, _, _ = make_index()
+    assert index.price_fields(OMELETTE) == {}
+    assert not catalog.loaded
+
+def test_memoized_cost_of_an_untracked_recipe_follows_the_catalog():
+    index, catalog, prices, _ = make_index()
+    catalog.refresh()
+    assert index.price_fields(OMELETTE)["estimated_cost"] == 0.9  # no post uses it yet
+
+    prices["egg"] = {"ingredient_name": "Eggs", "price_per_unit": 4.8, "unit": "dozen"}
+    catalog.refresh()
+    assert index.price_fields(OMELETTE)["estimated_cost"] == 1.2
+
+def test_initial_load_writes_only_stale_costs():
+    current = dict(id="p1", recipe_data=OMELETTE, ingredients_hash=ingredients_hash(OMELETTE),
+                   estimated_cost=0.9, cost_currency="USD")
+    stale = dict(id="p2", recipe_data=PASTA, ingredients_hash="old", estimated_cost=1.0, cost_currency="USD")
+    index, _, _, writes = make_index([current, stale])
+
+    assert index.flush() == 1
+    assert writes == [{"post_id": "p2", "estimated_cost": 2.0, "cost_currency": "USD",
+                       "ingredients_hash": ingredients_hash(PASTA)}]
+    assert index.flush() == 0
+
+def test_catalog_refresh_reprices_only_affected_recipes():
+    posts = [dict(id="p1", recipe_data=OMELETTE), dict(id="p2", recipe_data=PASTA)]
+    index, catalog, prices, writes = make_index(posts)
+    index.flush()
+    writes.clear()
+
+    prices["egg"] = {"ingredient_name": "Eggs", "price_per_unit": 4.8, "unit": "dozen"}
+    catalog.refresh()
+    assert index.flush() == 1
+    assert writes == [{"post_id": "p1", "estimated_cost": 1.2, "cost_currency": "USD",
+                       "ingredients_hash": ingredients_hash(OMELETTE)}]
+    assert index.stats()["last_affected"] == 1
+
+    writes.clear()
+    catalog.refresh()  # nothing changed
+    assert index.flush() == 0 and writes == []
+
+def test_track_and_forget():
+    index, _, _, writes = make_index()
+    index.flush()
+
+    index.track({"id": "p3", "recipe_data": OMELETTE})  # stored without a cost
+    assert index.stats()["pending"] == 1
+    assert index.flush() == 1 and writes[0]["post_id"] == "p3"
+
+    index.forget("p3")
+    assert index.stats()["recipes"] == 0 and index.stats()["ingredients"] == 0
+
+def test_failed_write_is_retried():
+    index, _, _, _ = make_index([dict(id="p1", recipe_data=OMELETTE)])
+    attempts = []
+
+    def flaky(rows):
+        attempts.append(rows)
+        if len(attempts) == 1:
+            raise RuntimeError("db down")
+
+    index._write_costs = flaky
+    try:
+        index.flush()
+    except RuntimeError:
+        pass
+    assert index.stats()["pending"] == 1
+    assert index.flush() == 1
+
+def test_track_starts_the_worker():
+    index, catalog, _, writes = make_index(background=True)
+    index.track({"id": "p1", "recipe_data": OMELETTE})
+    deadline = time.time() + 2
+    while not writes and time.time() < deadline:
+        time.sleep(0.01)
+    index.shutdown()
+    assert writes and writes[0]["post_id"] == "p1"
+
+def test_failed_catalog_rematch_is_retried():
+    index, catalog, prices, writes = make_index([dict(id="p1", recipe_data=OMELETTE)])
+    index.flush()
+    writes.clear()
+
+    prices["egg"] = {"ingredient_name": "Eggs", "price_per_unit": 4.8, "unit": "dozen"}
+    catalog.refresh()
+    match_many = catalog.match_many
+    catalog.match_many = lambda names: (_ for _ in ()).throw(RuntimeError("catalog unavailable"))
+    try:
+        index.flush()
+    except RuntimeError:
+        pass
+    catalog.match_many = match_many
+    assert index.flush() == 1
+    assert writes[0]["estimated_cost"] == 1.2
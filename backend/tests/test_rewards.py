@@ -0,0 +1,61 @@
+import pytest
+import services.rewards as rewards
+from services.rewards import RewardService, level_for
+
+class FakeRpc:
+    """Stands in for supabase.rpc("award_rewards"), applying awards to a dict"""
+
+    def __init__(self, totals):
+        self.totals = totals
+        self.calls = []
+
+    def __call__(self, name, params):
+        self.calls.append((name, params))
+        self.pending = params["p_awards"]
+        return self
+
+    def execute(self):
+        summed = {}
+        for a in self.pending:
+            xp, coins = summed.get(a["user_id"], (0, 0))
+            summed[a["user_id"]] = (xp + a["xp"], coins + a["coins"])
+        rows = []
+        for user_id, (xp, coins) in summed.items():
+            old_xp, old_coins = self.totals.get(user_id, (0, 0))
+            self.totals[user_id] = (old_xp + xp, old_coins + coins)
+            rows.append({"user_id": user_id, "xp": old_xp + xp, "level": level_for(old_xp + xp),
+                         "coins": old_coins + coins, "xp_gained": xp, "coins_gained": coins})
+        return type("Result", (), {"data": rows})()
+
+@pytest.fixture
+def rpc(monkeypatch):
+    fake = FakeRpc({"u1": (90, 5)})
+    monkeypatch.setattr(rewards, "supabase", type("Client", (), {"rpc": fake})())
+    return fake
+
+def test_award_reports_level_up(rpc):
+    result = RewardService.award("u1", xp=20)
+    assert result["xp"] == 110
+    assert result["level"] == 2
+    assert result["level_up"] is True
+
+    result = RewardService.award("u1", coins=3)
+    assert result["coins"] == 8
+    assert result["level_up"] is False
+
+def test_batch_is_one_call(rpc):
+    results = RewardService.award_many([
+        {"user_id": "u1", "xp": 5},
+        {"user_id": "u2", "coins": 10},
+        {"user_id": "u1", "xp": 5, "coins": 1},
+    ])
+    assert len(rpc.calls) == 1
+    by_user = {r["user_id"]: r for r in results}
+    assert by_user["u1"]["xp"] == 100
+    assert by_user["u1"]["level_up"] is True
+    assert by_user["u2"]["coins"] == 10
+
+def test_large_batches_are_chunked(rpc, monkeypatch):
+    monkeypatch.setattr(RewardService, "MAX_BATCH", 2)
+    RewardService.award_many([{"user_id": f"u{i}", "xp": 1} for i in range(5)])
+    assert len(rpc.calls) == 3
@@ -0,0 +1,78 @@
+import pytest
+from services.trending import TrendingEngine, LIKE, COMMENT, VIEW
+
+HOUR = 3600
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+@pytest.fixture
+def engine(clock):
+    return TrendingEngine(capacity=100, loader=lambda since: [], clock=clock)
+
+def test_ranks_by_weighted_engagement(engine):
+    engine.record("p1", LIKE)
+    engine.record("p2", COMMENT)
+    engine.record("p3", VIEW)
+    assert engine.top() == ["p2", "p1", "p3"]
+    assert engine.top(offset=1, limit=1) == ["p1"]
+
+def test_older_engagement_decays(engine, clock):
+    for _ in range(3):
+        engine.record("old", LIKE)
+    clock.now += 24 * HOUR  # four half-lives
+    engine.record("new", LIKE)
+
+    assert engine.top() == ["new", "old"]
+    assert engine.score("old") == pytest.approx(3 / 16)
+    assert engine.score("new") == pytest.approx(1)
+
+def test_negative_events_take_weight_back(engine):
+    engine.record("p1", LIKE)
+    engine.record("p2", LIKE)
+    engine.record("p2", LIKE, -1)
+    assert engine.top() == ["p1"]
+
+def test_capacity_evicts_lowest(clock):
+    engine = TrendingEngine(capacity=2, loader=lambda since: [], clock=clock)
+    engine.record("a", COMMENT)
+    engine.record("b", LIKE)
+    engine.record("c", VIEW)      # lower than everything tracked: ignored
+    engine.record("d", COMMENT)   # evicts "b"
+    assert sorted(engine.top()) == ["a", "d"]
+
+def test_rescale_preserves_ranking(engine, clock):
+    engine.record("p1", COMMENT)
+    engine.record("p2", LIKE)
+    clock.now += engine.RESCALE_EXPONENT * engine._tau + 1
+    engine.record("p3", VIEW)
+    assert engine.top() == ["p3", "p1", "p2"]
+    assert engine.score("p3") == pytest.approx(0.05)
+
+def test_seeds_from_recent_posts_once(clock):
+    calls = []
+
+    def loader(since):
+        calls.append(since)
+        return [
+            {"id": "p1", "created_at": "2023-11-14T22:00:00+00:00", "likes_count": 2, "comments_count": 0},
+            {"id": "p2", "created_at": "2023-11-14T21:00:00Z", "likes_count": 0, "comments_count": 1},
+        ]
+
+    engine = TrendingEngine(loader=loader, clock=clock)
+    assert engine.top() == ["p2", "p1"]
+    engine.top()
+    assert len(calls) == 1
+
+def test_remove(engine):
+    engine.record("p1", LIKE)
+    engine.remove("p1")
+    assert engine.top() == []
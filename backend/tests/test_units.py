@@ -0,0 +1,57 @@
+import math
+from services.units import MASS, VOLUME, COUNT, CONTAINER, UNKNOWN, parse_amount, parse_unit, density_for, grams_each, \
+    grams_per_container
+
+def test_parse_amount_handles_recipe_text():
+    assert parse_amount(2) == 2.0
+    assert parse_amount("1/2") == 0.5
+    assert parse_amount("1 1/2") == 1.5
+    assert parse_amount("1½") == 1.5
+    assert parse_amount("¾ cup") == 0.75
+    assert parse_amount("2-3") == 2.5
+    assert parse_amount("3 to 4") == 3.5
+    assert parse_amount(".25") == 0.25
+
+def test_parse_amount_rejects_non_numbers():
+    assert parse_amount(None) is None
+    assert parse_amount("") is None
+    assert parse_amount("a pinch") is None
+    assert parse_amount("1/0") is None
+    assert parse_amount(True) is None
+
+def test_parse_unit_aliases_plurals_and_case():
+    assert parse_unit("lbs") == (MASS, 453.592)
+    assert parse_unit("Tbsp.") == parse_unit("tablespoons") == (VOLUME, 14.7868)
+    assert parse_unit("T") == parse_unit("tbsp")
+    assert parse_unit("t") == parse_unit("tsp")
+    assert parse_unit("per lb") == parse_unit("lb")
+    assert parse_unit("pinches") == (VOLUME, 0.31)
+    assert parse_unit("gal") == (VOLUME, 3785.41)
+    assert parse_unit("dozen") == (COUNT, 12.0)
+
+def test_parse_unit_missing_and_unknown():
+    assert parse_unit(None) is None
+    assert parse_unit("  ") is None
+    dim, size = parse_unit("handful")
+    assert dim == UNKNOWN and math.isnan(size)
+
+def test_ingredient_tables_match_longest_name():
+    assert density_for("All-Purpose Flour") == 0.53
+    assert density_for("Extra Virgin Olive Oil") == 0.91
+    assert density_for("brown sugar") == 0.83
+    assert grams_each("Sweet Potatoes") == 130.0
+    assert grams_each("yellow onions") == 150.0
+    assert math.isnan(density_for("tofu"))
+
+def test_each_container_is_its_own_dimension():
+    assert parse_unit("cans")[0] >= CONTAINER
+    assert parse_unit("pkg") == parse_unit("packages")
+    assert parse_unit("can") != parse_unit("bunch") != parse_unit("slices")
+    assert parse_unit("large") == parse_unit("each") == (COUNT, 1.0)
+
+def test_container_weights_are_per_ingredient():
+    stick = parse_unit("sticks")[0]
+    assert grams_per_container(stick, "Unsalted Butter") == 113.4
+    assert math.isnan(grams_per_container(stick, "cinnamon"))
+    assert grams_per_container(parse_unit("cloves")[0], "garlic") == 5.0
+    assert math.isnan(grams_per_container(MASS, "butter"))
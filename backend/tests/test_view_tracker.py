@@ -0,0 +1,67 @@
+import base64
+import pytest
+from services.hyperloglog import HyperLogLog
+from services.view_tracker import ViewTracker
+
+HOUR = 1_700_000_000 - 1_700_000_000 % 3600
+
+class FakeWriter:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def __call__(self, rows):
+        if self.fail:
+            raise Exception("database unavailable")
+        self.batches.append(rows)
+
+@pytest.fixture
+def writer():
+    return FakeWriter()
+
+def test_impressions_aggregate_per_post_and_bucket(writer):
+    tracker = ViewTracker(writer)
+    for viewer in ("u1", "u2", "u1"):
+        tracker.record(viewer, ["p1", "p2"], viewed_at=HOUR + 10)
+    tracker.record("u3", ["p1"], viewed_at=HOUR + 3600)
+
+    assert tracker.flush() == 3
+    rows = {(r["post_id"], r["bucket_start"]): r for r in writer.batches[0]}
+    first_bucket = [r for (pid, _), r in rows.items() if pid == "p1" and r["views"] == 3][0]
+    sketch = HyperLogLog(base64.b64decode(first_bucket["sketch"]))
+    assert sketch.count() == 2
+    assert sorted(r["views"] for r in rows.values()) == [1, 3, 3]
+
+def test_failed_flush_keeps_views_for_retry(writer):
+    tracker = ViewTracker(writer)
+    tracker.record("u1", ["p1"], viewed_at=HOUR)
+    writer.fail = True
+    assert tracker.flush() == 0
+
+    tracker.record("u2", ["p1"], viewed_at=HOUR)
+    writer.fail = False
+    tracker.flush()
+    (row,) = writer.batches[0]
+    assert row["views"] == 2
+    assert HyperLogLog(base64.b64decode(row["sketch"])).count() == 2
+    assert tracker.stats()["flush_failures"] == 1
+
+def test_stats_and_shutdown_flush(writer):
+    tracker = ViewTracker(writer)
+    tracker.record("u1", ["p1", "p2"], viewed_at=HOUR)
+    stats = tracker.stats()
+    assert stats["buffered_views"] == 2
+    assert stats["buffered_buckets"] == 2
+
+    tracker.shutdown()
+    assert tracker.stats()["buffered_views"] == 0
+    assert tracker.stats()["rows_written"] == 2
+
+def test_record_returns_first_views_per_viewer_and_bucket(writer):
+    tracker = ViewTracker(writer)
+    assert tracker.record("u1", ["p1", "p2"], viewed_at=HOUR) == ["p1", "p2"]
+    assert tracker.record("u1", ["p1", "p3"], viewed_at=HOUR + 60) == ["p3"]
+    assert tracker.record("u2", ["p1"], viewed_at=HOUR + 60) == ["p1"]
+    assert tracker.record("u1", ["p1"], viewed_at=HOUR + 3600) == ["p1"]
+    # Repeat impressions are still counted as views
+    assert tracker.stats()["buffered_views"] == 6
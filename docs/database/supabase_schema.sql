@@ -37,6 +37,41 @@ END $$;
 CREATE INDEX IF NOT EXISTS idx_posts_user_id ON posts(user_id);
 CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts(created_at);
 CREATE INDEX IF NOT EXISTS idx_posts_post_type ON posts(post_type);
+-- Keyset (cursor) pagination on the feed: ORDER BY created_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_posts_created_at_id ON posts(created_at DESC, id DESC);
+
+-- Post search
+-- search_text flattens everything /api/posts/search matches on (caption,
+-- recipe title, cuisine, ingredient items and tags), one field per line so
+-- a query can't match across two fields. The trigram GIN index serves the
+-- substring ILIKE '%q%' the endpoint issues.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION post_search_text(caption TEXT, recipe_data JSONB) RETURNS TEXT AS $$
+  SELECT lower(concat_ws(E'\n',
+    caption,
+    recipe_data->>'title',
+    recipe_data->>'cuisine',
+    (SELECT string_agg(
+              CASE jsonb_typeof(ing)
+                WHEN 'object' THEN ing->>'item'
+                WHEN 'string' THEN ing #>> '{}'
+              END, E'\n')
+       FROM jsonb_array_elements(
+              CASE WHEN jsonb_typeof(recipe_data->'ingredients') = 'array'
+                   THEN recipe_data->'ingredients' ELSE '[]'::jsonb END) AS ing),
+    (SELECT string_agg(tag #>> '{}', E'\n')
+       FROM jsonb_array_elements(
+              CASE WHEN jsonb_typeof(recipe_data->'tags') = 'array'
+                   THEN recipe_data->'tags' ELSE '[]'::jsonb END) AS tag
+      WHERE jsonb_typeof(tag) = 'string')
+  ))
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_text TEXT
+  GENERATED ALWAYS AS (post_search_text(caption, recipe_data)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_posts_search_text_trgm ON posts USING GIN (search_text gin_trgm_ops);
 
 -- Recipe data structure (when post_type = 'recipe'):
 -- {
@@ -97,6 +132,8 @@ CREATE TABLE IF NOT EXISTS saved_posts (
 
 CREATE INDEX IF NOT EXISTS idx_saved_posts_user_id ON saved_posts(user_id);
 CREATE INDEX IF NOT EXISTS idx_saved_posts_post_id ON saved_posts(post_id);
+-- Keyset (cursor) pagination on saved posts: ORDER BY saved_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_saved_posts_user_saved_at ON saved_posts(user_id, saved_at DESC, id DESC);
 
 -- Post views table
 CREATE TABLE IF NOT EXISTS post_views (
@@ -109,6 +146,144 @@ CREATE TABLE IF NOT EXISTS post_views (
 CREATE INDEX IF NOT EXISTS idx_post_views_post_id ON post_views(post_id);
 CREATE INDEX IF NOT EXISTS idx_post_views_user_id ON post_views(user_id);
 
+-- Aggregated post views
+-- The API does not write one post_views row per impression. The view
+-- tracker counts impressions in memory per post and hour, with a
+-- HyperLogLog sketch of the viewers (1024 one-byte registers), and
+-- record_post_views() merges each flush into these buckets and the
+-- posts.views_count / unique_viewers counters read by feeds.
+CREATE TABLE IF NOT EXISTS post_view_buckets (
+  post_id UUID REFERENCES posts(id) ON DELETE CASCADE NOT NULL,
+  bucket_start TIMESTAMPTZ NOT NULL,
+  views BIGINT NOT NULL DEFAULT 0,
+  viewer_sketch BYTEA NOT NULL,
+  PRIMARY KEY (post_id, bucket_start)
+);
+
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS views_count BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS unique_viewers INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS viewer_sketch BYTEA;
+
+-- Register-wise maximum of two sketches (same layout as services/hyperloglog.py)
+CREATE OR REPLACE FUNCTION hll_merge(a BYTEA, b BYTEA) RETURNS BYTEA AS $$
+DECLARE
+  merged BYTEA;
+BEGIN
+  IF a IS NULL THEN RETURN b; END IF;
+  IF b IS NULL THEN RETURN a; END IF;
+  merged := a;
+  FOR i IN 0 .. length(a) - 1 LOOP
+    IF get_byte(b, i) > get_byte(merged, i) THEN
+      merged := set_byte(merged, i, get_byte(b, i));
+    END IF;
+  END LOOP;
+  RETURN merged;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Distinct-count estimate of a sketch, with linear counting for small sets
+CREATE OR REPLACE FUNCTION hll_estimate(sketch BYTEA) RETURNS INTEGER AS $$
+DECLARE
+  m INTEGER;
+  total DOUBLE PRECISION := 0;
+  zeros INTEGER := 0;
+  estimate DOUBLE PRECISION;
+  r INTEGER;
+BEGIN
+  IF sketch IS NULL THEN RETURN 0; END IF;
+  m := length(sketch);
+  FOR i IN 0 .. m - 1 LOOP
+    r := get_byte(sketch, i);
+    total := total + power(2, -r);
+    IF r = 0 THEN zeros := zeros + 1; END IF;
+  END LOOP;
+  estimate := (0.7213 / (1 + 1.079 / m)) * m * m / total;
+  IF estimate <= 2.5 * m AND zeros > 0 THEN
+    estimate := m * ln(m::DOUBLE PRECISION / zeros);
+  END IF;
+  RETURN round(estimate)::INTEGER;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- p_rows: [{"post_id", "bucket_start", "views", "sketch" (base64)}, ...]
+-- Rows for posts deleted since the impression are skipped.
+CREATE OR REPLACE FUNCTION record_post_views(p_rows JSONB) RETURNS INTEGER AS $$
+DECLARE
+  r RECORD;
+  applied INTEGER := 0;
+BEGIN
+  FOR r IN
+    SELECT (e->>'post_id')::UUID AS post_id,
+           (e->>'bucket_start')::TIMESTAMPTZ AS bucket_start,
+           (e->>'views')::BIGINT AS views,
+           decode(e->>'sketch', 'base64') AS sketch
+    FROM jsonb_array_elements(p_rows) AS e
+    WHERE EXISTS (SELECT 1 FROM posts WHERE id = (e->>'post_id')::UUID)
+  LOOP
+    INSERT INTO post_view_buckets (post_id, bucket_start, views, viewer_sketch)
+    VALUES (r.post_id, r.bucket_start, r.views, r.sketch)
+    ON CONFLICT (post_id, bucket_start) DO UPDATE
+      SET views = post_view_buckets.views + EXCLUDED.views,
+          viewer_sketch = hll_merge(post_view_buckets.viewer_sketch, EXCLUDED.viewer_sketch);
+
+    UPDATE posts
+       SET views_count = views_count + r.views,
+           viewer_sketch = hll_merge(viewer_sketch, r.sketch),
+           unique_viewers = hll_estimate(hll_merge(viewer_sketch, r.sketch))
+     WHERE id = r.post_id;
+    applied := applied + 1;
+  END LOOP;
+  RETURN applied;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Engagement counters on posts
+-- Maintained by triggers so feeds read one row per post instead of
+-- downloading every like/comment row to count them.
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS likes_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS comments_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION update_post_likes_count() RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    UPDATE posts SET likes_count = likes_count + 1 WHERE id = NEW.post_id;
+  ELSIF TG_OP = 'DELETE' THEN
+    UPDATE posts SET likes_count = GREATEST(likes_count - 1, 0) WHERE id = OLD.post_id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_post_comments_count() RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    UPDATE posts SET comments_count = comments_count + 1 WHERE id = NEW.post_id;
+  ELSIF TG_OP = 'DELETE' THEN
+    UPDATE posts SET comments_count = GREATEST(comments_count - 1, 0) WHERE id = OLD.post_id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_likes_count ON likes;
+CREATE TRIGGER trg_likes_count
+  AFTER INSERT OR DELETE ON likes
+  FOR EACH ROW EXECUTE FUNCTION update_post_likes_count();
+
+DROP TRIGGER IF EXISTS trg_comments_count ON comments;
+CREATE TRIGGER trg_comments_count
+  AFTER INSERT OR DELETE ON comments
+  FOR EACH ROW EXECUTE FUNCTION update_post_comments_count();
+
+-- Backfill counters for rows that existed before the triggers
+UPDATE posts p SET likes_count = c.n
+FROM (SELECT post_id, COUNT(*) AS n FROM likes GROUP BY post_id) c
+WHERE p.id = c.post_id;
+
+UPDATE posts p SET comments_count = c.n
+FROM (SELECT post_id, COUNT(*) AS n FROM comments GROUP BY post_id) c
+WHERE p.id = c.post_id;
+
 -- ============================================
 -- SOCIAL FEATURES TABLES
 -- ============================================
@@ -136,6 +311,86 @@ BEGIN
   END IF;
 END $$;
 
+-- Home timelines (GET /api/feed?mode=following)
+-- Fan-out-on-write: each new post is pushed into its author's and followers'
+-- timelines, trimmed to the newest N rows per user, so reading a following
+-- feed is one range scan on (user_id, created_at, post_id).
+CREATE TABLE IF NOT EXISTS home_timeline (
+  user_id UUID NOT NULL,
+  post_id UUID REFERENCES posts(id) ON DELETE CASCADE NOT NULL,
+  author_id UUID NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (user_id, post_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_home_timeline_user_created_at
+  ON home_timeline(user_id, created_at DESC, post_id DESC);
+
+-- Authors with too many followers to fan out to; their posts are merged in at read time
+CREATE TABLE IF NOT EXISTS timeline_celebrities (
+  user_id UUID PRIMARY KEY,
+  created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION fan_out_post(
+  p_post_id UUID,
+  p_author_id UUID,
+  p_created_at TIMESTAMPTZ,
+  p_user_ids UUID[],
+  p_max_entries INTEGER
+) RETURNS VOID AS $$
+BEGIN
+  INSERT INTO home_timeline (user_id, post_id, author_id, created_at)
+  SELECT DISTINCT u, p_post_id, p_author_id, p_created_at
+    FROM unnest(p_user_ids) AS u
+  ON CONFLICT DO NOTHING;
+
+  -- Keep only the newest p_max_entries rows for each recipient
+  DELETE FROM home_timeline t
+   USING (
+     SELECT user_id, post_id FROM (
+       SELECT user_id, post_id,
+              row_number() OVER (PARTITION BY user_id ORDER BY created_at DESC, post_id DESC) AS rn
+         FROM home_timeline
+        WHERE user_id = ANY(p_user_ids)
+     ) ranked
+     WHERE ranked.rn > p_max_entries
+   ) old
+   WHERE t.user_id = old.user_id AND t.post_id = old.post_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill a new follow: copy the author's newest p_limit posts into the
+-- follower's timeline, then trim it like fan_out_post does
+CREATE OR REPLACE FUNCTION backfill_timeline(
+  p_user_id UUID,
+  p_author_id UUID,
+  p_limit INTEGER,
+  p_max_entries INTEGER
+) RETURNS VOID AS $$
+BEGIN
+  INSERT INTO home_timeline (user_id, post_id, author_id, created_at)
+  SELECT p_user_id, p.id, p.user_id, p.created_at
+    FROM posts p
+   WHERE p.user_id = p_author_id
+   ORDER BY p.created_at DESC, p.id DESC
+   LIMIT p_limit
+  ON CONFLICT DO NOTHING;
+
+  DELETE FROM home_timeline t
+   USING (
+     SELECT post_id FROM (
+       SELECT post_id,
+              row_number() OVER (ORDER BY created_at DESC, post_id DESC) AS rn
+         FROM home_timeline
+        WHERE user_id = p_user_id
+     ) ranked
+     WHERE ranked.rn > p_max_entries
+   ) old
+   WHERE t.user_id = p_user_id AND t.post_id = old.post_id;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Follow requests table (for future private accounts)
 CREATE TABLE IF NOT EXISTS follow_requests (
   requester_id UUID NOT NULL,
@@ -182,6 +437,132 @@ CREATE TABLE IF NOT EXISTS messages (
 CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_messages_sender_id ON messages(sender_id);
 CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages(created_at);
+-- Keyset (cursor) pagination within a conversation: ORDER BY created_at, id
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created_at ON messages(conversation_id, created_at, id);
+
+-- 1:1 conversation lookup
+-- dm_key is the ordered pair "<smaller uuid>:<larger uuid>", so get-or-create
+-- for a DM is one unique-index lookup and two concurrent requests can't
+-- create duplicate conversations.
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS dm_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_conversations_dm_key ON conversations(dm_key);
+
+CREATE OR REPLACE FUNCTION dm_key(a UUID, b UUID) RETURNS TEXT AS $$
+  SELECT LEAST(a, b)::TEXT || ':' || GREATEST(a, b)::TEXT;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION get_or_create_dm(p_user_id UUID, p_other_user_id UUID)
+RETURNS TABLE (conversation_id UUID, created BOOLEAN) AS $$
+#variable_conflict use_column
+DECLARE
+  v_key TEXT := dm_key(p_user_id, p_other_user_id);
+  v_id UUID;
+BEGIN
+  IF p_user_id = p_other_user_id THEN
+    RAISE EXCEPTION 'cannot start a conversation with yourself' USING ERRCODE = 'invalid_parameter_value';
+  END IF;
+
+  INSERT INTO conversations (dm_key) VALUES (v_key)
+  ON CONFLICT (dm_key) DO NOTHING
+  RETURNING id INTO v_id;
+
+  IF v_id IS NOT NULL THEN
+    INSERT INTO conversation_participants (conversation_id, user_id)
+    VALUES (v_id, p_user_id), (v_id, p_other_user_id)
+    ON CONFLICT DO NOTHING;
+    RETURN QUERY SELECT v_id, TRUE;
+  ELSE
+    RETURN QUERY SELECT c.id, FALSE FROM conversations c WHERE c.dm_key = v_key;
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill keys for existing two-person conversations (oldest one wins per pair)
+UPDATE conversations c SET dm_key = pairs.key
+FROM (
+  SELECT DISTINCT ON (p.key) p.conversation_id, p.key
+    FROM (
+      SELECT cp.conversation_id,
+             dm_key(MIN(cp.user_id::TEXT)::UUID, MAX(cp.user_id::TEXT)::UUID) AS key,
+             MIN(cp.joined_at) AS joined_at
+        FROM conversation_participants cp
+       GROUP BY cp.conversation_id
+      HAVING COUNT(*) = 2
+    ) p
+   ORDER BY p.key, p.joined_at
+) pairs
+WHERE c.id = pairs.conversation_id
+  AND c.dm_key IS NULL
+  AND NOT EXISTS (SELECT 1 FROM conversations x WHERE x.dm_key = pairs.key);
+
+-- Unread counters
+-- Each participant's unread count is maintained on insert instead of being
+-- counted from `messages`; POST /conversations/<id>/read resets it to 0.
+ALTER TABLE conversation_participants ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION increment_unread_counts() RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE conversation_participants
+     SET unread_count = unread_count + 1
+   WHERE conversation_id = NEW.conversation_id
+     AND user_id <> NEW.sender_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_messages_unread ON messages;
+CREATE TRIGGER trg_messages_unread
+  AFTER INSERT ON messages
+  FOR EACH ROW EXECUTE FUNCTION increment_unread_counts();
+
+-- Backfill counters for messages sent before the trigger existed
+UPDATE conversation_participants cp SET unread_count = (
+  SELECT COUNT(*) FROM messages m
+   WHERE m.conversation_id = cp.conversation_id
+     AND m.sender_id <> cp.user_id
+     AND m.created_at > cp.last_read_at
+);
+
+-- Badge count for GET /api/messages/unread
+CREATE OR REPLACE FUNCTION get_unread_total(p_user_id UUID) RETURNS INTEGER AS $$
+  SELECT COALESCE(SUM(unread_count), 0)::INTEGER
+    FROM conversation_participants
+   WHERE user_id = p_user_id;
+$$ LANGUAGE sql STABLE;
+
+-- Inbox for GET /api/conversations
+-- Returns every conversation the user is in with its other participants,
+-- last message and unread count, so the inbox costs one round trip
+-- regardless of how many conversations the user has.
+CREATE OR REPLACE FUNCTION get_user_inbox(p_user_id UUID)
+RETURNS TABLE (
+  id UUID,
+  updated_at TIMESTAMPTZ,
+  other_user_ids UUID[],
+  last_message JSONB,
+  unread_count INTEGER
+) AS $$
+  SELECT
+    c.id,
+    c.updated_at,
+    COALESCE(
+      (SELECT array_agg(op.user_id) FROM conversation_participants op
+        WHERE op.conversation_id = c.id AND op.user_id <> p_user_id),
+      '{}'
+    ) AS other_user_ids,
+    lm.message AS last_message,
+    me.unread_count
+  FROM conversation_participants me
+  JOIN conversations c ON c.id = me.conversation_id
+  LEFT JOIN LATERAL (
+    SELECT to_jsonb(m) AS message FROM messages m
+     WHERE m.conversation_id = c.id
+     ORDER BY m.created_at DESC
+     LIMIT 1
+  ) lm ON TRUE
+  WHERE me.user_id = p_user_id
+  ORDER BY c.updated_at DESC;
+$$ LANGUAGE sql STABLE;
 
 -- ============================================
 -- GAMIFICATION TABLES (SKELETAL)
@@ -200,6 +581,134 @@ CREATE TABLE IF NOT EXISTS user_gamification (
   updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Atomic XP / coin awards
+-- p_awards: [{"user_id", "xp", "coins"}, ...]. Amounts for the same user are
+-- summed, then added with one upsert (xp = xp + n), so concurrent awards
+-- never lose updates. Level is recomputed from the new XP (100 XP per level).
+-- Returns the new totals plus the amounts applied, one row per user.
+CREATE OR REPLACE FUNCTION award_rewards(p_awards JSONB)
+RETURNS TABLE (user_id UUID, xp INTEGER, level INTEGER, coins INTEGER, xp_gained INTEGER, coins_gained INTEGER) AS $$
+  WITH totals AS (
+    SELECT (a->>'user_id')::UUID AS user_id,
+           SUM(COALESCE((a->>'xp')::INTEGER, 0))::INTEGER AS xp,
+           SUM(COALESCE((a->>'coins')::INTEGER, 0))::INTEGER AS coins
+    FROM jsonb_array_elements(p_awards) AS a
+    GROUP BY 1
+  ), applied AS (
+    INSERT INTO user_gamification AS g (user_id, xp, level, coins)
+    SELECT t.user_id, t.xp, t.xp / 100 + 1, t.coins FROM totals t
+    ON CONFLICT (user_id) DO UPDATE
+      SET xp = COALESCE(g.xp, 0) + EXCLUDED.xp,
+          level = (COALESCE(g.xp, 0) + EXCLUDED.xp) / 100 + 1,
+          coins = COALESCE(g.coins, 0) + EXCLUDED.coins
+    RETURNING g.user_id, g.xp, g.level, g.coins
+  )
+  SELECT a.user_id, a.xp, a.level, a.coins, t.xp, t.coins
+  FROM applied a
+  JOIN totals t ON t.user_id = a.user_id;
+$$ LANGUAGE sql;
+
+-- Gamification events
+-- Rewards for domain events (post created, like received, ...) are applied
+-- in batches by the background event pipeline. Each event has a
+-- deterministic key; apply_gamification_events() inserts the batch here and
+-- only rewards the keys that were not already present, in one transaction,
+-- so a retried batch or a repeated event is never paid twice.
+CREATE TABLE IF NOT EXISTS gamification_events (
+  event_key TEXT PRIMARY KEY,
+  event_type VARCHAR(40) NOT NULL,
+  user_id UUID NOT NULL,        -- the rewarded user
+  xp INTEGER NOT NULL DEFAULT 0,
+  coins INTEGER NOT NULL DEFAULT 0,
+  is_activity BOOLEAN NOT NULL DEFAULT FALSE,  -- counts toward the user's streak
+  occurred_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_gamification_events_user ON gamification_events(user_id, occurred_at DESC);
+
+-- Badge progress counters
+-- Lifetime per-user totals for the badge rules, so awarding badges never
+-- needs count queries. apply_gamification_events() bumps them in the same
+-- transaction that records the events, so a counted event is never lost or
+-- counted twice. Like badges, they only go up: an unlike or unfollow does
+-- not take anything back. backfill_badge_counters() rebuilds them.
+CREATE TABLE IF NOT EXISTS user_badge_counters (
+  user_id UUID PRIMARY KEY,
+  posts INTEGER NOT NULL DEFAULT 0,
+  recipe_posts INTEGER NOT NULL DEFAULT 0,
+  follows INTEGER NOT NULL DEFAULT 0,
+  likes_received INTEGER NOT NULL DEFAULT 0
+);
+
+-- Returns the events that were newly applied
+CREATE OR REPLACE FUNCTION apply_gamification_events(p_events JSONB)
+RETURNS SETOF gamification_events AS $$
+  WITH new_events AS (
+    INSERT INTO gamification_events (event_key, event_type, user_id, xp, coins, is_activity, occurred_at)
+    SELECT e->>'event_key',
+           e->>'event_type',
+           (e->>'user_id')::UUID,
+           COALESCE((e->>'xp')::INTEGER, 0),
+           COALESCE((e->>'coins')::INTEGER, 0),
+           COALESCE((e->>'is_activity')::BOOLEAN, FALSE),
+           COALESCE((e->>'occurred_at')::TIMESTAMPTZ, NOW())
+    FROM jsonb_array_elements(p_events) AS e
+    ON CONFLICT (event_key) DO NOTHING
+    RETURNING *
+  ), totals AS (
+    SELECT user_id,
+           SUM(xp)::INTEGER AS xp,
+           SUM(coins)::INTEGER AS coins,
+           MAX(occurred_at::DATE) FILTER (WHERE is_activity) AS active_on
+    FROM new_events
+    GROUP BY user_id
+  ), counted AS (
+    -- Event types match EVENT_COUNTERS in services/badges.py
+    INSERT INTO user_badge_counters AS c (user_id, posts, recipe_posts, follows, likes_received)
+    SELECT user_id,
+           COUNT(*) FILTER (WHERE event_type = 'post_created'),
+           COUNT(*) FILTER (WHERE event_type = 'recipe_posted'),
+           COUNT(*) FILTER (WHERE event_type = 'follow_made'),
+           COUNT(*) FILTER (WHERE event_type = 'like_received')
+    FROM new_events
+    WHERE event_type IN ('post_created', 'recipe_posted', 'follow_made', 'like_received')
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE
+      SET posts = c.posts + EXCLUDED.posts,
+          recipe_posts = c.recipe_posts + EXCLUDED.recipe_posts,
+          follows = c.follows + EXCLUDED.follows,
+          likes_received = c.likes_received + EXCLUDED.likes_received
+    RETURNING c.user_id
+  ), applied AS (
+    INSERT INTO user_gamification AS g (user_id, xp, level, coins, current_streak, longest_streak, last_activity_date)
+    SELECT t.user_id, t.xp, t.xp / 100 + 1, t.coins,
+           CASE WHEN t.active_on IS NULL THEN 0 ELSE 1 END,
+           CASE WHEN t.active_on IS NULL THEN 0 ELSE 1 END,
+           t.active_on
+    FROM totals t
+    ON CONFLICT (user_id) DO UPDATE
+      SET xp = COALESCE(g.xp, 0) + EXCLUDED.xp,
+          level = (COALESCE(g.xp, 0) + EXCLUDED.xp) / 100 + 1,
+          coins = COALESCE(g.coins, 0) + EXCLUDED.coins,
+          -- Same rules as POST /gamification/<user_id>/streak: +1 on the next day, reset after a gap
+          current_streak = CASE
+            WHEN EXCLUDED.last_activity_date IS NULL
+              OR g.last_activity_date >= EXCLUDED.last_activity_date THEN g.current_streak
+            WHEN g.last_activity_date = EXCLUDED.last_activity_date - 1 THEN COALESCE(g.current_streak, 0) + 1
+            ELSE 1
+          END,
+          longest_streak = GREATEST(COALESCE(g.longest_streak, 0), CASE
+            WHEN EXCLUDED.last_activity_date IS NULL
+              OR g.last_activity_date >= EXCLUDED.last_activity_date THEN g.current_streak
+            WHEN g.last_activity_date = EXCLUDED.last_activity_date - 1 THEN COALESCE(g.current_streak, 0) + 1
+            ELSE 1
+          END),
+          last_activity_date = GREATEST(g.last_activity_date, EXCLUDED.last_activity_date)
+    RETURNING g.user_id
+  )
+  SELECT * FROM new_events;
+$$ LANGUAGE sql;
+
 -- Badges
 CREATE TABLE IF NOT EXISTS badges (
   id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -256,3 +765,151 @@ INSERT INTO badges (name, description, icon_url, criteria) VALUES
 ('Engagement King', 'Received 100 likes', NULL, 'Get 100 likes on posts'),
 ('Week Warrior', 'Maintained a 7-day streak', NULL, '7-day activity streak')
 ON CONFLICT (name) DO NOTHING;
+
+-- Badge progress
+CREATE OR REPLACE VIEW user_badge_progress AS
+SELECT c.user_id, c.posts, c.recipe_posts, c.follows, c.likes_received,
+       COALESCE(g.longest_streak, 0) AS longest_streak
+FROM user_badge_counters c
+LEFT JOIN user_gamification g ON g.user_id = c.user_id;
+
+-- Current progress (counters + longest_streak) of the given users
+CREATE OR REPLACE FUNCTION get_badge_progress(p_user_ids UUID[])
+RETURNS SETOF user_badge_progress AS $$
+  SELECT * FROM user_badge_progress WHERE user_id = ANY(p_user_ids);
+$$ LANGUAGE sql STABLE;
+
+-- Lifetime totals: every counted event ever applied, or what the source
+-- tables hold now if that is more (history from before the event pipeline)
+CREATE OR REPLACE FUNCTION backfill_badge_counters() RETURNS INTEGER AS $$
+DECLARE
+  affected INTEGER;
+BEGIN
+  INSERT INTO user_badge_counters (user_id, posts, recipe_posts, follows, likes_received)
+  SELECT u.user_id,
+         GREATEST(COALESCE(e.posts, 0), COALESCE(p.posts, 0)),
+         GREATEST(COALESCE(e.recipe_posts, 0), COALESCE(p.recipe_posts, 0)),
+         GREATEST(COALESCE(e.follows, 0), COALESCE(f.follows, 0)),
+         GREATEST(COALESCE(e.likes_received, 0), COALESCE(l.likes_received, 0))
+  FROM (
+    SELECT user_id FROM posts
+    UNION SELECT follower_id FROM followers
+    UNION SELECT user_id FROM user_gamification
+    UNION SELECT user_id FROM gamification_events
+  ) AS u
+  LEFT JOIN (
+    SELECT user_id,
+           COUNT(*) FILTER (WHERE event_type = 'post_created') AS posts,
+           COUNT(*) FILTER (WHERE event_type = 'recipe_posted') AS recipe_posts,
+           COUNT(*) FILTER (WHERE event_type = 'follow_made') AS follows,
+           COUNT(*) FILTER (WHERE event_type = 'like_received') AS likes_received
+    FROM gamification_events GROUP BY user_id
+  ) AS e ON e.user_id = u.user_id
+  LEFT JOIN (
+    SELECT user_id, COUNT(*) AS posts, COUNT(*) FILTER (WHERE post_type = 'recipe') AS recipe_posts
+    FROM posts GROUP BY user_id
+  ) AS p ON p.user_id = u.user_id
+  LEFT JOIN (
+    SELECT follower_id, COUNT(*) AS follows FROM followers GROUP BY follower_id
+  ) AS f ON f.follower_id = u.user_id
+  LEFT JOIN (
+    SELECT posts.user_id, COUNT(*) AS likes_received
+    FROM likes JOIN posts ON posts.id = likes.post_id
+    WHERE likes.user_id <> posts.user_id
+    GROUP BY posts.user_id
+  ) AS l ON l.user_id = u.user_id
+  ON CONFLICT (user_id) DO UPDATE
+    SET posts = EXCLUDED.posts,
+        recipe_posts = EXCLUDED.recipe_posts,
+        follows = EXCLUDED.follows,
+        likes_received = EXCLUDED.likes_received;
+  GET DIAGNOSTICS affected = ROW_COUNT;
+  RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rewards widget: a user's gamification stats and earned badge ids in one
+-- round trip. Badge details are joined in the API from its cached catalog.
+CREATE OR REPLACE FUNCTION get_rewards_summary(p_user_id UUID) RETURNS JSONB AS $$
+  SELECT jsonb_build_object(
+    'stats', (SELECT to_jsonb(g) FROM user_gamification g WHERE g.user_id = p_user_id),
+    'badges', COALESCE((
+      SELECT jsonb_agg(jsonb_build_object('badge_id', ub.badge_id, 'earned_at', ub.earned_at) ORDER BY ub.earned_at)
+      FROM user_badges ub
+      WHERE ub.user_id = p_user_id
+    ), '[]'::jsonb)
+  );
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- INGREDIENT PRICES
+-- ============================================
+
+-- Store prices used by POST /api/ingredient-prices/estimate
+CREATE TABLE IF NOT EXISTS ingredient_prices (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  ingredient_name TEXT NOT NULL,
+  price_per_unit NUMERIC(10, 2) NOT NULL,
+  unit VARCHAR(30),
+  store_name TEXT,
+  store_location TEXT,
+  currency VARCHAR(3) DEFAULT 'USD',
+  source_url TEXT,
+  last_updated TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Substring matching (ILIKE '%name%') can't use a btree index; a trigram
+-- index serves it (pg_trgm is enabled above for post search)
+CREATE INDEX IF NOT EXISTS idx_ingredient_prices_name_trgm
+  ON ingredient_prices USING GIN (ingredient_name gin_trgm_ops);
+
+-- Resolve every ingredient of an estimate in one call.
+-- Returns, for each 1-based position in p_names, the most recently updated
+-- price whose ingredient_name contains that name (case-insensitive).
+-- Positions without a match are omitted.
+CREATE OR REPLACE FUNCTION match_ingredient_prices(p_names TEXT[])
+RETURNS TABLE (idx INTEGER, price JSONB) AS $$
+  SELECT n.idx::INTEGER, to_jsonb(p)
+  FROM unnest(p_names) WITH ORDINALITY AS n(name, idx)
+  CROSS JOIN LATERAL (
+    SELECT *
+    FROM ingredient_prices ip
+    WHERE ip.ingredient_name ILIKE
+      '%' || replace(replace(replace(n.name, '\', '\\'), '%', '\%'), '_', '\_') || '%'
+    ORDER BY ip.last_updated DESC NULLS LAST
+    LIMIT 1
+  ) AS p;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================
+-- RECIPE COST ESTIMATES
+-- ============================================
+
+-- Precomputed cost of a recipe post (see services/recipe_costs.py).
+-- ingredients_hash is the content hash of recipe_data.ingredients the cost
+-- was computed for; estimated_cost is NULL when nothing could be priced.
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS estimated_cost NUMERIC(10, 2);
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS cost_currency VARCHAR(3);
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS ingredients_hash TEXT;
+
+-- Write re-priced recipes after a price catalog change, one call per batch.
+-- p_costs: [{"post_id", "estimated_cost", "cost_currency", "ingredients_hash"}, ...]
+CREATE OR REPLACE FUNCTION set_recipe_costs(p_costs JSONB) RETURNS INTEGER AS $$
+DECLARE
+  affected INTEGER;
+BEGIN
+  UPDATE posts p
+  SET estimated_cost = (c->>'estimated_cost')::NUMERIC,
+      cost_currency = c->>'cost_currency',
+      ingredients_hash = c->>'ingredients_hash'
+  FROM jsonb_array_elements(p_costs) AS c
+  WHERE p.id = (c->>'post_id')::UUID;
+  GET DIAGNOSTICS affected = ROW_COUNT;
+  RETURN affected;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Store coordinates for location-aware estimates. The API builds its
+-- nearest-store index from these (or from a "lat,lng" store_location).
+ALTER TABLE ingredient_prices ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE ingredient_prices ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;